@@ -4,7 +4,10 @@
 # The reason search is externalised from the definition of classes itself is that
 # search is specific to the application using it. It is thus much simpler to override it later on.
 
-import os, errno, json, sys, urllib.parse
+import os, errno, io, json, queue, sys, time, urllib.parse
+from collections import deque
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor
 from uuid import uuid1
 import logging
 import zipfile, glob, shutil, threading
@@ -15,12 +18,14 @@ from ..document.interval import Interval
 from ..core.master_factory_list import get_master_bucket_list
 from ..security.base_authorization import BaseAuthorization
 from typing import List
-from ..core.esutils import get_multi_indexes_small_search_query, get_es_conn
+from ..core.esutils import get_multi_indexes_small_search_query, bulk_in_parallel, sorted_sliced_scan
+from ..core.utils import put_unless_stopped, StoppedException
+from ..core.metrics import batch_job
 from ..core.settings_utils import get_settings, get_file_storage_data_url
-from elasticsearch import helpers
-from ..search.utils import add_offset_to_query, replaceFieldNames, deleteField
+from ..search.utils import replaceFieldNames, deleteField
 from .tmp_file_storage import TmpFileStorage
 from .http_post_file_storage import HttpPostFileStorage
+from .stream_file_storage import StreamZipFileStorage
 
 
 class GeneralSearchInfo:
@@ -37,6 +42,115 @@ class FuncThread(threading.Thread):
         self._target(*self._args)
 
 
+ANNOTATION_ID_FIELD = "annotationId"
+DOCUMENT_ID_FIELD = "_documentID"
+ERROR_DOCUMENT_ID_FIELD = "_documentID"
+ERROR_ANNOTATION_FIELD = "annotation"
+ERROR_MESSAGE_FIELD = "message"
+ERROR_TYPE_FIELD = "errorType"
+ANNOTATION_ERROR_TYPE = "annotation"
+OTHER_ERROR_TYPE = "other"
+MAX_ERRORS_TO_RETURN = 10000
+
+
+def _annotation_error(annotation: dict, message) -> dict:
+    return {ERROR_ANNOTATION_FIELD: annotation, ERROR_DOCUMENT_ID_FIELD: annotation.get(DOCUMENT_ID_FIELD),
+            ERROR_TYPE_FIELD: ANNOTATION_ERROR_TYPE, ERROR_MESSAGE_FIELD: message}
+
+
+def _read_annotations_file(z: zipfile.ZipFile, name: str, indicesPerType: dict):
+    """
+    Decodes and validates one file of an annotation zip.
+
+    :return:    ([(action, annotation)], [error])
+                    annotation is the annotation as received (with its annotationId), used to report bulk errors.
+    """
+    logger = logging.getLogger(__name__)
+    actions = []
+    errors = []
+    try:
+        with z.open(name) as f:
+            annotations = json.load(io.TextIOWrapper(f, encoding="utf-8"))["data"]
+    except Exception as e:
+        errors.append({ERROR_TYPE_FIELD: OTHER_ERROR_TYPE, ERROR_MESSAGE_FIELD:
+            "Failed to process file: {0}\n{1}".format(name, str(e))})
+        logger.error({"ERROR TRACEBACK": traceback.format_exc()})
+        return actions, errors
+
+    annotationIds = set()
+    for annotation in annotations:
+        try:
+            # TODO make real annotation validation
+            if ANNOTATION_ID_FIELD in annotation:
+                annotationId = annotation[ANNOTATION_ID_FIELD]
+            else:
+                annotationId = gen_uuid()
+
+            if not "schemaType" in annotation:
+                errors.append(_annotation_error(annotation, "Missing schemaType"))
+            elif not annotation["schemaType"] in indicesPerType:
+                errors.append(_annotation_error(annotation, "Bucket doesnt contain a schema for schemaType:{0}".format(
+                    annotation["schemaType"])))
+            elif annotationId in annotationIds:
+                errors.append(_annotation_error(annotation, "Duplicate annotation ID."))
+            else:
+                annotationIds.add(annotationId)
+                source = annotation
+                if ANNOTATION_ID_FIELD in annotation:
+                    source = annotation.copy()
+                    del source[ANNOTATION_ID_FIELD]
+
+                action = {"_index": indicesPerType[annotation["schemaType"]], "_type": annotation["schemaType"],
+                          "_id": annotationId, "_source": source}
+                actions.append((action, annotation))
+        except Exception as e:
+            errors.append(_annotation_error(annotation, str(e)))
+            logger.info(errors[-1])
+            logger.info({"ERROR TRACEBACK": traceback.format_exc()})
+
+    return actions, errors
+
+
+def _bulk_item_to_annotation_error(errorItem: dict, annotation: dict) -> dict:
+    """
+    Converts an item of a bulk response in error to an error returned to the user.
+    """
+    result = next(iter(errorItem.values()))
+    error = result.get("error")
+    if isinstance(error, dict) and "type" in error and "reason" in error:
+        if error["type"] == "strict_dynamic_mapping_exception":
+            return _annotation_error(annotation, "Annotation fields dont respect schema. " + error["reason"])
+        return _annotation_error(annotation, error["reason"])
+    elif error:
+        return _annotation_error(annotation, error)
+    return _annotation_error(annotation, result)
+
+
+_EXPORT_TASK_DONE = object()
+
+
+def _group_annotations_by_document(hits):
+    """
+    Groups consecutive annotation hits of the same document.
+
+    :param hits:    Hits sorted by document id
+    :return:        Generator of (documentId, [annotation]). Annotations contain their id as annotationId.
+    """
+    currentDocId = None
+    annotations = []
+    for hit in hits:
+        annotation = hit["_source"]
+        annotation[ANNOTATION_ID_FIELD] = hit["_id"]
+        docId = annotation.get(DOCUMENT_ID_FIELD)
+        if annotations and docId != currentDocId:
+            yield currentDocId, annotations
+            annotations = []
+        currentDocId = docId
+        annotations.append(annotation)
+    if annotations:
+        yield currentDocId, annotations
+
+
 class Corpus:
     def upload_annotations(self, bucketIds: List[str] = [], schemaTypes: List[str] = None,
                            url: str = None, zipFileName: str = None, isSendPut=False,
@@ -48,10 +162,13 @@ class Corpus:
         :return:
         """
 
-        # creates a zip file
-        fileStorage = HttpPostFileStorage(url, zipFileName)
-        self._create_annotations_zip(fileStorage, bucketIds, schemaTypes)
-        fileStorage.flush(True, isSendPut, isMultipart, multipartFieldName)
+        # streams the zip to the url while it is created
+        fileStorage = HttpPostFileStorage(url, zipFileName, isSendPut, isMultipart, multipartFieldName)
+        try:
+            self.write_annotations_zip(fileStorage, bucketIds, schemaTypes)
+        except Exception:
+            fileStorage.abort()
+            raise
 
     def create_tmp_annotations_zip(self, bucketIds: List[str] = [], schemaTypes: List[str] = None,
                                    zipFileName: str = None):
@@ -64,18 +181,25 @@ class Corpus:
         :return:    Path to the zip file
         """
         fileStorage = TmpFileStorage(zipFileName)
-        self._create_annotations_zip(fileStorage, bucketIds, schemaTypes)
+        self.write_annotations_zip(fileStorage, bucketIds, schemaTypes)
         return fileStorage.zipPath
 
     def clear_temporary_files(self):
         if self.tmpFileStorage:
             self.tmpFileStorage.clear()
 
-    def _create_annotations_zip(self, fileStorage, bucketIds: List[str] = [], schemaTypes: List[str] = None):
-        fileStorage.create_zip_file()
-        es = get_es_conn()
+    def write_annotations_zip(self, fileStorage: StreamZipFileStorage, bucketIds: List[str] = [],
+                              schemaTypes: List[str] = None):
+        """
+        Writes one file per (document, bucket, schema type) into the zip of fileStorage, then closes it.
 
+        Each (bucket, schema type) index is exported by its own task, NB_EXPORT_THREADS tasks at a time, with a
+        sorted sliced scroll (see sorted_sliced_scan). Files are written to the zip by the calling thread only.
+        """
         logger = logging.getLogger(__name__)
+        batchSettings = get_settings()['CLASSES']['BATCH']
+        fileStorage.create_zip_file()
+
         bucketList = get_master_bucket_list(self.envId, self.authorization)
         allBuckets = bucketList.get_all_buckets_for_corpus(self.corpusId)
         buckets = []
@@ -88,54 +212,46 @@ class Corpus:
         else:
             buckets = allBuckets
 
-        offsets = None
+        tasks = []
         for bucket in buckets:
-            indices = bucket.dd.get_indices(schemaTypes)
-
-            s = get_multi_indexes_small_search_query(indices=indices)
+            for schemaType, index in sorted(bucket.get_es_index_per_schema_type().items()):
+                if not schemaTypes or schemaType in schemaTypes:
+                    tasks.append((bucket.id, schemaType, index))
 
-            esSearchData = s.to_dict()
+        nbThreads = max(1, min(batchSettings["NB_EXPORT_THREADS"], len(tasks)))
+        files = queue.Queue(maxsize=nbThreads * 2)
+        stop = threading.Event()
 
-            if offsets:
-                add_offset_to_query(esSearchData, offsets)
-            esSearchData["sort"] = [{"_documentID": {"order": "asc"}}]
-
-            annotations = []
+        def export_index(bucketId: str, schemaType: str, index: str):
+            try:
+                body = get_multi_indexes_small_search_query(indices=index).to_dict()
+                hits = sorted_sliced_scan(index, body, DOCUMENT_ID_FIELD, batchSettings["NB_EXPORT_SLICES"])
+                for docId, annotations in _group_annotations_by_document(hits):
+                    put_unless_stopped(files, ("{0}.{1}.{2}.json".format(docId, bucketId, schemaType), annotations),
+                                       stop)
+            finally:
+                try:
+                    put_unless_stopped(files, _EXPORT_TASK_DONE, stop)
+                except StoppedException:
+                    pass
 
-            es = get_es_conn()
-            page = es.search(body=esSearchData, index=indices, scroll="100m", size=1000)
-
-            sid = page['_scroll_id']
-            scroll_size = page['hits']['total']
-            currentDocId = None
-            annoByType = {}
-            while (scroll_size > 0):
-                logger.debug("bucket:|" + bucket.id + "| scroll size: " + str(scroll_size))
-                for annoRaw in page['hits']['hits']:
-                    anno = annoRaw["_source"]
-                    anno["annotationId"] = annoRaw["_id"]
-                    if not currentDocId:
-                        currentDocId = anno["_documentID"]
-                    elif currentDocId != anno["_documentID"]:
-                        self._save_annotations(annoByType, fileStorage, currentDocId, bucket.id)
-                        annoByType = {}
-                        currentDocId = anno["_documentID"]
-
-                    schemaType = anno["schemaType"]
-                    if not schemaType in annoByType:
-                        annoByType[schemaType] = []
-
-                    annoByType[schemaType].append(anno)
-
-                page = es.scroll(scroll_id=sid, scroll='100m')
-                sid = page['_scroll_id']
-                scroll_size = len(page['hits']['hits'])
-
-            if annoByType:
-                self._save_annotations(annoByType, fileStorage, anno["_documentID"], bucket.id)
-
-            # release scroll
-            es.clear_scroll(sid)
+        start = time.time()
+        with batch_job("annotations_export") as add_items, ThreadPoolExecutor(max_workers=nbThreads) as executor:
+            futures = [executor.submit(export_index, *task) for task in tasks]
+            try:
+                nbTasksDone = 0
+                while nbTasksDone < len(tasks):
+                    item = files.get()
+                    if item is _EXPORT_TASK_DONE:
+                        nbTasksDone += 1
+                    else:
+                        fileStorage.add_json_file(item[1], item[0])
+                        add_items(len(item[1]))
+            finally:
+                stop.set()
+        for future in futures:
+            future.result()
+        logger.info("Annotations of corpus {0} exported in {1:.1f}s".format(self.corpusId, time.time() - start))
 
         fileStorage.close()
 
@@ -147,161 +263,95 @@ class Corpus:
         """
         return urllib.parse.unquote(tmpUrlId)
 
-    def add_annotations(self, bucketId: str, zipFilePath: str):
+    def add_annotations(self, bucketId: str, zipFilePath: str, chunkSize: int = None, maxChunkBytes: int = None,
+                        nbThreads: int = None, bulkLoadMode: bool = False):
         """
+        Adds all annotations of a zip file to a bucket. Each file of the zip contains {"data": [annotation, ...]}.
+
+        Files are decoded and validated by a small pool of threads while annotations are sent to elastic search
+        in parallel bulk requests, so only a few files and bulk requests are held in memory at a time.
+
         :param bucketId:
         :param zipFilePath:     Local location to where to where to save zip file.
-        :param errorUrl:        Storage url to where to save errors.
-        :return:    {"data" :[error1, ... ,errorN]
+        :param chunkSize:       Maximum number of annotations per bulk request. Defaults to BATCH settings.
+        :param maxChunkBytes:   Maximum size in bytes of a bulk request. Defaults to BATCH settings.
+        :param nbThreads:       Number of bulk requests sent in parallel. Defaults to BATCH settings.
+        :param bulkLoadMode:    If true, refreshes and replicas of the bucket indices are disabled during the import.
+                                Annotations are searchable only once the import is over. Meant for large imports.
+        :return:    {"data" :[error1, ... ,errorN], "totalErrorsCount": N} or None if there was no error
         """
         logger = logging.getLogger(__name__)
-        fh = open(zipFilePath, 'rb')
-        z = zipfile.ZipFile(fh)
-        es = get_es_conn()
+        batchSettings = get_settings()['CLASSES']['BATCH']
+        chunkSize = chunkSize or batchSettings["BULK_CHUNK_SIZE"]
+        maxChunkBytes = maxChunkBytes or batchSettings["MAX_ANNOTAION_BULK_SIZE"]
+        nbThreads = nbThreads or batchSettings["NB_BULK_THREADS"]
+
         bucket = get_master_bucket_list(self.envId, self.authorization).get_bucket(self.corpusId, bucketId)
         indicesPerType = bucket.get_es_index_per_schema_type()
         errorsToReturn = []
-        ANNOTATION_ID_FIELD = "annotationId"
-        DOCUMENT_ID_FIELD = "_documentID"
-        ERROR_DOCUMENT_ID_FIELD = "_documentID"
-        ERROR_ANNOTATION_FIELD = "annotation"
-        ERROR_MESSAGE_FIELD = "message"
-        ERROR_TYPE_FIELD = "errorType"
-        ANNOTATION_ERROR_TYPE = "annotation"
-        OTHER_ERROR_TYPE = "other"
-        MAX_ERRORS_TO_RETURN = 10000
-        for name in z.namelist():
+        totalErrorsCount = 0
+
+        def add_error(error: dict):
+            nonlocal totalErrorsCount
+            totalErrorsCount += 1
+            if len(errorsToReturn) < MAX_ERRORS_TO_RETURN:
+                errorsToReturn.append(error)
+
+        start = time.time()
+        with ExitStack() as stack:
+            if bulkLoadMode:
+                stack.enter_context(bucket.bulk_load_mode())
+            add_items = stack.enter_context(batch_job("annotations_import"))
+            z = stack.enter_context(zipfile.ZipFile(zipFilePath))
+            actions = self._read_annotation_actions(z, indicesPerType, add_error,
+                                                    batchSettings["NB_BULK_PARSE_THREADS"], add_items)
             try:
-                bulkData = []
-                errorAnnotations = []
-                data = z.read(name).decode('utf-8')
-                jsonData = json.loads(data)
-                annotations = jsonData["data"]
-                annotationById = {}
-                for annotation in annotations:
-                    try:
-                        # TODO make real annotation validation
-                        annotationId = None
-                        documentId = None
-                        if ANNOTATION_ID_FIELD in annotation:
-                            annotationId = annotation[ANNOTATION_ID_FIELD]
-                        else:
-                            annotationId = gen_uuid()
-
-                        if DOCUMENT_ID_FIELD in annotation:
-                            documentId = annotation[DOCUMENT_ID_FIELD]
-
-                        if not "schemaType" in annotation:
-                            errorAnnotations.append(
-                                {ERROR_ANNOTATION_FIELD: annotation, ERROR_DOCUMENT_ID_FIELD: documentId,
-                                 ERROR_TYPE_FIELD: ANNOTATION_ERROR_TYPE,
-                                 ERROR_MESSAGE_FIELD: "Missing schemaType"})
-                        elif not annotation["schemaType"] in indicesPerType:
-                            errorAnnotations.append(
-                                {ERROR_ANNOTATION_FIELD: annotation, ERROR_DOCUMENT_ID_FIELD: documentId,
-                                 ERROR_TYPE_FIELD: ANNOTATION_ERROR_TYPE,
-                                 ERROR_MESSAGE_FIELD: "Bucket doesnt contain a schema for schemaType:{0}".format(
-                                     annotation["schemaType"])})
-                        elif annotationId in annotationById:
-                            errorAnnotations.append(
-                                {ERROR_ANNOTATION_FIELD: annotation, ERROR_DOCUMENT_ID_FIELD: documentId,
-                                 ERROR_TYPE_FIELD: ANNOTATION_ERROR_TYPE,
-                                 ERROR_MESSAGE_FIELD: "Duplicate annotation ID."})
-                        else:
-
-                            if ANNOTATION_ID_FIELD in annotation:
-                                annotationById[annotationId] = annotation.copy()
-                                del annotation[ANNOTATION_ID_FIELD]
-                            else:
-                                annotationById[annotationId] = annotation
-
-                            recordToAdd = {}
-                            recordToAdd["_index"] = indicesPerType[annotation["schemaType"]]
-                            recordToAdd["_type"] = annotation["schemaType"]
-                            recordToAdd["_id"] = annotationId
-                            recordToAdd["_source"] = annotation
-                            bulkData.append(recordToAdd)
-                    except Exception as e:
-                        errorAnnotations.append(
-                            {ERROR_ANNOTATION_FIELD: annotation, ERROR_DOCUMENT_ID_FIELD: documentId,
-                             ERROR_TYPE_FIELD: ANNOTATION_ERROR_TYPE,
-                             ERROR_MESSAGE_FIELD: str(e)})
-                        logger.info({ERROR_ANNOTATION_FIELD: annotation, ERROR_DOCUMENT_ID_FIELD: documentId,
-                                     ERROR_TYPE_FIELD: ANNOTATION_ERROR_TYPE,
-                                     ERROR_MESSAGE_FIELD: str(e)})
-                        logger.info({"ERROR TRACEBACK": traceback.format_exc()})
-                try:
-                    helpers.bulk(es, bulkData)
-                except helpers.BulkIndexError as bie:
-                    for error in bie.errors:
-                        annotationError = {}
-                        if "index" in error:
-                            if "_id" in error["index"]:
-                                if error["index"]["_id"] in annotationById:
-                                    annotation = annotationById[error["index"]["_id"]]
-                                    documentId = None
-                                    if DOCUMENT_ID_FIELD in annotation:
-                                        documentId = annotation[DOCUMENT_ID_FIELD]
-                                    if "error" in error["index"]:
-                                        if "type" in error["index"]["error"] and "reason" in error["index"]["error"]:
-                                            if error["index"]["error"]["type"] == "strict_dynamic_mapping_exception":
-                                                annotationError = {ERROR_ANNOTATION_FIELD: annotation,
-                                                                   ERROR_DOCUMENT_ID_FIELD: documentId,
-                                                                   ERROR_TYPE_FIELD: ANNOTATION_ERROR_TYPE,
-                                                                   ERROR_MESSAGE_FIELD: "Annotation fields dont respect schema. "
-                                                                                        + error["index"]["error"][
-                                                                                            "reason"]}
-                                            else:
-                                                annotationError = {ERROR_ANNOTATION_FIELD: annotation,
-                                                                   ERROR_DOCUMENT_ID_FIELD: documentId,
-                                                                   ERROR_TYPE_FIELD: ANNOTATION_ERROR_TYPE,
-                                                                   ERROR_MESSAGE_FIELD: error["index"]["error"][
-                                                                       "reason"]}
-                                        else:
-                                            annotationError = {ERROR_ANNOTATION_FIELD: annotation,
-                                                               ERROR_DOCUMENT_ID_FIELD: documentId,
-                                                               ERROR_TYPE_FIELD: ANNOTATION_ERROR_TYPE,
-                                                               ERROR_MESSAGE_FIELD: error["index"]["error"]}
-
-                                    else:
-                                        annotationError = {ERROR_ANNOTATION_FIELD: annotation,
-                                                           ERROR_DOCUMENT_ID_FIELD: documentId,
-                                                           ERROR_TYPE_FIELD: ANNOTATION_ERROR_TYPE,
-                                                           ERROR_MESSAGE_FIELD: error["index"]}
-                        if annotationError:
-                            errorAnnotations.append(annotationError)
-                            logger.info(annotationError)
-                        else:
-                            errorAnnotations.append({ERROR_TYPE_FIELD: OTHER_ERROR_TYPE, "message": str(error)})
-                            logger.info({ERROR_TYPE_FIELD: OTHER_ERROR_TYPE, "message": str(error)})
-
-                except Exception as e:
-                    errorAnnotations.append({ERROR_TYPE_FIELD: OTHER_ERROR_TYPE, "message":
-                        "Bulk Insert Failed File: {0}\n{1}".format(name, str(e))})
-                    logger.error({ERROR_TYPE_FIELD: OTHER_ERROR_TYPE, "message":
-                        "Bulk Insert Failed File: {0}\n{1}".format(name, str(e))})
-                    logger.error({"ERROR TRACEBACK": traceback.format_exc()})
+                for errorItem, annotation in bulk_in_parallel(actions, chunkSize, maxChunkBytes, nbThreads):
+                    annotationError = _bulk_item_to_annotation_error(errorItem, annotation)
+                    logger.info(annotationError)
+                    add_error(annotationError)
             except Exception as e:
-                errorAnnotations.append({ERROR_TYPE_FIELD: OTHER_ERROR_TYPE, "message":
-                    "Failed to process file: {0}\n{1}".format(name, str(e))})
-                logger.error({ERROR_TYPE_FIELD: OTHER_ERROR_TYPE, "message":
-                    "Failed to process file: {0}\n{1}".format(name, str(e))})
+                add_error({ERROR_TYPE_FIELD: OTHER_ERROR_TYPE, ERROR_MESSAGE_FIELD:
+                    "Bulk Insert Failed File: {0}\n{1}".format(zipFilePath, str(e))})
                 logger.error({"ERROR TRACEBACK": traceback.format_exc()})
-
-            for error in errorAnnotations:
-                if len(errorsToReturn) < MAX_ERRORS_TO_RETURN:
-                    errorsToReturn.append(error)
-                else:
-                    break
+        logger.info("Annotations of {0} added to bucket {1} in {2:.1f}s".format(zipFilePath, bucketId,
+                                                                                 time.time() - start))
 
         if errorsToReturn:
-            return {"data": errorsToReturn, "totalErrorsCount": len(errorAnnotations)}
+            return {"data": errorsToReturn, "totalErrorsCount": totalErrorsCount}
         else:
             return None
 
-    def _save_annotations(self, annoByType: List[dict], fileStorage: HttpPostFileStorage, docId: str, bucketId: str):
-        for schemaType in annoByType:
-            fileStorage.add_json_file(annoByType[schemaType], "{0}.{1}.{2}.json".format(docId, bucketId, schemaType))
+    def _read_annotation_actions(self, z: zipfile.ZipFile, indicesPerType: dict, add_error, nbParseThreads: int,
+                                 add_items=None):
+        """
+        Generator of the bulk actions for all the annotations of the zip file.
+        Files are decoded and validated by nbParseThreads threads, a few files ahead of the consumer.
+
+        :param z:               Opened zip file
+        :param indicesPerType:  {schemaType: index} of the bucket
+        :param add_error:       Called with each error. Always called in the thread consuming the generator.
+        :param add_items:       If given, called with the number of valid annotations of each file
+        :return:                Generator of (action, annotation) as accepted by bulk_in_parallel
+        """
+        pending = deque()
+        names = iter(z.namelist())
+        with ThreadPoolExecutor(max_workers=nbParseThreads) as executor:
+            while True:
+                while len(pending) < nbParseThreads * 2:
+                    name = next(names, None)
+                    if name is None:
+                        break
+                    pending.append(executor.submit(_read_annotations_file, z, name, indicesPerType))
+                if not pending:
+                    break
+
+                actions, errors = pending.popleft().result()
+                for error in errors:
+                    add_error(error)
+                if add_items:
+                    add_items(len(actions))
+                yield from actions
 
     def __init__(self, envId: str, authorization: BaseAuthorization, corpusId: str):
         """
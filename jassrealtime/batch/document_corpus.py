@@ -1,9 +1,11 @@
 from ..security.base_authorization import BaseAuthorization
 from ..core.esutils import get_es_conn
+from ..core.metrics import batch_job
 from ..core.settings_utils import get_scan_scroll_duration, get_nb_documents_per_scan_scroll
 from elasticsearch import helpers
 from .http_post_file_storage import HttpPostFileStorage
 from .tmp_file_storage import TmpFileStorage
+from .stream_file_storage import StreamZipFileStorage
 from elasticsearch_dsl import Search, Q
 from jassrealtime.core.master_factory_list import get_master_document_corpus_list
 import logging
@@ -32,11 +34,20 @@ class DocumentCorpus:
                 generated. If exists, the existing file will be replaced.
         :return: path to the document in thee
         """
-        logger = logging.getLogger(__name__)
         self.tmpFileStorage = TmpFileStorage(zipFileName)
-        self.tmpFileStorage.create_zip_file()
+        self.write_documents_zip(self.tmpFileStorage)
+        return self.tmpFileStorage.zipPath
+
+    def write_documents_zip(self, fileStorage: StreamZipFileStorage):
+        """
+        Writes one text file per document of the corpus into the zip of fileStorage, then closes it.
+
+        :param fileStorage: Where to write the zip (temporary file, http response, upload...)
+        """
+        logger = logging.getLogger(__name__)
         es = get_es_conn()
         corpus = get_master_document_corpus_list(self.envId, self.authorization).get_corpus(self.corpusId)
+        fileStorage.create_zip_file()
         search = Search(using=es, index=corpus.languages_indices())
         search = search.source(["text"])
         search = search.params(scroll=get_scan_scroll_duration(), size=get_nb_documents_per_scan_scroll())
@@ -44,21 +55,21 @@ class DocumentCorpus:
         start = time.time()
         count = 0
         logger.info("Adding documents to zip: {0}".format(self.corpusId))
-        for result in search.scan():
-            self.tmpFileStorage.add_utf8_file(result.text, str(result.meta.id) + ".txt")
-            count += 1
-            if count % NB_OF_DOCUMENTS_TO_ADD_BEFORE_LOGGING == 0:
-                end = time.time()
-                logger.info("Time to add documents {0} to {1} : {2} seconds"
-                            .format(count - NB_OF_DOCUMENTS_TO_ADD_BEFORE_LOGGING, count, end - start))
-                start = end
+        with batch_job("documents_export") as add_items:
+            for result in search.scan():
+                fileStorage.add_utf8_file(result.text, str(result.meta.id) + ".txt")
+                add_items()
+                count += 1
+                if count % NB_OF_DOCUMENTS_TO_ADD_BEFORE_LOGGING == 0:
+                    end = time.time()
+                    logger.info("Time to add documents {0} to {1} : {2} seconds"
+                                .format(count - NB_OF_DOCUMENTS_TO_ADD_BEFORE_LOGGING, count, end - start))
+                    start = end
 
         end = time.time()
         logger.info("Time to add documents {0} to {1} : {2} seconds"
                     .format(count - count % NB_OF_DOCUMENTS_TO_ADD_BEFORE_LOGGING, count, end - start))
-        self.tmpFileStorage.close()
-
-        return self.tmpFileStorage.zipPath
+        fileStorage.close()
 
     def clear_temporary_files(self):
         if self.tmpFileStorage:
@@ -73,30 +84,10 @@ class DocumentCorpus:
         :return:
         """
 
-        # creates a zip file
-        logger = logging.getLogger(__name__)
-        fileStorage = HttpPostFileStorage(url, zipFileName)
-        fileStorage.create_zip_file()
-        es = get_es_conn()
-        corpus = get_master_document_corpus_list(self.envId, self.authorization).get_corpus(self.corpusId)
-        search = Search(using=es, index=corpus.languages_indices())
-        search = search.source(["text"])
-        search = search.params(scroll=get_scan_scroll_duration(), size=get_nb_documents_per_scan_scroll())
-
-        start = time.time()
-        count = 0
-        logger.info("Adding documents to zip: {0}".format(self.corpusId))
-        for result in search.scan():
-            fileStorage.add_utf8_file(result.text[0], str(result.meta.id) + ".txt")
-            count += 1
-            if count % NB_OF_DOCUMENTS_TO_ADD_BEFORE_LOGGING == 0:
-                end = time.time()
-                logger.info("Time to add documents {0} to {1} : {2} seconds"
-                            .format(count - NB_OF_DOCUMENTS_TO_ADD_BEFORE_LOGGING, count, end - start))
-                start = end
-
-        end = time.time()
-        logger.info("Time to add documents {0} to {1} : {2} seconds"
-                    .format(count - count % NB_OF_DOCUMENTS_TO_ADD_BEFORE_LOGGING, count, end - start))
-
-        fileStorage.flush(True, isSendPut, isMultipart, multipartFieldName)
+        # streams the zip to the url while it is created
+        fileStorage = HttpPostFileStorage(url, zipFileName, isSendPut, isMultipart, multipartFieldName)
+        try:
+            self.write_documents_zip(fileStorage)
+        except Exception:
+            fileStorage.abort()
+            raise
@@ -1,64 +1,152 @@
-import os, errno, zipfile, json
+import queue
+import threading
 from uuid import uuid1
-from enum import Enum, unique
-from ..core.esutils import get_settings
-from ..core.settings_utils import get_jass_tmp_dir
-from ..core.utils import utf8_json_dump
+from ..core.utils import put_unless_stopped, StoppedException
 import requests
-import mmap
-from .tmp_file_storage import TmpFileStorage
+from .stream_file_storage import StreamZipFileStorage, ChunkedStream
 
 
 class UploadUrlFailException(Exception):
     pass
 
 
-class HttpPostFileStorage(TmpFileStorage):
+_END_OF_UPLOAD = object()
+_ABORT_UPLOAD = object()
+
+
+class _UploadStream(ChunkedStream):
+    """
+    Sends the chunks written to it as the body of a chunked http request, made in a separate thread.
+    The request starts with the first chunk, so nothing is sent while the stream is empty.
+    """
+
+    def __init__(self, postUrl: str, zipFileName: str, isSendPut: bool, isMultipart: bool, multipartFieldName: str):
+        super().__init__()
+        self.postUrl = postUrl
+        self.zipFileName = zipFileName
+        self.isSendPut = isSendPut
+        self.isMultipart = isMultipart
+        self.multipartFieldName = multipartFieldName
+        self.chunks = queue.Queue(maxsize=4)
+        self.uploadDone = threading.Event()
+        self.uploadThread = None
+        self.error = None
+
+    def send_chunk(self, chunk: bytes):
+        if not self.uploadThread:
+            self.uploadThread = threading.Thread(target=self._upload, daemon=True)
+            self.uploadThread.start()
+        try:
+            put_unless_stopped(self.chunks, chunk, self.uploadDone)
+        except StoppedException:
+            self._raise_error("Upload ended before the end of the file")
+
+    def end(self):
+        """
+        Waits for the end of the upload.
+
+        :raise UploadUrlFailException: if the upload failed
+        """
+        if not self.uploadThread:
+            return
+        try:
+            put_unless_stopped(self.chunks, _END_OF_UPLOAD, self.uploadDone)
+        except StoppedException:
+            pass
+        self.uploadThread.join()
+        if self.error:
+            self._raise_error()
+
+    def abort(self):
+        """
+        Interrupts the upload, the server receives an incomplete request.
+        """
+        if self.uploadThread:
+            try:
+                put_unless_stopped(self.chunks, _ABORT_UPLOAD, self.uploadDone)
+            except StoppedException:
+                pass
+            self.uploadThread.join()
+
+    def _raise_error(self, defaultMessage: str = None):
+        if isinstance(self.error, UploadUrlFailException):
+            raise self.error
+        raise UploadUrlFailException(self.error or defaultMessage)
+
+    def _upload(self):
+        try:
+            if self.isMultipart:
+                boundary = uuid1().hex
+                headers = {'Content-Type': 'multipart/form-data; boundary=' + boundary}
+                body = self._multipart_body(boundary)
+            else:
+                headers = {'Content-Type': 'application/octet-stream'}
+                body = self._body()
+            method = "put" if self.isSendPut and not self.isMultipart else "post"
+            resp = requests.request(method, self.postUrl, data=body, headers=headers)
+            if not (resp.status_code == 200 or resp.status_code == 201 or resp.status_code == 204):
+                self.error = UploadUrlFailException(resp.content)
+        except requests.exceptions.MissingSchema as e:
+            self.error = UploadUrlFailException(e)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.uploadDone.set()
+
+    def _body(self):
+        while True:
+            chunk = self.chunks.get()
+            if chunk is _END_OF_UPLOAD:
+                return
+            if chunk is _ABORT_UPLOAD:
+                raise UploadUrlFailException("Upload aborted")
+            yield chunk
+
+    def _multipart_body(self, boundary: str):
+        yield '--{0}\r\nContent-Disposition: form-data; name="{1}"; filename="{2}"\r\n' \
+              'Content-Type: application/zip\r\n\r\n'.format(boundary, self.multipartFieldName,
+                                                                self.zipFileName).encode("utf-8")
+        yield from self._body()
+        yield '\r\n--{0}--\r\n'.format(boundary).encode("utf-8")
+
+
+class HttpPostFileStorage(StreamZipFileStorage):
     """
-    This class sends creates a zip and sends it via post to a target url.
-    This class assumes full control of the temporary folder : get_jass_tmp_upload_folder()
+    This class creates a zip and streams it to a target url while it is being written, without temporary file.
     """
-    tmpFileStorage = None
 
-    def __init__(self, postUrl: str, zipFileName: str = None):
+    def __init__(self, postUrl: str, zipFileName: str = None, isSendPut=False, isMultipart: bool = True,
+                 multipartFieldName: str = "file", removeEmpty: bool = True):
         """
         :param postUrl: Url to post the file to
         :param zipFileName: Name of the zip file containing all the files.
             Needs to be alphanumeric with -_.
+        :param isSendPut: If true, use put instead of post
+        :param isMultipart: If true, upload using form multipart, else send the zip as the request body
+        :param multipartFieldName: If isMultipart, name of the form field to which send the file.
+        :param removeEmpty: If true and zip is empty, nothing is sent
         """
-        super().__init__(zipFileName)
         self.postUrl = postUrl
+        self.zipFileName = zipFileName or str(uuid1()) + ".zip"
+        self.removeEmpty = removeEmpty
+        super().__init__(_UploadStream(postUrl, self.zipFileName, isSendPut, isMultipart, multipartFieldName))
 
-    def flush(self, removeEmpty: bool = True, isSendPut=False, isMultipart: bool = True,
-              multipartFieldName: str = "file"):
+    def close(self):
         """
-        Sends zip to the real storage and deletes it locally.
-        :param removeEmpty: If true and zip is empty, delete zip without sending
-        :param isSendPut: If true, use put instead of post
-        :param isMultipart: If true, upload using form multipart, else use urlencode
-        :param multipartFieldName: If isMultipart, name of the form field to which send the file.
-        :return:
+        Ends the zip and waits until it is completely sent.
+        :raise UploadUrlFailException: if the upload failed
         """
-
+        if self.zf and self.removeEmpty and self.nbFiles == 0 and not self.stream.started:
+            # Nothing was sent yet: end the zip without sending its end record, the upload never starts
+            self.zf.close()
+            self.zf = None
+            self.stream.abort()
+            return
         super().close()
-        if removeEmpty and self.is_zip_empty():
-            os.remove(self.zipPath)
-        else:
-            f = open(self.zipPath, 'rb')
-            try:
-                resp = None
-                if (isMultipart):
-                    resp = requests.post(self.postUrl,
-                                         files={multipartFieldName: (self.zipFileName, f)})
-                else:
-                    if (isSendPut):
-                        resp = requests.put(self.postUrl, data=f, headers={'Content-Type': 'application/octet-stream'})
-                    else:
-                        resp = requests.post(self.postUrl, data=f, headers={'Content-Type': 'application/octet-stream'})
-                if not (resp.status_code == 200 or resp.status_code == 201 or resp.status_code == 204):
-                    raise UploadUrlFailException(resp.content)
-            except requests.exceptions.MissingSchema as e:
-                raise UploadUrlFailException(e)
-            # remove the file
-            f.close()
-            self.clear()
+
+    def abort(self):
+        """
+        Interrupts the upload, for instance when the zip could not be completely written.
+        """
+        self.zf = None
+        self.stream.abort()
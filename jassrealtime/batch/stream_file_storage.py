@@ -0,0 +1,98 @@
+import zipfile
+from ..core.utils import utf8_json_dump
+
+# Bytes sent at a time by a ChunkedStream
+STREAM_CHUNK_SIZE = 65536
+
+
+class ChunkedStream:
+    """
+    Write only, non seekable stream which forwards what is written in chunks of at least STREAM_CHUNK_SIZE bytes.
+    Sub classes define where chunks are sent (http response, upload ...).
+    """
+
+    def __init__(self, chunkSize: int = STREAM_CHUNK_SIZE):
+        self.chunkSize = chunkSize
+        self.buffer = bytearray()
+        self.started = False
+
+    def write(self, data: bytes):
+        self.buffer += data
+        if len(self.buffer) >= self.chunkSize:
+            self._send_buffer()
+        return len(data)
+
+    def flush(self):
+        # zipfile flushes after every entry. Chunks are only sent once big enough.
+        pass
+
+    def close(self):
+        """
+        Sends what remains in the buffer and ends the stream.
+        """
+        if self.buffer:
+            self._send_buffer()
+        self.end()
+
+    def _send_buffer(self):
+        chunk = bytes(self.buffer)
+        self.buffer = bytearray()
+        self.started = True
+        self.send_chunk(chunk)
+
+    def send_chunk(self, chunk: bytes):
+        raise NotImplementedError()
+
+    def end(self):
+        pass
+
+
+class StreamZipFileStorage:
+    """
+    Writes a zip file entry by entry into a stream, without any temporary file.
+    The stream only needs write and flush methods, it doesn't need to be seekable.
+    """
+
+    def __init__(self, stream=None):
+        """
+        :param stream: Stream to write the zip to. Closed with the zip.
+        """
+        self.stream = stream
+        self.zf = None
+        self.nbFiles = 0
+
+    def create_zip_file(self):
+        """
+        Starts a new zip in the stream.
+        """
+        if self.zf:
+            self.zf.close()
+        self.zf = zipfile.ZipFile(self.stream, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True)
+        self.nbFiles = 0
+
+    def add_json_file(self, jsonData: dict, workFileName: str):
+        """
+        Adds a json file to zip
+
+        :param jsonData: data to save as json
+        :param workFileName: name of the file to add to zip. Needs to be alphanumeric with -_.
+        """
+        self.add_utf8_file(utf8_json_dump(jsonData), workFileName)
+
+    def add_utf8_file(self, data: str, workFileName: str):
+        """
+        Adds a utf8 file to zip
+        :param data: data to save as file
+        :param workFileName: name of the file to add to zip. Needs to be alphanumeric with -_.
+        """
+        self.zf.writestr(workFileName, data)
+        self.nbFiles += 1
+
+    def close(self):
+        """
+        Writes the end of the zip and closes the stream.
+        """
+        if self.zf:
+            self.zf.close()
+            self.zf = None
+            self.stream.close()
@@ -3,12 +3,10 @@ from uuid import uuid1
 from enum import Enum, unique
 from ..core.esutils import get_settings
 from ..core.settings_utils import get_jass_tmp_dir
-from ..core.utils import utf8_json_dump
+from .stream_file_storage import StreamZipFileStorage
 
-UNCOMPRESSED_FLUSH_FILE_SIZE = 1000000000
 
-
-class TmpFileStorage:
+class TmpFileStorage(StreamZipFileStorage):
     """
     This class is used to abstract a file storage system used by Jass,
     """
@@ -17,68 +15,24 @@ class TmpFileStorage:
         """
         Create a a file in temporary directory.
         """
+        super().__init__()
         sett = get_settings()
         self.tmpDirPath = get_jass_tmp_dir()
         self.mkdir_p(self.tmpDirPath)
         self.zipFileName = zipFileName
         if (not zipFileName):
             self.zipFileName = str(uuid1()) + ".zip"
-        self.zf = None
 
     def create_zip_file(self):
         """
         Creates a zip file in a temporary folder. If a zip file with the same name exists,
-         it will attempt to overwrite it. Please note that
+         it will attempt to overwrite it. The zip stays open until close is called.
         """
         self.close()
 
         self.zipPath = os.path.join(self.tmpDirPath, self.zipFileName)
-        zf = zipfile.ZipFile(self.zipPath, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True)
-        zf.close()
-        self.fileSizeNotSaved = 0
-
-    def add_json_file(self, jsonData: dict, workFileName: str):
-        """
-        Creates a new file and adds it to zip.
-
-        :param workFilePath:
-        :return:
-        """
-        self._open_zip()
-        data = utf8_json_dump(jsonData)
-        self.zf.writestr(workFileName, data)
-        self._flush(len(data))
-
-    def add_utf8_file(self, data: str, workFileName: str):
-        """
-        Adds a utf8 file to zip
-        :param data: data to save as file
-        :param workFileName: name of the file to add to zip. Needs to be alphanumeric with -_.
-        :return:
-        """
-        self._open_zip()
-        self.zf.writestr(workFileName, data)
-        self._flush(len(data))
-
-    def _open_zip(self):
-        if not self.zf:
-            self.zf = zipfile.ZipFile(self.zipPath, "a", compression=zipfile.ZIP_DEFLATED, allowZip64=True)
-
-    def _flush(self, fileSize=-1):
-        if fileSize != -1:
-            self.fileSizeNotSaved += fileSize
-            if self.fileSizeNotSaved > UNCOMPRESSED_FLUSH_FILE_SIZE:
-                self.fileSizeNotSaved = 0
-                self.close()
-                self._open_zip()
-        else:
-            self.close()
-            self._open_zip()
-
-    def close(self):
-        if self.zf:
-            self.zf.close()
-        self.zf = None
+        self.stream = open(self.zipPath, "wb")
+        super().create_zip_file()
 
     def is_zip_empty(self):
         zf = zipfile.ZipFile(self.zipPath)
@@ -0,0 +1,156 @@
+# coding: utf-8
+
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Thread safe in memory dictionary in which every entry expires after a fixed number of seconds.
+    Used to avoid re-reading rarely modified elastic search documents (ex: index names) on every request.
+    Each process has its own cache, so entries modified by another process are seen only once they expire.
+    """
+
+    def __init__(self, ttl: float, maxSize: int = 0):
+        """
+        :param ttl:     Number of seconds an entry stays valid. If 0 or less nothing is cached.
+        :param maxSize: Maximum number of entries, the oldest ones are removed when it is exceeded. If 0 or less the
+                        number of entries is only bounded by expiration.
+        """
+        self.ttl = ttl
+        self.maxSize = maxSize
+        # in insertion order: entries having the ttl of the cache expire in that order, they are swept from the start
+        self._entries = OrderedDict()
+        # (expiresAt, n, key) of the entries having a shorter ttl, which may expire before older entries
+        self._shortEntries = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Returns the value associated to key, or default if key is absent or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expiresAt = entry
+            if expiresAt < time.monotonic():
+                del self._entries[key]
+                return default
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        """
+        :param ttl: Number of seconds this entry stays valid, if less than the ttl of the cache. If 0 or less the
+                    entry is not cached.
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            self._entries.pop(key, None)
+            now = time.monotonic()
+            self._sweep(now)
+            if ttl <= 0:
+                return
+            self._entries[key] = (value, now + ttl)
+            if ttl < self.ttl:
+                heapq.heappush(self._shortEntries, (now + ttl, next(self._counter), key))
+            if self.maxSize > 0:
+                while len(self._entries) > self.maxSize:
+                    self._entries.popitem(last=False)
+
+    def _sweep(self, now: float):
+        # entries expire on read, the ones which are never read again are removed here
+        while self._entries:
+            value, expiresAt = next(iter(self._entries.values()))
+            if expiresAt >= now:
+                break
+            self._entries.popitem(last=False)
+        while self._shortEntries and self._shortEntries[0][0] < now:
+            expiresAt, n, key = heapq.heappop(self._shortEntries)
+            entry = self._entries.get(key)
+            # the entry may have been replaced or removed since
+            if entry is not None and entry[1] == expiresAt:
+                del self._entries[key]
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_matching(self, predicate):
+        """
+        Removes all entries whose key satisfies the predicate.
+
+        :param predicate: function(key) -> bool
+        """
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._shortEntries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class LRUCache:
+    """
+    Thread safe in memory dictionary keeping at most maxSize entries: when full, the least recently used entry is
+    removed. Entries don't expire, so it is meant for values which never change once stored (ex: json schemas).
+    """
+
+    def __init__(self, maxSize: int):
+        """
+        :param maxSize: Maximum number of entries. If 0 or less nothing is cached.
+        """
+        self.maxSize = maxSize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Returns the value associated to key, or default if key is absent.
+        """
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key, value):
+        if self.maxSize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxSize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_matching(self, predicate):
+        """
+        Removes all entries whose key satisfies the predicate.
+
+        :param predicate: function(key) -> bool
+        """
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,85 @@
+# coding: utf-8
+
+# Process wide catalog of the metadata read to resolve entities on almost every request: document directories,
+# corpora and buckets. Without it, getting a bucket reads the master bucket directory, the bucket document and the
+# bucket directory from elastic search, and getting a corpus reads a few more.
+# The methods creating, modifying or deleting these entities write through the catalog of their process, and entries
+# expire after JASS_CATALOG_TTL seconds, which bounds how long modifications made by other processes go unseen.
+# Doc type to index mappings and schema bindings have their own caches, see
+# document_directory.invalidate_type_index_cache and corpus_structure.
+
+import copy
+import threading
+
+from .cache import TTLCache
+from .settings_utils import get_catalog_ttl
+
+# Kinds of entities
+DIRECTORY = "directory"
+CORPUS = "corpus"
+BUCKET = "bucket"
+
+
+class MetadataCatalog:
+    """
+    Metadata of the entities of every env, keyed by (envId, kind, id). Only existing entities are cataloged.
+    """
+
+    def __init__(self, ttl: float):
+        """
+        :param ttl: Number of seconds an entry stays valid. If 0 or less nothing is cached.
+        """
+        self._entries = TTLCache(ttl)
+        # envId -> version, incremented on every write, and clear count. Entries loaded while their env was written
+        # to are not cataloged, since they may predate the write.
+        self._versions = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def version(self, envId: str) -> tuple:
+        with self._lock:
+            return self._generation, self._versions.get(envId, 0)
+
+    def get(self, envId: str, kind: str, id: str, load):
+        """
+        Returns the metadata of an entity, loading it if it is not cataloged.
+
+        :param load:    function() -> metadata read from elastic search. Should raise if the entity doesn't exist.
+        :return:        A copy of the metadata, which the caller may modify
+        """
+        key = (envId, kind, id)
+        value = self._entries.get(key)
+        if value is None:
+            version = self.version(envId)
+            value = load()
+            with self._lock:
+                if (self._generation, self._versions.get(envId, 0)) == version:
+                    self._entries.set(key, value)
+        return copy.deepcopy(value)
+
+    def put(self, envId: str, kind: str, id: str, value):
+        """
+        Catalogs the metadata of an entity which was just created or modified.
+        """
+        with self._lock:
+            self._bump(envId)
+            self._entries.set((envId, kind, id), copy.deepcopy(value))
+
+    def remove(self, envId: str, kind: str, id: str):
+        """
+        Removes an entity which was deleted or modified.
+        """
+        with self._lock:
+            self._bump(envId)
+            self._entries.delete((envId, kind, id))
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def _bump(self, envId: str):
+        self._versions[envId] = self._versions.get(envId, 0) + 1
+
+
+CATALOG = MetadataCatalog(get_catalog_ttl())
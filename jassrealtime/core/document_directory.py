@@ -2,15 +2,18 @@
 
 from elasticsearch import helpers, exceptions
 from elasticsearch_dsl import Search, Q
-import time
+from contextlib import contextmanager
+import threading
 import traceback
 from typing import List, Dict
 
 from jassrealtime.core.utils import gen_uuid
+from jassrealtime.core.cache import TTLCache
+from jassrealtime.core.catalog import CATALOG, DIRECTORY
 from .schema_list import *
 from .esutils import *
 from .settings_utils import get_scan_scroll_duration, get_number_of_replicas, get_number_of_shards, \
-    get_nb_documents_per_scan_scroll
+    get_nb_documents_per_scan_scroll, get_type_index_cache_ttl, get_settings, get_max_result_window
 
 ANALYSIS_FILTER = {
     "ngram_filter": {
@@ -65,7 +68,106 @@ ANALYSIS = {
     "tokenizer": ANALYSIS_TOKENIZER
 }
 
-MAX_RESULT_WINDOW = 500000
+MAX_RESULT_WINDOW = get_max_result_window()
+
+# Process wide cache of the content of the type indices.
+# Keys are (typeIndex, docType) -> indexName, and (typeIndex, None) -> {docType: indexName} for the whole directory.
+_TYPE_INDEX_CACHE = TTLCache(get_type_index_cache_ttl())
+
+
+def invalidate_type_index_cache(typeIndex: str = None, docType: str = None):
+    """
+    Removes cached doc type to index mappings.
+
+    :param typeIndex:   Type index of the directory. If None the whole cache is cleared.
+    :param docType:     Doc type to invalidate. If None all doc types of the directory are invalidated.
+    """
+    if typeIndex is None:
+        _TYPE_INDEX_CACHE.clear()
+    elif docType is None:
+        _TYPE_INDEX_CACHE.delete_matching(lambda key: key[0] == typeIndex)
+    else:
+        _TYPE_INDEX_CACHE.delete((typeIndex, docType))
+        _TYPE_INDEX_CACHE.delete((typeIndex, None))
+
+
+# Number of bulk loads currently using each index in this process: {indexName: nbLoads}.
+# Concurrent loads on the same index share the bulk load settings, which are restored by the last one to finish.
+_BULK_LOAD_INDICES = {}
+_BULK_LOAD_LOCK = threading.Lock()
+
+BULK_LOAD_SETTINGS = {"index.refresh_interval": "-1", "index.number_of_replicas": "0"}
+
+
+def get_bulk_load_restored_settings() -> dict:
+    """
+    Settings restored at the end of a bulk load: the ones data indices are created with.
+    The settings read before the load are not used, since they may be the bulk load settings of a load running in
+    another process.
+    """
+    # None resets the refresh interval to the elastic search default
+    return {"index.refresh_interval": None, "index.number_of_replicas": str(get_number_of_replicas())}
+
+
+def is_index_not_found(error: exceptions.TransportError) -> bool:
+    """
+    Returns true if the elastic search error was caused by a missing index (as opposed to a missing document).
+    """
+    return error.error == "index_not_found_exception"
+
+
+def _enter_bulk_load_mode(indices: List[str]):
+    """
+    Applies BULK_LOAD_SETTINGS to the indices which are not already in bulk load mode in this process.
+    """
+    if not indices:
+        return
+    with _BULK_LOAD_LOCK:
+        newIndices = [index for index in indices if index not in _BULK_LOAD_INDICES]
+        for index in indices:
+            _BULK_LOAD_INDICES[index] = _BULK_LOAD_INDICES.get(index, 0) + 1
+
+    if newIndices:
+        try:
+            get_es_conn().indices.put_settings(index=",".join(newIndices), body=BULK_LOAD_SETTINGS)
+        except Exception:
+            try:
+                _exit_bulk_load_mode(indices)
+            except DocumentDirectoryException:
+                # already logged
+                pass
+            raise
+
+
+def _exit_bulk_load_mode(indices: List[str]):
+    """
+    Restores the settings of the indices no longer used by any bulk load of this process and refreshes them.
+    Every index is restored even if restoring another one failed.
+    """
+    if not indices:
+        return
+    with _BULK_LOAD_LOCK:
+        restoredIndices = []
+        for index in indices:
+            _BULK_LOAD_INDICES[index] -= 1
+            if _BULK_LOAD_INDICES[index] <= 0:
+                del _BULK_LOAD_INDICES[index]
+                restoredIndices.append(index)
+
+    logger = logging.getLogger(__name__)
+    es = get_es_conn()
+    restoredSettings = get_bulk_load_restored_settings()
+    failedIndices = []
+    for index in restoredIndices:
+        try:
+            es.indices.put_settings(index=index, body=restoredSettings)
+            es.indices.refresh(index=index)
+        except Exception:
+            logger.error("Failed to restore settings {0} of index {1}\n{2}".format(
+                restoredSettings, index, traceback.format_exc()))
+            failedIndices.append(index)
+    if failedIndices:
+        raise DocumentDirectoryException("Failed to restore settings of indices: {0}".format(failedIndices))
 
 
 class DocumentDirectoryException(Exception):
@@ -117,6 +219,21 @@ class CriticalDeleteIndexFailIndexNameTooShort(DocumentDirectoryException):
     pass
 
 
+def _bulk_item_to_exception(errorItem: dict, id: str) -> DocumentDirectoryException:
+    """
+    Converts the item of a failed bulk create into the exception add_document would have raised.
+    """
+    result = next(iter(errorItem.values()))
+    error = result.get("error")
+    if result.get("status") == 409:
+        return DocumentAlreadyExistsException("Document id: {0}".format(id))
+    if isinstance(error, dict):
+        if error.get("type") == "strict_dynamic_mapping_exception":
+            return DocumentDoesNotRespectSchemaException("Document id: {0}".format(id))
+        error = error.get("reason")
+    return DocumentDirectoryException("Document id: {0}. {1}".format(id, error or result))
+
+
 class DocumentDirectoryList:
     """
     Responsible for managing a list of document directories. Contains a list of all document directories
@@ -156,12 +273,11 @@ class DocumentDirectoryList:
 
         masterList = DocumentDirectoryList(envId, sett, authorization)
 
-        es = get_es_conn()
         body = {"settings": {}}
         body["settings"]["index"] = {"number_of_shards": get_number_of_shards(),
                                      "number_of_replicas": get_number_of_replicas()}
         if check_index_name_valid_for_create(masterList.masterDirectoryIndex, masterList.envId, ""):
-            es.indices.create(masterList.masterDirectoryIndex, body=body)
+            es_create_index(masterList.masterDirectoryIndex, body=body)
         else:
             logger.log("Invalid master directory name {0}".format(masterList.masterDirectoryIndex))
             raise DocumentDirectoryException(
@@ -182,7 +298,6 @@ class DocumentDirectoryList:
             for dd in directoriesList:
                 self.delete_document_directory(dd)
 
-            es = get_es_conn()
             es_wait_ready()
             delete_indices(self.masterDirectoryIndex, self.envId, self.classPrefix)
         else:
@@ -270,23 +385,18 @@ class DocumentDirectoryList:
             es.create(index=self.masterDirectoryIndex, doc_type=self.directoryDocType, id=id, body=body)
             if check_index_name_valid_for_create(defaultDataIndex, self.envId, self.classPrefix) and \
                     check_index_name_valid_for_create(typeIndex, self.envId, self.classPrefix):
-                es_wait_ready()
-                es.indices.create(defaultDataIndex, body=setting_body)
-                es_wait_ready()
-                es.indices.create(typeIndex, body=setting_body)
+                es_create_index(defaultDataIndex, body=setting_body)
+                es_create_index(typeIndex, body=setting_body)
             else:
                 logger.error("One of the indexes is invalid {0},{1},{2}".format(id, defaultDataIndex, typeIndex))
                 raise ESInvalidIndexName(
                     "One of the indexes is invalid {0},{1},{2}".format(id, defaultDataIndex, typeIndex))
-            # wait 1 second in order to make sure that document directory is well created
-            time.sleep(1)
             es.create(index=typeIndex, doc_type="directory_type", id="default", body={"indexName": defaultDataIndex})
         else:
             typeIndex = self.envId + self.classPrefix + id + self.indexTypeSuffix
             es.create(index=self.masterDirectoryIndex, doc_type=self.directoryDocType, id=id, body=body)
             if check_index_name_valid_for_create(typeIndex, self.envId, self.classPrefix):
-                es_wait_ready()
-                es.indices.create(typeIndex, body=setting_body)
+                es_create_index(typeIndex, body=setting_body)
             else:
                 logger.error("One of the indexes is invalid {0},{1}".format(id, typeIndex))
                 raise ESInvalidIndexName(
@@ -296,6 +406,7 @@ class DocumentDirectoryList:
         else:
             logger.info("Document '{0}' created without alias".format(alias, id))
 
+        CATALOG.put(self.envId, DIRECTORY, id, True)
         return DocumentsDirectory(id, alias, self)
 
     def delete_document_directory(self, dd):
@@ -305,6 +416,7 @@ class DocumentDirectoryList:
         """
         es = get_es_conn()
         errorMessage = ""
+        CATALOG.remove(self.envId, DIRECTORY, dd.id)
         # delete from master index
         try:
             es_wait_ready()
@@ -325,27 +437,52 @@ class DocumentDirectoryList:
         except:
             errorMessage = errorMessage + traceback.format_exc()
 
+        invalidate_type_index_cache(dd.typeIndex)
         if errorMessage:
             raise DocumentDirectoryFailedToDelete(errorMessage)
 
     def get_directory(self, id: str):
         """
         Returns a document directory object associatged with directoryName.
-        Throwsn an exception if not found.
+        Throwsn an exception if not found. Existing directories are kept in the catalog.
 
         :param id:              Unique Id of the directory.
         :return:
         """
-        es = get_es_conn()
-        esres = {}
-        try:
-            esres = es.get(index=self.masterDirectoryIndex, doc_type=self.directoryDocType, id=id)
-        except exceptions.NotFoundError:
-            raise DocumentDirectoryDoesntExistsException()
 
+        def directory_exists():
+            try:
+                get_es_conn().get(index=self.masterDirectoryIndex, doc_type=self.directoryDocType, id=id)
+            except exceptions.NotFoundError:
+                raise DocumentDirectoryDoesntExistsException()
+            return True
+
+        CATALOG.get(self.envId, DIRECTORY, id, directory_exists)
         # TODO Add Alias.
         return DocumentsDirectory(id, None, self)
 
+    def get_documents_count_per_directory(self, ids: List[str]) -> Dict[str, int]:
+        """
+        Returns the number of documents of many directories with one request, whatever their number of doc types.
+        Data indices are named <dataIndexPrefix>_<uuid or default suffix>, so each index is matched to its
+        directory by name, without reading the type index of every directory.
+        Directories should not contain nested fields, see get_documents_count_per_index.
+
+        :param ids:     Ids of the directories
+        :return:        {directoryId: number of documents}
+        """
+        idsPerDataIndexPrefix = {DocumentsDirectory(id, None, self).dataIndexPrefix: id for id in ids}
+        counts = dict.fromkeys(ids, 0)
+        if not ids:
+            return counts
+
+        allDataIndices = self.envId + self.classPrefix + "*" + self.indexDataSuffix + "_*"
+        for indexName, count in get_documents_count_per_index(allDataIndices).items():
+            id = idsPerDataIndexPrefix.get(indexName.rsplit("_", 1)[0])
+            if id is not None:
+                counts[id] += count
+        return counts
+
 
 def remove_non_settable_fields(fields: List[str], collection: Dict[str, str]) -> None:
     for field in fields:
@@ -405,14 +542,39 @@ class DocumentsDirectory:
                 res = s.execute()
                 return (len(res.hits.hits) > 0)
             else:
-                res = es.get(index=self.typeIndex, doc_type="directory_type", id=docType)
-                indexName = res["_source"]["indexName"]
+                indexName = self.get_index_name(docType)
                 doc = es.get(index=indexName, id=id, doc_type=docType)
 
             return True
-        except exceptions.NotFoundError:
+        except exceptions.NotFoundError as e:
+            if indexName and is_index_not_found(e):
+                invalidate_type_index_cache(self.typeIndex, docType)
             return False
 
+    def get_index_name(self, docType: str = "default") -> str:
+        """
+        Returns the name of the data index containing documents of docType.
+        The mapping is cached for the whole process, see invalidate_type_index_cache.
+        Raises exceptions.NotFoundError if the doc type doesn't exist.
+
+        :param docType:     Type of the document.
+        :return:            name of the index
+        """
+        indexName = _TYPE_INDEX_CACHE.get((self.typeIndex, docType))
+        if indexName is not None:
+            return indexName
+
+        indicesPerDocType = _TYPE_INDEX_CACHE.get((self.typeIndex, None))
+        if indicesPerDocType is not None and docType in indicesPerDocType:
+            indexName = indicesPerDocType[docType]
+        else:
+            es = get_es_conn()
+            res = es.get(index=self.typeIndex, doc_type="directory_type", id=docType)
+            indexName = res["_source"]["indexName"]
+
+        _TYPE_INDEX_CACHE.set((self.typeIndex, docType), indexName)
+        return indexName
+
     def get_indices(self, docTypes: List = ["default"]) -> str:
         """
         Returns a list of all indexes for the given doc types.
@@ -421,28 +583,29 @@ class DocumentsDirectory:
         :return:                A string representing indexes to search. (will use * to regroup multiple indices)
         """
 
-        es = get_es_conn()
-
         indexNamesStr = ""
         if docTypes:
-            s = Search(using=es, index=self.typeIndex, doc_type="directory_type").query("ids", values=docTypes)
-            s = s.params(scroll=get_scan_scroll_duration(), size=get_nb_documents_per_scan_scroll())
-
-            indexNamesQuery = s.source(["indexName"])
-            indexNamesArr = []
-            for indexNamePart in indexNamesQuery.scan():
-                indexNamesArr.append(indexNamePart["indexName"])
+            indicesPerDocType = self.get_indices_per_doc_type(docTypes)
+            indexNamesArr = [indicesPerDocType[docType] for docType in docTypes if docType in indicesPerDocType]
             indexNamesStr = ','.join(indexNamesArr)
         else:
             indexNamesStr = self.dataIndexPrefix + "*"
 
         return indexNamesStr
 
-    def get_indices_per_doc_type(self):
+    def get_indices_per_doc_type(self, docTypes: List[str] = None):
         """
         Return a list of es indexes per doc type.
+        The result is cached for the whole process, see invalidate_type_index_cache.
+
+        :param docTypes:    Doc types which should be present. If one of them is not cached, the cache is re-read, since
+                            the doc type may have been created by another process.
         :return: {<docType1> ; <index1>, ...}.
         """
+        indicesPerDocType = _TYPE_INDEX_CACHE.get((self.typeIndex, None))
+        if indicesPerDocType is not None and all(docType in indicesPerDocType for docType in docTypes or []):
+            return dict(indicesPerDocType)
+
         es = get_es_conn()
 
         s = Search(using=es, index=self.typeIndex, doc_type="directory_type")
@@ -452,7 +615,39 @@ class DocumentsDirectory:
         for res in indexNamesQuery.scan():
             indicesPerDocType[res.meta.id] = res["indexName"]
 
-        return indicesPerDocType
+        _TYPE_INDEX_CACHE.set((self.typeIndex, None), indicesPerDocType)
+        return dict(indicesPerDocType)
+
+    @contextmanager
+    def bulk_load_mode(self, docTypes: List[str] = None):
+        """
+        Context manager which disables refreshes and replicas of the doc type indices while loading many documents.
+        The settings the indices are created with are restored and indices are refreshed on exit, even if the load
+        failed. See get_bulk_load_restored_settings.
+
+        Usage:
+            with dd.bulk_load_mode(["token"]):
+                ... bulk load ...
+
+        :param docTypes:    Doc types to load. If None, all doc types of the directory.
+        """
+        indicesPerDocType = self.get_indices_per_doc_type(docTypes)
+        if docTypes is None:
+            docTypes = indicesPerDocType.keys()
+        indices = sorted(set(indicesPerDocType[docType] for docType in docTypes if docType in indicesPerDocType))
+
+        _enter_bulk_load_mode(indices)
+        loadFailed = True
+        try:
+            yield
+            loadFailed = False
+        finally:
+            try:
+                _exit_bulk_load_mode(indices)
+            except DocumentDirectoryException:
+                # already logged, do not hide the error of the load itself
+                if not loadFailed:
+                    raise
 
     def empty_doc_type(self, docType: str):
         """
@@ -482,10 +677,11 @@ class DocumentsDirectory:
         # recreate index
         # Remove non settable fields (if they are present, it causes an unknown setting exception)
         remove_non_settable_fields(["creation_date", "provided_name", "uuid", "version"], body['settings']['index'])
-        es.indices.create(index, body=body)
+        es_create_index(index, body=body)
 
         # remap index.
         es.create(index=self.typeIndex, doc_type="directory_type", id=docType, body={"indexName": index})
+        invalidate_type_index_cache(self.typeIndex, docType)
 
     def delete_doc_type(self, docType):
         """
@@ -506,6 +702,7 @@ class DocumentsDirectory:
 
         # remove index from the type reference,
         es.delete(index=self.typeIndex, doc_type="directory_type", id=docType)
+        invalidate_type_index_cache(self.typeIndex, docType)
 
     def small_search(self, docTypes: List = ["default"], matchFields: dict = {}, termFields: dict = {},
                      returnFields: List = None, filterMatch={}, filterTerms={}, useScan=True):
@@ -526,8 +723,6 @@ class DocumentsDirectory:
         :return:
         """
 
-        es = get_es_conn()
-
         indexNamesStr = self.get_indices(docTypes)
         if indexNamesStr:
             return multi_indexes_small_search(indexNamesStr, matchFields, termFields, returnFields, filterMatch,
@@ -547,28 +742,64 @@ class DocumentsDirectory:
         es = get_es_conn()
 
         try:
-            es_wait_ready()
-            res = es.get(index=self.typeIndex, doc_type="directory_type", id=docType)
-            indexName = res["_source"]["indexName"]
+            indexName = self.get_index_name(docType)
         except exceptions.NotFoundError:
             raise DocumentNotFoundException(docType)
 
         try:
             doc = es.get(index=indexName, id=id, doc_type=docType)
-        except exceptions.NotFoundError:
+        except exceptions.NotFoundError as e:
+            if is_index_not_found(e):
+                invalidate_type_index_cache(self.typeIndex, docType)
             raise DocumentNotFoundException(id)
         res = doc["_source"]
         res["id"] = id
         return res
 
+    def get_documents(self, ids: List[str], docType: str = "default", returnFields: List[str] = None) -> List:
+        """
+        Returns many documents by id, in one request.
+
+        :param ids:             Ids of the documents
+        :param docType:         Type of the documents
+        :param returnFields:    Fields to return. If None, return all fields.
+        :return:                For each id, in the same order, the document (like get_document) or None if not found
+        """
+        return self.get_documents_of_types(ids, [docType], returnFields)
+
+    def get_documents_of_types(self, ids: List[str], docTypes: List[str] = None, returnFields: List[str] = None) -> List:
+        """
+        Returns many documents by id, when documents may be of different types, in one request.
+
+        :param ids:             Ids of the documents
+        :param docTypes:        Types the documents may have. If None, all types of the directory.
+        :param returnFields:    Fields to return. If None, return all fields.
+        :return:                For each id, in the same order, the document (like get_document) or None if not found
+        """
+        indicesPerDocType = self.get_indices_per_doc_type()
+        if docTypes is None:
+            docTypes = sorted(indicesPerDocType.keys())
+        indexTypes = [(indicesPerDocType[docType], docType) for docType in docTypes if docType in indicesPerDocType]
+        if not ids or not indexTypes:
+            return [None] * len(ids)
+
+        documents = []
+        for hit in mget_from_indices(ids, indexTypes, returnFields):
+            document = None
+            if hit:
+                document = hit.get("_source", {})
+                document["id"] = hit["_id"]
+            documents.append(document)
+        return documents
+
     def delete_document(self, id: str, docType="default"):
         try:
             es = get_es_conn()
-            es_wait_ready()
-            res = es.get(index=self.typeIndex, doc_type="directory_type", id=docType)
-            indexName = res["_source"]["indexName"]
+            indexName = self.get_index_name(docType)
             es.delete(index=indexName, doc_type=docType, id=id)
-        except exceptions.NotFoundError:
+        except exceptions.NotFoundError as e:
+            if is_index_not_found(e):
+                invalidate_type_index_cache(self.typeIndex, docType)
             raise DocumentNotFoundException(id)
 
     def add_or_update_schema(self, esPropertiesDelta: dict, docType: str = "default", allowDynamicFields=False):
@@ -584,9 +815,7 @@ class DocumentsDirectory:
         es = get_es_conn()
         indexName = self._create_data_index_if_not_exist(docType, allowDynamicFields)
 
-        es_wait_ready()
         es.indices.put_mapping(index=indexName, body=esPropertiesDelta, doc_type=docType)
-        es_wait_ready()
 
     def _create_data_index_if_not_exist(self, docType="default", allowDynamicFields=True) -> str:
         """
@@ -600,9 +829,7 @@ class DocumentsDirectory:
 
         es = get_es_conn()
         try:
-            es_wait_ready()
-            res = es.get(index=self.typeIndex, doc_type="directory_type", id=docType)
-            indexName = res["_source"]["indexName"]
+            indexName = self.get_index_name(docType)
         except exceptions.NotFoundError:
             indexName = self.dataIndexPrefix + "_" + gen_uuid()
             # adding standard name generation for default indexes
@@ -617,16 +844,14 @@ class DocumentsDirectory:
                                          "number_of_replicas": get_number_of_replicas()}
             body["settings"]["analysis"] = ANALYSIS
             if allowDynamicFields:
-                es.indices.create(indexName, body=body)
+                es_create_index(indexName, body=body)
             else:
                 body["mappings"] = {}
                 body["mappings"][docType] = {}
                 body["mappings"][docType]["dynamic"] = "strict"
                 # mapping["mappings"][docType]["properties"] = "{}"
-                es.indices.create(indexName, body=body)
-            es_wait_ready()
-            # artificial pause to make sure index is created and ready
-            time.sleep(1)
+                es_create_index(indexName, body=body)
+            invalidate_type_index_cache(self.typeIndex, docType)
 
         return indexName
 
@@ -676,9 +901,7 @@ class DocumentsDirectory:
             indexName = self._create_data_index_if_not_exist(docType, True)
         else:
             try:
-                es_wait_ready()
-                res = es.get(index=self.typeIndex, doc_type="directory_type", id=docType)
-                indexName = res["_source"]["indexName"]
+                indexName = self.get_index_name(docType)
             except exceptions.NotFoundError:
                 raise DocumentDirectoryNoSchemaFoundException("No schema found for type:{0}".format(docType))
 
@@ -713,3 +936,42 @@ class DocumentsDirectory:
                 if ("error" in te.info) and ("type" in te.info["error"]) and (
                         te.info["error"]["type"] == "strict_dynamic_mapping_exception"):
                     raise DocumentDoesNotRespectSchemaException("Document id: {0}".format(id))
+
+    def add_documents(self, documentsWithIds, docType: str = "default", createDataIndexIfNotExist: bool = True,
+                      chunkSize: int = None, nbThreads: int = None) -> List:
+        """
+        Adds many documents of the same type with bulk requests. Existing documents are not modified.
+        Unlike add_document, a failing document doesn't stop the others from being added.
+
+        :param documentsWithIds:    Iterable of (id, jsonDocument). If id is None, one is generated.
+        :param docType:             Type of the documents.
+        :param createDataIndexIfNotExist:   If true will create a data index if it doest exist for the type.
+                                    If false it will throw DocumentDirectoryNoSchemaFoundException.
+        :param chunkSize:           Maximum number of documents per bulk request. Defaults to BATCH settings.
+        :param nbThreads:           Number of bulk requests sent in parallel. Defaults to BATCH settings.
+        :return:                    [(id, exception)] for documents which were not added. The exceptions are
+                                    the ones add_document would raise: DocumentAlreadyExistsException,
+                                    DocumentDoesNotRespectSchemaException or DocumentDirectoryException.
+        """
+        batchSettings = get_settings()['CLASSES']['BATCH']
+        if createDataIndexIfNotExist:
+            indexName = self._create_data_index_if_not_exist(docType, True)
+        else:
+            try:
+                indexName = self.get_index_name(docType)
+            except exceptions.NotFoundError:
+                raise DocumentDirectoryNoSchemaFoundException("No schema found for type:{0}".format(docType))
+
+        def actions():
+            for id, jsonDocument in documentsWithIds:
+                if not id:
+                    id = gen_uuid()
+                yield {"_op_type": "create", "_index": indexName, "_type": docType, "_id": id,
+                       "_source": jsonDocument}, id
+
+        failed = []
+        for errorItem, id in bulk_in_parallel(actions(), chunkSize or batchSettings["BULK_CHUNK_SIZE"],
+                                              batchSettings["MAX_ANNOTAION_BULK_SIZE"],
+                                              nbThreads or batchSettings["NB_BULK_THREADS"]):
+            failed.append((id, _bulk_item_to_exception(errorItem, id)))
+        return failed
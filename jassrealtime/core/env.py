@@ -9,6 +9,8 @@ from jassrealtime.core.utils import gen_uuid
 from .esutils import *
 from ..security.base_authorization import *
 from .master_factory_list import create_all_lists_for_env
+from .document_directory import invalidate_type_index_cache
+from .catalog import CATALOG
 from .settings_utils import get_number_of_replicas, get_number_of_shards
 
 ENV_MAPPING = {
@@ -48,7 +50,7 @@ class EnvList:
             body["settings"]["index"] = {"number_of_shards": get_number_of_shards(),
                                          "number_of_replicas": get_number_of_replicas()}
 
-            es.indices.create(index=envIndex, body=body)
+            es_create_index(envIndex, body=body)
 
     def __init__(self, sett: dict, authorization: BaseAuthorization):
         self.masterenvId = sett['MASTER_ENV_ID']
@@ -103,6 +105,9 @@ class EnvList:
         indicesToDelete = env.id + "*"
         es.delete(index=self.envIndex, doc_type="default", id=env.id)
         es.indices.delete(index=indicesToDelete)
+        invalidate_type_index_cache()
+        # Other envs may start with the same id, so their indices are deleted too
+        CATALOG.clear()
 
 
 class Env:
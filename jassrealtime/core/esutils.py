@@ -1,18 +1,34 @@
 # coding: utf-8
 
 import re, string, sys
+import base64
+import json
 import logging
-from typing import List
+import os
+import socket
+from typing import List, Dict
 from datetime import datetime
 from elasticsearch_dsl import Search, Q
 from elasticsearch.exceptions import TransportError
 from urllib3.exceptions import NewConnectionError
+import heapq
+import queue
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-from elasticsearch import Elasticsearch
+from elasticsearch import Elasticsearch, Urllib3HttpConnection, Transport, helpers
+from urllib3.connection import HTTPConnection
 from .settings_utils import get_settings, get_scan_scroll_duration, get_nb_documents_per_scan_scroll
+from .utils import put_unless_stopped, StoppedException
+from .metrics import ES_REQUEST_SECONDS, ES_REQUEST_ERRORS
+from .tracing import get_current_trace
 
 _ES_CONN = None
+_ES_CONN_PID = None  # process which created _ES_CONN
+_ES_CONN_LOCK = threading.Lock()
+_ES_READY_UNTIL = 0  # time.monotonic() value until which the cluster is considered ready without checking again
 ES_DATE_FORMAT = "yyy-MM-dd HH:mm:ss"
 ES_TO_DATETIME_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 SLEEP_TIME_BEFORE_RECONNECT = 3  # sleep time in seconts
@@ -32,33 +48,179 @@ class ESConnectionFailed(Exception):
     pass
 
 
-def es_wait_ready():
+def es_wait_ready(force: bool = False):
     """
     This function will wait configured number of  seconds for the cluster to be ready. Will raise cluster
 
+    Once the cluster was seen ready, it is considered ready for cluster_ready_check_interval seconds,
+    during which this function returns immediately without contacting elastic search.
+
+    :param force:   If true, always check the cluster health.
     :return:
     """
+    global _ES_READY_UNTIL
+    if not force and time.monotonic() < _ES_READY_UNTIL:
+        return
+
+    sett = get_settings()['ELASTIC_SEARCH']
+    es = get_es_conn()
+    try:
+        es.cluster.health(wait_for_status="yellow", timeout=str(sett['cluster_health_timeout']) + "s")
+    except Exception:
+        mark_es_not_ready()
+        raise
+    _ES_READY_UNTIL = time.monotonic() + sett['cluster_ready_check_interval']
+
+
+def mark_es_not_ready():
+    """
+    Forgets that the cluster was ready. The next call to es_wait_ready will check the cluster health.
+    """
+    global _ES_READY_UNTIL
+    _ES_READY_UNTIL = 0
+
+
+def es_wait_index_ready(index: str):
+    """
+    Waits configured number of seconds for the primary shards of an index to be active.
+
+    :param index:   Name of the index (or indices separated by comma).
+    """
     timeout = get_settings()['ELASTIC_SEARCH']['cluster_health_timeout']
     es = get_es_conn()
-    es.cluster.health(wait_for_status="yellow", timeout=str(timeout) + "s")
+    es.cluster.health(index=index, wait_for_status="yellow", timeout=str(timeout) + "s")
+
+
+def es_create_index(index: str, body: dict = None) -> dict:
+    """
+    Creates an index and returns once its primary shards are active, so it can be used right away.
+
+    :param index:   Name of the index.
+    :param body:    Settings and mappings of the index.
+    :return:        elastic search response
+    """
+    es = get_es_conn()
+    res = es.indices.create(index=index, body=body)
+    if not res.get("shards_acknowledged", False):
+        # creation timed out before the shards were started
+        es_wait_index_ready(index)
+    return res
+
+
+# Operation of the requests whose path contains an endpoint (segment starting with _), by endpoint
+_ES_ENDPOINT_OPERATIONS = {
+    "_search": "search", "_count": "count", "_bulk": "bulk", "_mget": "mget", "_msearch": "msearch",
+    "_delete_by_query": "delete_by_query", "_update_by_query": "update_by_query", "_update": "update",
+    "_refresh": "indices.refresh", "_flush": "indices.flush", "_stats": "indices.stats",
+    "_mapping": "indices.mapping", "_mappings": "indices.mapping", "_settings": "indices.settings",
+    "_alias": "indices.aliases", "_aliases": "indices.aliases", "_forcemerge": "indices.forcemerge",
+    "_cat": "cat", "_cluster": "cluster", "_nodes": "nodes",
+}
+# Operation of the requests on an index (/index) and on a document (/index/type/id), by method
+_ES_INDEX_OPERATIONS = {"PUT": "indices.create", "DELETE": "indices.delete", "HEAD": "indices.exists",
+                        "GET": "indices.get"}
+_ES_DOCUMENT_OPERATIONS = {"PUT": "index", "POST": "index", "DELETE": "delete", "HEAD": "exists", "GET": "get"}
+
+
+def es_operation_name(method: str, url: str) -> str:
+    """
+    Name of the client call which sends a request, like "search", "scroll", "bulk" or "indices.create".
+    Used as a metric label, so the number of names is bounded.
+    """
+    segments = [segment for segment in url.split("?")[0].split("/") if segment]
+    endpoints = [segment for segment in segments if segment.startswith("_")]
+    if endpoints:
+        if endpoints[0] == "_search" and "scroll" in segments:
+            return "clear_scroll" if method == "DELETE" else "scroll"
+        if endpoints[0] in ("_cluster", "_cat", "_nodes") and len(segments) > 1:
+            return "{0}.{1}".format(_ES_ENDPOINT_OPERATIONS[endpoints[0]], segments[1])
+        return _ES_ENDPOINT_OPERATIONS.get(endpoints[0], "other")
+    if not segments:
+        return "info"
+    if len(segments) == 1:
+        return _ES_INDEX_OPERATIONS.get(method, "other")
+    return _ES_DOCUMENT_OPERATIONS.get(method, "other")
+
+
+class InstrumentedTransport(Transport):
+    """
+    Transport timing every elastic search request, per operation (jass_es_request_duration_seconds metric),
+    and recording it in the trace of the current request if it is traced (see tracing).
+    """
+
+    def perform_request(self, method, url, headers=None, params=None, body=None):
+        operation = es_operation_name(method, url)
+        start = time.monotonic()
+        error = None
+        try:
+            return super().perform_request(method, url, headers=headers, params=params, body=body)
+        except Exception as e:
+            error = e
+            ES_REQUEST_ERRORS.inc(operation=operation)
+            raise
+        finally:
+            duration = time.monotonic() - start
+            ES_REQUEST_SECONDS.observe(duration, operation=operation)
+            trace = get_current_trace()
+            if trace is not None:
+                trace.record(operation, method, url, body, duration, error)
+
+
+class KeepAliveConnection(Urllib3HttpConnection):
+    """
+    Connection to an elastic search node whose sockets use tcp keepalive, so idle pooled connections are
+    neither dropped silently by firewalls nor found dead when a request needs them.
+    """
+
+    def __init__(self, *args, tcpKeepAliveIdle: int = 60, **kwargs):
+        super().__init__(*args, **kwargs)
+        socketOptions = list(HTTPConnection.default_socket_options) + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+        if hasattr(socket, "TCP_KEEPIDLE"):
+            socketOptions.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, tcpKeepAliveIdle))
+        self.pool.conn_kw["socket_options"] = socketOptions
+
 
 def close_es_con():
+    """
+    Forgets the connection of this process, a new one is created on the next call to get_es_conn.
+    Must be called before forking, so the child processes don't inherit sockets in use.
+    """
     global _ES_CONN
     _ES_CONN = None
+    mark_es_not_ready()
+
 
 def get_es_conn():
+    """
+    Returns the elastic search connection of this process. Connections are never shared between processes:
+    a process forked after the connection was created gets a new one.
+    """
     logger = logging.getLogger(__name__)
-    global _ES_CONN
-    sett = get_settings()
-    if _ES_CONN is None:
+    global _ES_CONN, _ES_CONN_PID
+    if _ES_CONN is not None and _ES_CONN_PID == os.getpid():
+        return _ES_CONN
+
+    # Executor threads may all ask for the connection at once, after a fork: only one creates it
+    with _ES_CONN_LOCK:
+        if _ES_CONN is not None and _ES_CONN_PID != os.getpid():
+            # Forked: the sockets are shared with the parent process, they must not be used nor closed here.
+            close_es_con()
+        if _ES_CONN is not None:
+            return _ES_CONN
+
+        sett = get_settings()
         count = 0
         while count < NB_OF_RECONNECTS:
             try:
+                _ES_CONN_PID = os.getpid()
                 if "static_connection" in sett['ELASTIC_SEARCH'] and \
                     sett['ELASTIC_SEARCH']["static_connection"] == True:
                     # create a special connection used for testing
                     _ES_CONN = Elasticsearch(
                         sett['ELASTIC_SEARCH']['hosts'],
+                        transport_class=InstrumentedTransport,
+                        connection_class=KeepAliveConnection,
+                        tcpKeepAliveIdle=sett['ELASTIC_SEARCH'].get('tcp_keepalive_idle', 60),
                         maxsize=sett['ELASTIC_SEARCH']['maxsize'],
                         timeout=sett['ELASTIC_SEARCH']['timeout']
                     )
@@ -66,6 +228,9 @@ def get_es_conn():
                 else:
                     _ES_CONN = Elasticsearch(
                         sett['ELASTIC_SEARCH']['hosts'],
+                        transport_class=InstrumentedTransport,
+                        connection_class=KeepAliveConnection,
+                        tcpKeepAliveIdle=sett['ELASTIC_SEARCH'].get('tcp_keepalive_idle', 60),
                         # sniff before doing anything
                         sniff_on_start=sett['ELASTIC_SEARCH']['sniff_on_start'],
                         # refresh nodes after a node fails to respond
@@ -88,7 +253,28 @@ def get_es_conn():
 
         raise ESConnectionFailed()
 
-    return _ES_CONN
+
+def get_es_pool_stats(es: Elasticsearch = None) -> List[dict]:
+    """
+    Utilization of the connection pools of this process, one per elastic search node.
+
+    :param es:  Connection to describe, the connection of this process by default (not created if missing)
+    :return:    [{"host": url, "maxsize": max pooled connections, "idle": idle pooled connections,
+                  "opened": connections opened since the pool creation, "requests": requests sent}]
+    """
+    es = es or (_ES_CONN if _ES_CONN_PID == os.getpid() else None)
+    if es is None:
+        return []
+    stats = []
+    for connection in es.transport.connection_pool.connections:
+        pool = connection.pool
+        idle = sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0
+        stats.append({"host": connection.host,
+                      "maxsize": pool.pool.maxsize if pool.pool else 0,
+                      "idle": idle,
+                      "opened": pool.num_connections,
+                      "requests": pool.num_requests})
+    return stats
 
 
 def string_to_id(str: str):
@@ -245,6 +431,297 @@ def multi_indexes_small_search(indices: str, matchFields: dict = {}, termFields:
     return resultingDocs
 
 
+def bulk_in_parallel(actions, chunkSize: int = 500, maxChunkBytes: int = 10000000, nbThreads: int = 4):
+    """
+    Sends bulk actions to elastic search, with nbThreads bulk requests in flight at a time.
+    Actions are consumed lazily: at most nbThreads + 1 chunks are held in memory, whatever the number of actions.
+
+    :param actions:         Iterable of (action, context). action is a bulk action as accepted by helpers.bulk
+                                ({"_index", "_type", "_id", "_source"}). context is anything the caller needs to
+                                identify the action if it fails. It is not sent to elastic search.
+    :param chunkSize:       Maximum number of actions per bulk request.
+    :param maxChunkBytes:   Maximum size in bytes of the sources of a bulk request.
+    :param nbThreads:       Number of bulk requests sent in parallel.
+    :return:                Generator of (errorItem, context) for every action which failed. errorItem is the item
+                                of the bulk response: {op_type: {"_id": ..., "status": ..., "error": ...}}
+    """
+    es = get_es_conn()
+    serializer = es.transport.serializer
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=nbThreads) as executor:
+        chunk = []
+        chunkBytes = 0
+        for action, context in actions:
+            # serialize once, to know the size of the action. helpers send strings as is.
+            if "_source" in action and not isinstance(action["_source"], str):
+                action["_source"] = serializer.dumps(action["_source"])
+            actionBytes = len(action.get("_source", ""))
+            if chunk and (len(chunk) >= chunkSize or chunkBytes + actionBytes > maxChunkBytes):
+                pending.append(executor.submit(_send_bulk_chunk, es, chunk))
+                chunk = []
+                chunkBytes = 0
+                if len(pending) >= nbThreads:
+                    yield from pending.popleft().result()
+            chunk.append((action, context))
+            chunkBytes += actionBytes
+
+        if chunk:
+            pending.append(executor.submit(_send_bulk_chunk, es, chunk))
+        while pending:
+            yield from pending.popleft().result()
+
+
+def _send_bulk_chunk(es: Elasticsearch, chunk: list) -> list:
+    """
+    Sends a chunk of (action, context) in one bulk request.
+
+    :return:    [(errorItem, context)] for failed actions.
+    """
+    failed = []
+    results = helpers.streaming_bulk(es, [action for action, context in chunk], chunk_size=len(chunk),
+                                     max_chunk_bytes=sys.maxsize, raise_on_error=False, raise_on_exception=False)
+    # results are in the same order as the actions
+    for (ok, item), (action, context) in zip(results, chunk):
+        if not ok:
+            failed.append((item, context))
+    return failed
+
+
+MGET_CHUNK_SIZE = 1000  # maximum number of documents asked per mget request
+
+
+def mget_from_indices(ids: List[str], indexTypes: List[tuple], returnFields: List[str] = None) -> List:
+    """
+    Gets documents by id with mget, when each id may be in any of the given indices.
+    Asks every (index, type) for every id, in as few requests as possible (MGET_CHUNK_SIZE documents per request).
+
+    :param ids:             Ids of the documents
+    :param indexTypes:      [(index, docType)] which may contain the documents, by order of priority
+    :param returnFields:    Source fields to return. If None, the whole source.
+    :return:                For each id, in the same order, the first hit found ({"_index", "_type", "_id",
+                                "_source"}) or None
+    """
+    es = get_es_conn()
+    # elastic search returns the ids as strings
+    ids = [str(id) for id in ids]
+    docs = [{"_index": index, "_type": docType, "_id": id} for id in ids for index, docType in indexTypes]
+    found = {}
+    for start in range(0, len(docs), MGET_CHUNK_SIZE):
+        params = {}
+        if returnFields is not None:
+            params["_source"] = ",".join(returnFields) if returnFields else "false"
+        response = es.mget(body={"docs": docs[start:start + MGET_CHUNK_SIZE]}, **params)
+        for hit in response["docs"]:
+            # missing indices are reported as errors, missing documents as not found
+            if hit.get("found") and hit["_id"] not in found:
+                found[hit["_id"]] = hit
+    return [found.get(id) for id in ids]
+
+
+class InvalidCursorException(ValueError):
+    pass
+
+
+# Appended to the sort of paginated searches so the order of hits is total: search_after neither skips nor repeats
+# hits having the same sort values.
+PAGINATION_TIE_BREAKERS = ["_index", "_uid"]
+
+
+def paginate_search(search: Search, fromIndex: int, size: int, cursor: str = None) -> Search:
+    """
+    Applies the pagination to a search. The sort of the search must already be set, it is completed with
+    PAGINATION_TIE_BREAKERS. With a cursor, the page starts right after the hit from which the cursor was made
+    (search_after), so deep pages cost as much as the first one.
+
+    :param fromIndex:   Zero based index of the first hit. Ignored if there is a cursor.
+    :param size:        Number of hits of the page
+    :param cursor:      Cursor returned by get_next_cursor for the previous page of the same search
+    :return:            The paginated search
+    """
+    sort = search.to_dict().get("sort", ["_score"])
+    sortFields = [field if isinstance(field, str) else next(iter(field)) for field in sort]
+    sort += [field for field in PAGINATION_TIE_BREAKERS if field not in sortFields]
+    search = search.sort(*sort)
+    if cursor:
+        return search.extra(search_after=decode_cursor(cursor))[0:size]
+    return search[fromIndex:fromIndex + size]
+
+
+def get_next_cursor(hits, size: int) -> str:
+    """
+    :param hits:    Hits of a page of a search paginated with paginate_search
+    :param size:    Size of the page
+    :return:        Cursor of the next page, None if this page is the last one
+    """
+    if len(hits) < size or not hits:
+        return None
+    return encode_cursor(list(hits[-1].meta.sort))
+
+
+def execute_with_count(search: Search, fromIndex: int = 0, approximateCount: bool = False) -> tuple:
+    """
+    Executes a paginated search and counts all its hits in the same request, using the total of the hits of the
+    response instead of a separate count request.
+
+    :param fromIndex:           Index of the first hit of the page, None for a page requested with a cursor
+    :param approximateCount:    If true, the hits are not counted by elastic search (track_total_hits is false),
+        which is cheaper for large results. The count is then a lower bound: the number of hits up to the end of the
+        page, or of the page only if its position is unknown. See is_approximate_count_exact.
+    :return:                    response, count
+    """
+    if not approximateCount:
+        response = search.execute()
+        return response, response.hits.total
+
+    response = search.extra(track_total_hits=False).execute()
+    nbHits = len(response.hits)
+    if fromIndex is None or nbHits == 0:
+        # an empty page may be past the last hit
+        return response, nbHits
+    return response, fromIndex + nbHits
+
+
+def is_approximate_count_exact(fromIndex: int, size: int, nbHits: int) -> bool:
+    """
+    Tells if the count of a page counted with approximateCount (see execute_with_count) is exact, which is the case on
+    the last page, unless it was requested with a cursor.
+
+    :param fromIndex:   Index of the first hit of the page, None for a page requested with a cursor
+    :param size:        Size of the page
+    :param nbHits:      Number of hits of the page
+    """
+    if fromIndex is None:
+        return False
+    if nbHits == 0:
+        return fromIndex == 0
+    return nbHits < size
+
+
+def encode_cursor(sortValues: list) -> str:
+    # url safe, without padding, so cursors can be passed as query arguments as is
+    return base64.urlsafe_b64encode(json.dumps(sortValues).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        sortValues = json.loads(base64.urlsafe_b64decode((cursor + padding).encode("ascii")).decode("utf-8"))
+    except Exception:
+        raise InvalidCursorException("Invalid cursor: '{0}'".format(cursor))
+    if not isinstance(sortValues, list):
+        raise InvalidCursorException("Invalid cursor: '{0}'".format(cursor))
+    return sortValues
+
+
+def get_documents_count_per_index(index: str) -> Dict[str, int]:
+    """
+    Returns the number of documents of many indices with a single index stats request, which only reads
+    index metadata. Nested objects are counted as documents, so it should not be used on indices with nested fields.
+
+    :param index:   One or many indices separated by a comma. Wildcards allowed.
+    :return:        {indexName: number of documents}
+    """
+    es = get_es_conn()
+    stats = es.indices.stats(index=index, metric="docs")
+    return {indexName: indexStats["primaries"]["docs"]["count"] for indexName, indexStats in stats["indices"].items()}
+
+
+_END_OF_SLICE = object()
+
+
+def get_number_of_shards_of_index(index: str) -> int:
+    """
+    :param index:   One or many indices separated by a comma
+    :return:        Highest number of primary shards of the indices
+    """
+    es = get_es_conn()
+    settings = es.indices.get_settings(index=index, name="index.number_of_shards", flat_settings=True)
+    return max([int(indexSettings["settings"]["index.number_of_shards"]) for indexSettings in settings.values()] or [1])
+
+
+def sorted_sliced_scan(index: str, body: dict, sortField: str, nbSlices: int = None):
+    """
+    Scans all documents matching body, sorted by sortField. The scan is split in nbSlices sliced scrolls read
+    concurrently, each slice sorted by elastic search, which are merged back into one sorted stream.
+    Each slice reads at most a few pages ahead of the consumer.
+
+    :param index:       One or many indices separated by a comma
+    :param body:        Search body. Its sort is replaced by sortField.
+    :param sortField:   Field to sort on. Documents without this field come last.
+    :param nbSlices:    Number of slices. If None or less than 1, the number of shards of the index.
+    :return:            Generator of hits ({"_id", "_source", ...})
+    """
+    es = get_es_conn()
+    if not nbSlices or nbSlices < 1:
+        nbSlices = get_number_of_shards_of_index(index)
+    body = dict(body)
+    body["sort"] = [{sortField: {"order": "asc"}}]
+
+    stop = threading.Event()
+    queues = []
+    threads = []
+    for sliceId in range(nbSlices):
+        sliceBody = dict(body)
+        # elastic search refuses slices with a max of 1
+        if nbSlices > 1:
+            sliceBody["slice"] = {"id": sliceId, "max": nbSlices}
+        pages = queue.Queue(maxsize=2)
+        thread = threading.Thread(target=_scan_slice, args=(es, index, sliceBody, pages, stop), daemon=True)
+        thread.start()
+        queues.append(pages)
+        threads.append(thread)
+
+    def sort_key(hit):
+        value = hit["_source"].get(sortField)
+        return value is None, value if value is not None else ""
+
+    try:
+        yield from heapq.merge(*[_iter_slice(pages) for pages in queues], key=sort_key)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+
+def _scan_slice(es: Elasticsearch, index: str, body: dict, pages: queue.Queue, stop: threading.Event):
+    """
+    Puts the pages of hits of a scroll in pages, followed by _END_OF_SLICE, or by the exception which stopped it.
+    """
+    scroll = get_scan_scroll_duration()
+    scrollId = None
+    try:
+        page = es.search(index=index, body=body, scroll=scroll, size=get_nb_documents_per_scan_scroll())
+        scrollId = page.get("_scroll_id")
+        while page["hits"]["hits"]:
+            put_unless_stopped(pages, page["hits"]["hits"], stop)
+            page = es.scroll(scroll_id=scrollId, scroll=scroll)
+            scrollId = page.get("_scroll_id")
+        put_unless_stopped(pages, _END_OF_SLICE, stop)
+    except StoppedException:
+        pass
+    except Exception as e:
+        try:
+            put_unless_stopped(pages, e, stop)
+        except StoppedException:
+            pass
+    finally:
+        if scrollId:
+            try:
+                es.clear_scroll(scroll_id=scrollId)
+            except Exception:
+                logging.getLogger(__name__).warning("Failed to clear scroll of index {0}".format(index))
+
+
+def _iter_slice(pages: queue.Queue):
+    while True:
+        page = pages.get()
+        if page is _END_OF_SLICE:
+            return
+        if isinstance(page, Exception):
+            raise page
+        yield from page
+
+
 def check_indices_name_valid_for_delete(indices: str, envId: str, classPrefix: str) -> bool:
     """
     Check if indices names are valid. May be one or multiple indices.
@@ -0,0 +1,52 @@
+# coding: utf-8
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+
+from .settings_utils import get_nb_worker_threads
+
+_EXECUTOR = None
+_EXECUTOR_PID = None  # process which created _EXECUTOR
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Returns the process wide thread pool used to run blocking work (elastic search requests, file io)
+    outside of the tornado IOLoop thread.
+    The pool is created on first use in each process: threads don't survive a fork, so a forked server process
+    never uses the pool of its parent.
+
+    :return:    ThreadPoolExecutor
+    """
+    global _EXECUTOR, _EXECUTOR_PID
+    if _EXECUTOR is None or _EXECUTOR_PID != os.getpid():
+        with _EXECUTOR_LOCK:
+            if _EXECUTOR is None or _EXECUTOR_PID != os.getpid():
+                nbThreads = get_nb_worker_threads()
+                _EXECUTOR = ThreadPoolExecutor(max_workers=nbThreads)
+                _EXECUTOR_PID = os.getpid()
+                logging.getLogger(__name__).info("Started worker pool with {0} threads".format(nbThreads))
+    return _EXECUTOR
+
+
+def submit_blocking(fn, *args, **kwargs) -> Future:
+    """
+    Runs fn(*args, **kwargs) in the worker thread pool.
+
+    :return:    concurrent.futures.Future of the result
+    """
+    return get_executor().submit(fn, *args, **kwargs)
+
+
+def shutdown_executor(wait: bool = True):
+    """
+    Stops the worker thread pool. A new one is created on the next call to get_executor.
+    """
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is not None:
+            _EXECUTOR.shutdown(wait=wait)
+            _EXECUTOR = None
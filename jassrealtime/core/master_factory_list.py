@@ -2,10 +2,12 @@
 
 from .settings_utils import *
 from ..security.base_authorization import *
+from .request_context import RequestContext, memoized
 
 
 # Note these functions are used to get various lists.
-# It assumes the lists were created beforehand
+# It assumes the lists were created beforehand.
+# With a request context, each list is built once per request.
 
 
 def get_env_list(authorization: BaseAuthorization):
@@ -20,64 +22,79 @@ def get_env_list(authorization: BaseAuthorization):
     return EnvList(sett['CLASSES']['ENV'], authorization)
 
 
-def get_master_document_directory_list(envId: str, authorization: BaseAuthorization):
+def get_master_document_directory_list(envId: str, authorization: BaseAuthorization,
+                                       context: RequestContext = None):
     """
 
     :param envId:
+    :param context: Request context memoizing the list
     :return:        return DocumentDirectoryList associated with the envId
     """
     from jassrealtime.core.document_directory import DocumentDirectoryList
     sett = get_settings()
-    return DocumentDirectoryList(envId, sett['CLASSES']['DOCUMENT_DIRECTORY'], authorization)
+    return memoized(context, ("documentDirectoryList", envId),
+                    lambda: DocumentDirectoryList(envId, sett['CLASSES']['DOCUMENT_DIRECTORY'], authorization))
 
 
-def get_master_document_corpus_list(envId: str, authorization: BaseAuthorization):
+def get_master_document_corpus_list(envId: str, authorization: BaseAuthorization, context: RequestContext = None):
     """
 
     :param envId:
+    :param context: Request context memoizing the list and its corpora
     :return:        DocumentCorpusList associated with the envId
     """
     from jassrealtime.document.document_corpus import DocumentCorpusList
     sett = get_settings()
-    return DocumentCorpusList(envId, sett['CLASSES']['DOCUMENT_CORPUS'], authorization)
+    return memoized(context, ("documentCorpusList", envId),
+                    lambda: DocumentCorpusList(envId, sett['CLASSES']['DOCUMENT_CORPUS'], authorization, context))
 
 
-def get_master_document_sub_corpus_list(envId: str, authorization: BaseAuthorization):
+def get_master_document_sub_corpus_list(envId: str, authorization: BaseAuthorization,
+                                        context: RequestContext = None):
     """
 
     :param envId:
+    :param context: Request context memoizing the list
     :return:        DocumentCorpusList associated with the envId
     """
     from jassrealtime.document.document_sub_corpus import DocumentSubCorpusList
     sett = get_settings()
-    return DocumentSubCorpusList(envId, sett['CLASSES']['DOCUMENT_CORPUS']['DOCUMENT_SUB_CORPUS'], authorization)
+    return memoized(context, ("documentSubCorpusList", envId),
+                    lambda: DocumentSubCorpusList(envId, sett['CLASSES']['DOCUMENT_CORPUS']['DOCUMENT_SUB_CORPUS'],
+                                                  authorization, context))
 
 
-def get_master_bucket_list(envId: str, authorization: BaseAuthorization):
+def get_master_bucket_list(envId: str, authorization: BaseAuthorization, context: RequestContext = None):
     """
 
     :param envId:
+    :param context: Request context memoizing the list and its buckets
     :return:        DocumentCorpusList associated with the envId
     """
     from jassrealtime.document.bucket import BucketList
     sett = get_settings()
     bucketSettings = sett['CLASSES']['BUCKET']
-    bucketMasterDir = get_master_document_directory_list(envId, authorization).get_directory(
-        bucketSettings['MASTER_BUCKET_ID'])
 
-    return BucketList(envId, bucketSettings, bucketMasterDir, authorization)
+    def build():
+        bucketMasterDir = get_master_document_directory_list(envId, authorization, context).get_directory(
+            bucketSettings['MASTER_BUCKET_ID'])
+        return BucketList(envId, bucketSettings, bucketMasterDir, authorization, context)
 
+    return memoized(context, ("bucketList", envId), build)
 
-def get_schema_list(envId: str, authorization: BaseAuthorization):
+
+def get_schema_list(envId: str, authorization: BaseAuthorization, context: RequestContext = None):
     """
 
     :param envId:
+    :param context: Request context memoizing the list
     :return:        SchemaList associated with the envId
     """
 
     from jassrealtime.core.schema_list import SchemaList
     sett = get_settings()
-    return SchemaList(envId, sett['CLASSES']['SCHEMA_LIST'], authorization, get_language_manager())
+    return memoized(context, ("schemaList", envId),
+                    lambda: SchemaList(envId, sett['CLASSES']['SCHEMA_LIST'], authorization, get_language_manager()))
 
 
 def create_all_lists_for_env(envId: str, authorization: BaseAuthorization):
@@ -91,15 +108,10 @@ def create_all_lists_for_env(envId: str, authorization: BaseAuthorization):
     from jassrealtime.document.document_corpus import DocumentCorpusList
     from jassrealtime.document.bucket import BucketList
     from jassrealtime.core.schema_list import SchemaList
-    from time import sleep
 
-    # really need to replace timers
+    # each create waits for its indices to be ready
     sett = get_settings()
     DocumentDirectoryList.create(envId, sett['CLASSES']['DOCUMENT_DIRECTORY'], authorization)
-    sleep(1)
     SchemaList.create(envId, sett['CLASSES']['SCHEMA_LIST'], authorization, get_language_manager())
-    sleep(1)
     DocumentCorpusList.create(envId, sett['CLASSES']['DOCUMENT_CORPUS'], authorization)
-    sleep(1)
     BucketList.create(envId, sett['CLASSES']['BUCKET'], authorization)
-    sleep(1)
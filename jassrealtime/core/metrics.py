@@ -0,0 +1,209 @@
+# coding: utf-8
+
+# Lightweight instrumentation, exposed in the prometheus text format by the /metrics endpoint.
+# Metrics are kept per process: with many server processes, each scrape describes the process which served it.
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Tuple
+
+# Seconds, suited to http requests and elastic search calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _format_labels(labelNames: Tuple[str], labelValues: Tuple, extra: List[Tuple[str, str]] = ()) -> str:
+    pairs = list(zip(labelNames, labelValues)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join('{0}="{1}"'.format(name, _escape(value)) for name, value in pairs) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """
+    Base of the metrics: a value per combination of label values.
+    """
+    type = None
+
+    def __init__(self, name: str, documentation: str, labelNames: Tuple[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelNames = tuple(labelNames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelNames):
+            raise ValueError("Metric {0} expects labels {1}, got {2}".format(self.name, self.labelNames,
+                                                                            sorted(labels)))
+        return tuple(labels[name] for name in self.labelNames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> List[str]:
+        lines = ["# HELP {0} {1}".format(self.name, self.documentation),
+                 "# TYPE {0} {1}".format(self.name, self.type)]
+        with self._lock:
+            items = sorted(self._values.items(), key=lambda item: tuple(str(value) for value in item[0]))
+            lines.extend(self._render_value(key, value) for key, value in items)
+        return lines
+
+    def _render_value(self, key: tuple, value) -> str:
+        return "{0}{1} {2}".format(self.name, _format_labels(self.labelNames, key), _format_value(value))
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelNames: Tuple[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelNames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            # [count per bucket..., count above the last bucket, sum]
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            values[bisect.bisect_left(self.buckets, value)] += 1
+            values[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observes the duration of the with block, in seconds, even if it raises.
+        """
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - start, **labels)
+
+    def get_count(self, **labels) -> int:
+        with self._lock:
+            values = self._values.get(self._key(labels))
+            return sum(values[:-1]) if values else 0
+
+    def _render_value(self, key: tuple, values: list) -> str:
+        lines = []
+        cumulated = 0
+        for bound, count in zip(self.buckets + (float("inf"),), values[:-1]):
+            cumulated += count
+            lines.append("{0}_bucket{1} {2}".format(
+                self.name, _format_labels(self.labelNames, key, [("le", _format_value(float(bound)))]), cumulated))
+        labels = _format_labels(self.labelNames, key)
+        lines.append("{0}_sum{1} {2}".format(self.name, labels, _format_value(values[-1])))
+        lines.append("{0}_count{1} {2}".format(self.name, labels, cumulated))
+        return "\n".join(lines)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if any(registered.name == metric.name for registered in self._metrics):
+                raise ValueError("Metric {0} is already registered".format(metric.name))
+            self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """
+        :return:    All the metrics in the prometheus text format (version 0.0.4)
+        """
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "jass_http_request_duration_seconds", "Duration of the http requests, per handler, method and status.",
+    ("handler", "method", "status")))
+ES_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "jass_es_request_duration_seconds", "Duration of the elastic search requests, per operation.",
+    ("operation",)))
+ES_REQUEST_ERRORS = REGISTRY.register(Counter(
+    "jass_es_request_errors_total", "Elastic search requests which failed, per operation.", ("operation",)))
+ES_POOL_CONNECTIONS = REGISTRY.register(Gauge(
+    "jass_es_pool_connections", "Connections of the pool of each elastic search node: maximum, idle and opened "
+                                "since the pool creation.", ("host", "state")))
+ES_POOL_REQUESTS = REGISTRY.register(Gauge(
+    "jass_es_pool_requests", "Requests sent by the pool of each elastic search node.", ("host",)))
+BATCH_ITEMS = REGISTRY.register(Counter(
+    "jass_batch_items_total", "Documents or annotations processed by batch jobs, per job.", ("job",)))
+BATCH_SECONDS = REGISTRY.register(Counter(
+    "jass_batch_duration_seconds_total", "Time spent in batch jobs, per job. Divides jass_batch_items_total "
+                                         "to get the throughput.", ("job",)))
+
+
+def set_es_pool_metrics(poolStats: List[dict]):
+    """
+    Updates the connection pool gauges.
+
+    :param poolStats:   esutils.get_es_pool_stats()
+    """
+    ES_POOL_CONNECTIONS.clear()
+    ES_POOL_REQUESTS.clear()
+    for stats in poolStats:
+        for state in ("maxsize", "idle", "opened"):
+            ES_POOL_CONNECTIONS.set(stats[state], host=stats["host"], state=state)
+        ES_POOL_REQUESTS.set(stats["requests"], host=stats["host"])
+
+
+@contextmanager
+def batch_job(job: str):
+    """
+    Times a batch job. The with block gets a function to call with the number of items processed:
+
+        with batch_job("annotations_import") as add_items:
+            ...
+            add_items(len(annotations))
+    """
+    start = time.monotonic()
+    try:
+        yield lambda nbItems=1: BATCH_ITEMS.inc(nbItems, job=job)
+    finally:
+        BATCH_SECONDS.inc(time.monotonic() - start, job=job)
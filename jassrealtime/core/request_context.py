@@ -0,0 +1,53 @@
+# coding: utf-8
+
+# Unit of work of one request: the lists and entities resolved while serving a request are built once and shared,
+# instead of being rebuilt, and their directories re-read, by every factory call.
+
+import threading
+
+from ..security.base_authorization import BaseAuthorization
+
+
+class RequestContext:
+    """
+    Domain objects (lists, corpora, buckets) used by one request. Must not outlive the request: memoized objects are
+    never refreshed, so they don't see the modifications made by other requests.
+    """
+
+    def __init__(self, envId: str, authorization: BaseAuthorization):
+        self.envId = envId
+        self.authorization = authorization
+        self._objects = {}
+        # Reentrant since building an object may build the objects it depends on
+        self._lock = threading.RLock()
+
+    def memoize(self, key: tuple, build):
+        """
+        :param build:   function() -> object, called the first time key is requested. Nothing is memoized if it raises.
+        :return:        The object associated to key
+        """
+        with self._lock:
+            if key not in self._objects:
+                self._objects[key] = build()
+            return self._objects[key]
+
+    def forget(self, key: tuple):
+        """
+        Removes a memoized object, ex: once the entity is deleted.
+        """
+        with self._lock:
+            self._objects.pop(key, None)
+
+
+def memoized(context: RequestContext, key: tuple, build):
+    """
+    :return:    build(), memoized in context if there is one
+    """
+    if context is None:
+        return build()
+    return context.memoize(key, build)
+
+
+def forget(context: RequestContext, key: tuple):
+    if context is not None:
+        context.forget(key)
@@ -3,14 +3,16 @@
 import hashlib
 import json
 
+from jassrealtime.core.cache import LRUCache
 from jassrealtime.core.utils import gen_uuid
 from .esutils import *
 from ..security.base_authorization import *
 from .language_manager import LanguageManager
 from uuid import uuid1
-from .settings_utils import get_number_of_replicas, get_number_of_shards
+from .settings_utils import get_number_of_replicas, get_number_of_shards, get_schema_cache_size
 
 from elasticsearch import exceptions
+from elasticsearch.helpers import scan
 from elasticsearch_dsl import Q
 from elasticsearch_dsl import Search
 
@@ -57,6 +59,12 @@ JSON_SCHEMA_TYPE_TO_ES_NON_STRING = {"boolean": "boolean", "long": "long", "inte
 
 JSON_SCHEMA_PRIMITIVE_TYPES = {"boolean", "integer", "number", "string"}
 
+# Stored json schemas and es properties are never modified, so they are cached for the whole process, keyed by
+# (master index, id or esHash). The stored documents are cached, with their json strings, and parsed on every read
+# since callers modify the parsed values.
+_JSON_SCHEMA_INFO_CACHE = LRUCache(get_schema_cache_size())
+_ES_PROPERTIES_CACHE = LRUCache(get_schema_cache_size())
+
 
 class SchemaException(Exception):
     pass
@@ -120,7 +128,6 @@ class SchemaList:
         authorization.can_create_env()
 
         schemaList = SchemaList(envId, sett, authorization, languageManager)
-        es = get_es_conn()
         es_wait_ready()
         if check_index_name_valid_for_create(schemaList.masterJsonSchemaIndex, schemaList.envId,
                                              schemaList.classIndex):
@@ -129,7 +136,7 @@ class SchemaList:
             body["settings"]["index"] = {"number_of_shards": get_number_of_shards(),
                                          "number_of_replicas": get_number_of_replicas()}
 
-            es.indices.create(index=schemaList.masterEsSchemaIndex, body=body)
+            es_create_index(schemaList.masterEsSchemaIndex, body=body)
         else:
             raise ESInvalidIndexName(schemaList.masterJsonSchemaIndex)
 
@@ -140,7 +147,7 @@ class SchemaList:
             body["settings"] = {}
             body["settings"]["index"] = {"number_of_shards": get_number_of_shards(),
                                          "number_of_replicas": get_number_of_replicas()}
-            es.indices.create(index=schemaList.masterJsonSchemaIndex, body=body)
+            es_create_index(schemaList.masterJsonSchemaIndex, body=body)
         else:
             raise ESInvalidIndexName(schemaList.masterJsonSchemaIndex)
 
@@ -207,7 +214,6 @@ class SchemaList:
         """
 
         logger = logging.getLogger(__name__)
-        es = get_es_conn()
 
         fromProperties = esPropertiesFrom["properties"]
         toProperties = esPropertiesTo["properties"]
@@ -248,11 +254,31 @@ class SchemaList:
         :return:
         """
         self.authorization.can_delete_env()
-        es = get_es_conn()
         es_wait_ready()
         delete_indices(self.masterEsSchemaIndex, self.envId, self.classIndex)
         es_wait_ready()
         delete_indices(self.masterJsonSchemaIndex, self.envId, self.classIndex)
+        _JSON_SCHEMA_INFO_CACHE.delete_matching(lambda key: key[0] == self.masterJsonSchemaIndex)
+        _ES_PROPERTIES_CACHE.delete_matching(lambda key: key[0] == self.masterEsSchemaIndex)
+
+    def preload_cache(self):
+        """
+        Fills the schema caches with the stored json schemas and es properties, so that the first requests using
+        them don't need to read them. At most JASS_SCHEMA_CACHE_SIZE of each are loaded.
+        """
+        maxSize = get_schema_cache_size()
+        for i, hit in enumerate(self._scan(self.masterJsonSchemaIndex)):
+            if i >= maxSize:
+                break
+            _JSON_SCHEMA_INFO_CACHE.set((self.masterJsonSchemaIndex, hit["_id"]), hit["_source"])
+        for i, hit in enumerate(self._scan(self.masterEsSchemaIndex)):
+            if i >= maxSize:
+                break
+            _ES_PROPERTIES_CACHE.set((self.masterEsSchemaIndex, hit["_id"]), hit["_source"]["esSchema"])
+
+    @staticmethod
+    def _scan(index: str):
+        return scan(get_es_conn(), index=index, doc_type="default", query={"query": {"match_all": {}}})
 
     def add_json_schema_as_hash(self, jsonSchema: dict, shouldValidate: bool = False, nestedFields=[]) -> str:
         """
@@ -324,6 +350,8 @@ class SchemaList:
         entry["esHash"] = esHash
         entry["jsonSchema"] = json.dumps(jsonSchema)
         es.create(index=self.masterJsonSchemaIndex, doc_type="default", id=id, body=entry)
+        # Replaces a stale entry, if an environment with the same id was deleted by another process
+        _JSON_SCHEMA_INFO_CACHE.set((self.masterJsonSchemaIndex, id), entry)
 
         return id
 
@@ -371,15 +399,46 @@ class SchemaList:
         :param jsonSchemaId:
         :return:
         """
-        es = get_es_conn()
-        try:
-            res = es.get(index=self.masterJsonSchemaIndex, doc_type="default", id=jsonSchemaId)
-            doc = res['_source']
-            doc["id"] = jsonSchemaId
-            doc["jsonSchema"] = json.loads(res["_source"]["jsonSchema"])
-            return doc
-        except exceptions.NotFoundError:
-            raise JsonSchemaDoesntExistException(jsonSchemaId)
+        key = (self.masterJsonSchemaIndex, jsonSchemaId)
+        source = _JSON_SCHEMA_INFO_CACHE.get(key)
+        if source is None:
+            es = get_es_conn()
+            try:
+                source = es.get(index=self.masterJsonSchemaIndex, doc_type="default", id=jsonSchemaId)["_source"]
+            except exceptions.NotFoundError:
+                raise JsonSchemaDoesntExistException(jsonSchemaId)
+            _JSON_SCHEMA_INFO_CACHE.set(key, source)
+        doc = dict(source)
+        doc["id"] = jsonSchemaId
+        doc["jsonSchema"] = json.loads(source["jsonSchema"])
+        return doc
+
+    def get_json_schema_strings(self, jsonSchemaIds: List[str]) -> dict:
+        """
+        Returns many json schemas as stored, without parsing them. Schemas which are not cached are read with a
+        single request.
+
+        :param jsonSchemaIds:
+        :return:    {jsonSchemaId: json schema as a json string}
+        """
+        sources = {}
+        missingIds = []
+        for jsonSchemaId in set(jsonSchemaIds):
+            source = _JSON_SCHEMA_INFO_CACHE.get((self.masterJsonSchemaIndex, jsonSchemaId))
+            if source is None:
+                missingIds.append(jsonSchemaId)
+            else:
+                sources[jsonSchemaId] = source
+
+        if missingIds:
+            res = get_es_conn().mget(index=self.masterJsonSchemaIndex, doc_type="default", body={"ids": missingIds})
+            for doc in res["docs"]:
+                if not doc.get("found"):
+                    raise JsonSchemaDoesntExistException(doc["_id"])
+                _JSON_SCHEMA_INFO_CACHE.set((self.masterJsonSchemaIndex, doc["_id"]), doc["_source"])
+                sources[doc["_id"]] = doc["_source"]
+
+        return {jsonSchemaId: source["jsonSchema"] for jsonSchemaId, source in sources.items()}
 
     def convert_json_schema_to_es_properties(self, jsonSchema: dict, nestedFields=[]):
         """
@@ -518,6 +577,7 @@ class SchemaList:
             es.get(index=self.masterEsSchemaIndex, doc_type="default", id=esHash)
         except exceptions.NotFoundError:
             es.create(index=self.masterEsSchemaIndex, doc_type="default", body={"esSchema": schemaDump}, id=esHash)
+        _ES_PROPERTIES_CACHE.set((self.masterEsSchemaIndex, esHash), schemaDump)
 
         return esHash
 
@@ -528,13 +588,17 @@ class SchemaList:
         :param esHash:
         :return:
         """
-        es = get_es_conn()
-        try:
-            propertiesInfo = es.get(index=self.masterEsSchemaIndex, doc_type="default", id=esHash)
-            esProperties = json.loads(propertiesInfo["_source"]["esSchema"])
-            return esProperties
-        except exceptions.NotFoundError:
-            raise EsSchemaDoesntExist(esHash)
+        key = (self.masterEsSchemaIndex, esHash)
+        schemaDump = _ES_PROPERTIES_CACHE.get(key)
+        if schemaDump is None:
+            es = get_es_conn()
+            try:
+                propertiesInfo = es.get(index=self.masterEsSchemaIndex, doc_type="default", id=esHash)
+            except exceptions.NotFoundError:
+                raise EsSchemaDoesntExist(esHash)
+            schemaDump = propertiesInfo["_source"]["esSchema"]
+            _ES_PROPERTIES_CACHE.set(key, schemaDump)
+        return json.loads(schemaDump)
 
     @staticmethod
     def mapping_field_index_with_search_mode(search_mode: str, language: str) -> dict:
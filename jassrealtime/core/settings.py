@@ -16,7 +16,49 @@ NB_DOCUMENTS_PER_SCAN_SCROLL = int(os.environ.get("SCAN_SCROLL_DURATION", "1000"
 NUMBER_OF_SHARDS = int(os.environ.get("NUMBER_OF_SHARDS", "1"))
 NUMBER_OF_REPLICAS = int(os.environ.get("NUMBER_OF_REPLICAS", "0"))
 JASS_EXPOSE_SWAGGER = os.environ.get("JASS_EXPOSE_SWAGGER", "True")
+JASS_EXPOSE_METRICS = os.environ.get("JASS_EXPOSE_METRICS", "True")  # prometheus metrics on /metrics
+# If True, requests with the X-Jass-Trace header get the elastic search calls they made in the same response header
+JASS_ALLOW_TRACE_HEADER = os.environ.get("JASS_ALLOW_TRACE_HEADER", "False")
+# Requests slower than this number of seconds are logged with their elastic search calls. 0 disables it.
+JASS_SLOW_REQUEST_THRESHOLD = float(os.environ.get("JASS_SLOW_REQUEST_THRESHOLD", "0"))
+# Number of characters of the elastic search request bodies kept in traces
+JASS_TRACE_BODY_LENGTH = int(os.environ.get("JASS_TRACE_BODY_LENGTH", "200"))
 JASS_ES_CONNECTION_TIMEOUT = os.environ.get("JASS_ES_CONNECTION_TIMEOUT", 30)
+# Number of threads per process running blocking work (elastic search requests) for the web handlers
+JASS_NB_WORKER_THREADS = int(os.environ.get("JASS_NB_WORKER_THREADS", "25"))
+# Maximal number of connections of each process to each elastic search node. Defaults to one per worker thread.
+JASS_ES_MAXSIZE = int(os.environ.get("JASS_ES_MAXSIZE", str(JASS_NB_WORKER_THREADS)))
+# Seconds before probing idle connections to elastic search (tcp keepalive), so they are not silently dropped
+JASS_ES_TCP_KEEPALIVE_IDLE = int(os.environ.get("JASS_ES_TCP_KEEPALIVE_IDLE", "60"))
+# Batch annotation imports: annotations per bulk request, bulk requests in parallel, zip files parsed in parallel
+JASS_BULK_CHUNK_SIZE = int(os.environ.get("JASS_BULK_CHUNK_SIZE", "1000"))
+JASS_NB_BULK_THREADS = int(os.environ.get("JASS_NB_BULK_THREADS", "4"))
+JASS_NB_BULK_PARSE_THREADS = int(os.environ.get("JASS_NB_BULK_PARSE_THREADS", "2"))
+# Batch annotation exports: (bucket, schema type) exported in parallel, sliced scrolls per index (0: number of shards)
+JASS_NB_EXPORT_THREADS = int(os.environ.get("JASS_NB_EXPORT_THREADS", "4"))
+JASS_NB_EXPORT_SLICES = int(os.environ.get("JASS_NB_EXPORT_SLICES", "0"))
+# max_result_window of created data indices: highest from + size of from/size pagination.
+# Listings can be paginated with cursors instead, which don't need a large window.
+JASS_MAX_RESULT_WINDOW = int(os.environ.get("JASS_MAX_RESULT_WINDOW", "500000"))
+# Number of seconds the cluster is considered ready after a successful health check
+JASS_ES_READY_CHECK_INTERVAL = float(os.environ.get("JASS_ES_READY_CHECK_INTERVAL", "30"))
+# Number of seconds a doc type to index name mapping is kept in memory. 0 disables the cache.
+JASS_TYPE_INDEX_CACHE_TTL = float(os.environ.get("JASS_TYPE_INDEX_CACHE_TTL", "60"))
+# Number of seconds the document counts of the corpus listing are kept in memory. 0 disables the cache.
+JASS_CORPUS_COUNT_CACHE_TTL = float(os.environ.get("JASS_CORPUS_COUNT_CACHE_TTL", "5"))
+# Number of seconds the structure of a corpus (buckets and their schemas) is kept in memory. 0 disables the cache.
+JASS_CORPUS_STRUCTURE_CACHE_TTL = float(os.environ.get("JASS_CORPUS_STRUCTURE_CACHE_TTL", "60"))
+# Maximum number of json schemas, and of elastic search properties, kept in memory. Schemas never change once
+# stored, so entries don't expire. 0 disables the cache.
+JASS_SCHEMA_CACHE_SIZE = int(os.environ.get("JASS_SCHEMA_CACHE_SIZE", "1000"))
+# Number of seconds the authorization of a token, with its verification and permission decisions, is kept in memory.
+# Permission changes are seen once it expires. 0 disables the cache.
+JASS_AUTHORIZATION_CACHE_TTL = float(os.environ.get("JASS_AUTHORIZATION_CACHE_TTL", "60"))
+# Maximum number of token authorizations, and of token verifications, kept in memory.
+JASS_AUTHORIZATION_CACHE_SIZE = int(os.environ.get("JASS_AUTHORIZATION_CACHE_SIZE", "10000"))
+# Number of seconds the metadata of directories, corpora and buckets is kept in memory. Bounds how long
+# modifications made by other processes go unseen. 0 disables the catalog.
+JASS_CATALOG_TTL = float(os.environ.get("JASS_CATALOG_TTL", "30"))
 
 JASS_ALLOW_CORS = True
 if os.environ.get("JASS_ALLOW_CORS", "True") == "True":
@@ -47,8 +89,10 @@ _SETTINGS = {
         "sniffer_timeout": 120,
         "sniff_timeout": 60,
         "cluster_health_timeout": 120,
-        # Maximal number of connections to each elastic search node
-        "maxsize": 25,
+        "cluster_ready_check_interval": JASS_ES_READY_CHECK_INTERVAL,
+        # Maximal number of connections of each process to each elastic search node
+        "maxsize": JASS_ES_MAXSIZE,
+        "tcp_keepalive_idle": JASS_ES_TCP_KEEPALIVE_IDLE,
         "scan_scroll_duration": SCAN_SCROLL_DURATION,
         "timeout": JASS_ES_CONNECTION_TIMEOUT
     },
@@ -91,8 +135,13 @@ _SETTINGS = {
             'BUCKET_BINDING_INDEX_SUFFIX': 'bucket_bindings'
         },
         'BATCH': {
-            "MAX_ANNOTAION_BULK_SIZE": 10000000
+            "MAX_ANNOTAION_BULK_SIZE": 10000000,
             # maximum size of annotations sent to elastic search bulk method. Default 10MB
+            "BULK_CHUNK_SIZE": JASS_BULK_CHUNK_SIZE,  # maximum number of annotations per bulk request
+            "NB_BULK_THREADS": JASS_NB_BULK_THREADS,  # number of bulk requests sent in parallel
+            "NB_BULK_PARSE_THREADS": JASS_NB_BULK_PARSE_THREADS,  # number of zip files decoded in parallel
+            "NB_EXPORT_THREADS": JASS_NB_EXPORT_THREADS,  # number of (bucket, schema type) exported in parallel
+            "NB_EXPORT_SLICES": JASS_NB_EXPORT_SLICES  # sliced scrolls per exported index. 0: number of shards
         },
 
     },
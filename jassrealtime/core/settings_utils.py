@@ -6,7 +6,11 @@ _SETT_PATH = None
 
 from jassrealtime.core.settings import _SETTINGS, JASS_ENV, JASS_MANAGE_ENV, JASS_REBUILD_ENV, \
     FILE_STORAGE_DATA_URL, JASS_TMP_DIR, JASS_ALLOW_CORS, JASS_LOG_LEVEL, JASS_NB_CORES, \
-    NUMBER_OF_SHARDS, NUMBER_OF_REPLICAS, NB_DOCUMENTS_PER_SCAN_SCROLL, JASS_EXPOSE_SWAGGER
+    NUMBER_OF_SHARDS, NUMBER_OF_REPLICAS, NB_DOCUMENTS_PER_SCAN_SCROLL, JASS_EXPOSE_SWAGGER, \
+    JASS_TYPE_INDEX_CACHE_TTL, JASS_NB_WORKER_THREADS, JASS_CORPUS_COUNT_CACHE_TTL, \
+    JASS_CORPUS_STRUCTURE_CACHE_TTL, JASS_MAX_RESULT_WINDOW, JASS_EXPOSE_METRICS, JASS_ALLOW_TRACE_HEADER, \
+    JASS_SLOW_REQUEST_THRESHOLD, JASS_TRACE_BODY_LENGTH, JASS_SCHEMA_CACHE_SIZE, \
+    JASS_AUTHORIZATION_CACHE_TTL, JASS_AUTHORIZATION_CACHE_SIZE, JASS_CATALOG_TTL
 from jassrealtime.core.language_manager import LanguageManager
 
 
@@ -110,4 +114,56 @@ def get_nb_documents_per_scan_scroll():
 
 
 def get_expose_swagger():
-    return (JASS_EXPOSE_SWAGGER == "True")
\ No newline at end of file
+    return (JASS_EXPOSE_SWAGGER == "True")
+
+
+def get_expose_metrics():
+    return (JASS_EXPOSE_METRICS == "True")
+
+
+def is_trace_header_allowed():
+    return (JASS_ALLOW_TRACE_HEADER == "True")
+
+
+def get_slow_request_threshold():
+    return JASS_SLOW_REQUEST_THRESHOLD
+
+
+def get_trace_body_length():
+    return JASS_TRACE_BODY_LENGTH
+
+
+def get_max_result_window():
+    return JASS_MAX_RESULT_WINDOW
+
+
+def get_type_index_cache_ttl():
+    return JASS_TYPE_INDEX_CACHE_TTL
+
+
+def get_corpus_count_cache_ttl():
+    return JASS_CORPUS_COUNT_CACHE_TTL
+
+
+def get_corpus_structure_cache_ttl():
+    return JASS_CORPUS_STRUCTURE_CACHE_TTL
+
+
+def get_schema_cache_size():
+    return JASS_SCHEMA_CACHE_SIZE
+
+
+def get_authorization_cache_ttl():
+    return JASS_AUTHORIZATION_CACHE_TTL
+
+
+def get_authorization_cache_size():
+    return JASS_AUTHORIZATION_CACHE_SIZE
+
+
+def get_catalog_ttl():
+    return JASS_CATALOG_TTL
+
+
+def get_nb_worker_threads():
+    return JASS_NB_WORKER_THREADS
@@ -0,0 +1,92 @@
+# coding: utf-8
+
+# Records the elastic search calls made while serving one request, to find the requests making many calls.
+# The trace of a request is attached to the threads working for it (see traced), and the elastic search
+# transport records each call in the trace of its thread.
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+_CURRENT = threading.local()
+
+
+class RequestTrace:
+    """
+    Elastic search calls of one request. Can be recorded from many threads.
+    """
+
+    def __init__(self, maxBodyLength: int = 200):
+        """
+        :param maxBodyLength:   Request bodies are truncated to this number of characters
+        """
+        self.maxBodyLength = maxBodyLength
+        self.start = time.monotonic()
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def record(self, operation: str, method: str, url: str, body, duration: float, error: Exception = None):
+        """
+        :param duration:    In seconds
+        :param error:       Exception raised by the call, if any
+        """
+        call = {"operation": operation,
+                "method": method,
+                "url": url,
+                "startMs": round((time.monotonic() - self.start - duration) * 1000, 1),
+                "durationMs": round(duration * 1000, 1)}
+        if body is not None:
+            call["body"] = self._truncate(body)
+        if error is not None:
+            call["error"] = self._truncate(repr(error))
+        with self._lock:
+            self.calls.append(call)
+
+    def _truncate(self, body) -> str:
+        if isinstance(body, bytes):
+            body = body.decode("utf-8", errors="replace")
+        elif not isinstance(body, str):
+            body = json.dumps(body)
+        if len(body) > self.maxBodyLength:
+            body = body[:self.maxBodyLength] + "..."
+        return body
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            calls = list(self.calls)
+        return {"nbCalls": len(calls),
+                "totalMs": round(sum(call["durationMs"] for call in calls), 1),
+                "calls": calls}
+
+
+def get_current_trace() -> RequestTrace:
+    """
+    :return:    Trace of the request the current thread is working for, None if the request is not traced
+    """
+    return getattr(_CURRENT, "trace", None)
+
+
+@contextmanager
+def tracing(trace: RequestTrace):
+    """
+    Records the elastic search calls of the current thread in trace during the with block.
+    """
+    previous = get_current_trace()
+    _CURRENT.trace = trace
+    try:
+        yield trace
+    finally:
+        _CURRENT.trace = previous
+
+
+def traced(trace: RequestTrace, fn):
+    """
+    :return:    fn, recording its elastic search calls in trace when called, from any thread
+    """
+
+    def run(*args, **kwargs):
+        with tracing(trace):
+            return fn(*args, **kwargs)
+
+    return run
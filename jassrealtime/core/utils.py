@@ -1,4 +1,6 @@
 import json
+import queue
+import threading
 from uuid import uuid1
 
 
@@ -9,3 +11,22 @@ def utf8_json_dump(data: dict):
 # Why we use UUID1 http://stackoverflow.com/questions/1785503/when-should-i-use-uuid-uuid1-vs-uuid-uuid4-in-python
 def gen_uuid() -> str:
     return str(uuid1())
+
+
+class StoppedException(Exception):
+    pass
+
+
+def put_unless_stopped(q: queue.Queue, item, stop: threading.Event, pollInterval: float = 0.1):
+    """
+    Puts item in a bounded queue, giving up if stop is set while the queue is full (ex: the consumer failed).
+
+    :raise StoppedException: if stop was set before the item could be put
+    """
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=pollInterval)
+            return
+        except queue.Full:
+            pass
+    raise StoppedException()
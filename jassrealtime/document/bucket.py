@@ -11,6 +11,9 @@ from ..core.document_directory import *
 from ..core.master_factory_list import get_master_document_directory_list, get_schema_list
 from ..core.esutils import multi_indexes_small_search
 from ..core.settings_utils import get_number_of_replicas, get_number_of_shards
+from .corpus_structure import invalidate_corpus_structure
+from ..core.catalog import CATALOG, BUCKET
+from ..core.request_context import RequestContext, memoized, forget
 
 BUCKET_BINDING_INDEX_MAPPING = {
     "mappings": {
@@ -54,6 +57,9 @@ BUCKET_MAPPING = {
     }
 }
 
+# Field of annotations sent by users containing their id
+ANNOTATION_ID_FIELD = "annotationId"
+
 
 class BucketException(Exception):
     pass
@@ -103,7 +109,6 @@ class BucketList:
 
         :return:
         """
-        es = get_es_conn()
         bucketBindingIndex = envId + sett['CLASS_PREFIX'] + sett['BUCKET_BINDING_INDEX_SUFFIX']
         if check_index_name_valid_for_create(bucketBindingIndex, envId, sett['CLASS_PREFIX']):
             es_wait_ready()
@@ -111,34 +116,33 @@ class BucketList:
             body["settings"] = {}
             body["settings"]["index"] = {"number_of_shards": get_number_of_shards(),
                                          "number_of_replicas": get_number_of_replicas()}
-            es.indices.create(index=bucketBindingIndex, body=body)
-            es_wait_ready()
+            es_create_index(bucketBindingIndex, body=body)
             masterList = get_master_document_directory_list(envId, authorization)
             bucketMasterDir = masterList.create_document_directory(sett['MASTER_BUCKET_ID'])
-            es_wait_ready()
-            time.sleep(1)  # time to create indices
             bucketMasterDir.add_or_update_schema(BUCKET_MAPPING['mappings']['default'])
-            es_wait_ready()
-            time.sleep(1)  # time to create indices
 
         return BucketList(envId, sett, bucketMasterDir, authorization)
 
-    def __init__(self, envId, sett, dd: DocumentsDirectory, authorization: BaseAuthorization):
-
+    def __init__(self, envId, sett, dd: DocumentsDirectory, authorization: BaseAuthorization,
+                 context: RequestContext = None):
+        """
+        :param dd:          Master bucket directory
+        :param context:     Request context memoizing the buckets, see master_factory_list
+        """
         self.envId = envId
         self.classPrefix = sett['CLASS_PREFIX']
         self.masterBucketId = sett['MASTER_BUCKET_ID']
         self.bucketBindingIndex = envId + sett['CLASS_PREFIX'] + sett['BUCKET_BINDING_INDEX_SUFFIX']
-        self.masterList = get_master_document_directory_list(envId, authorization)
-        self.dd = self.masterList.get_directory(self.masterBucketId)
+        self.masterList = get_master_document_directory_list(envId, authorization, context)
+        self.dd = dd
         self.authorization = authorization
+        self.context = context
 
     def delete(self):
         """
         Delete bucket directory and all bindings. Must have authorisation to delete each bucket.
         :return:
         """
-        es = get_es_conn()
         es_wait_ready()
         bucketIDs = self.dd.small_search(useScan=False)
         for metadata in bucketIDs:
@@ -180,9 +184,11 @@ class BucketList:
             id = gen_uuid()
             bucketCorpusId = BucketList.get_bucket_corpus_id(corpusId, id)
 
-        self.dd.add_document(
-            {"name": name, "corpusId": corpusId, "bucketId": id}, bucketCorpusId)
+        bucketInfo = {"name": name, "corpusId": corpusId, "bucketId": id}
+        self.dd.add_document(bucketInfo, bucketCorpusId)
         dd = self.masterList.create_document_directory(bucketCorpusId, None, False)
+        CATALOG.put(self.envId, BUCKET, bucketCorpusId, bucketInfo)
+        invalidate_corpus_structure(self.envId, corpusId)
 
         return Bucket(self.envId, self.bucketBindingIndex, self.authorization, dd, name, id, corpusId)
 
@@ -196,10 +202,12 @@ class BucketList:
         """
 
         self.authorization.can_read_bucket(corpusId, id)
+        return memoized(self.context, ("bucket", self.envId, corpusId, id), lambda: self._read_bucket(corpusId, id))
 
+    def _read_bucket(self, corpusId: str, id: str) -> 'Bucket':
         try:
             bucketCorpusId = BucketList.get_bucket_corpus_id(corpusId, id)
-            bucketInfo = self.dd.get_document(bucketCorpusId)
+            bucketInfo = CATALOG.get(self.envId, BUCKET, bucketCorpusId, lambda: self.dd.get_document(bucketCorpusId))
             dd = self.masterList.get_directory(bucketCorpusId)
             return Bucket(self.envId, self.bucketBindingIndex, self.authorization, dd, bucketInfo["name"], id,
                           bucketInfo["corpusId"])
@@ -227,6 +235,8 @@ class BucketList:
                 es.delete(index=self.bucketBindingIndex, doc_type="default", id=binding["id"])
 
             bucketCorpusId = BucketList.get_bucket_corpus_id(corpusId, id)
+            CATALOG.remove(self.envId, BUCKET, bucketCorpusId)
+            forget(self.context, ("bucket", self.envId, corpusId, id))
             self.dd.delete_document(bucketCorpusId)
             self.masterList.delete_document_directory(bucket.dd)
 
@@ -236,6 +246,8 @@ class BucketList:
         except DocumentDirectoryDoesntExistsException as e:
             logger.warning(e)
             raise BucketNotFoundException(id)
+        finally:
+            invalidate_corpus_structure(self.envId, corpusId)
 
     def get_all_buckets_for_corpus(self, corpusId: str) -> List:
         """
@@ -247,21 +259,39 @@ class BucketList:
         """
         res = []
         bucketInfoArr = self.dd.small_search(termFields={"corpusId": corpusId}, useScan=False)
+        # If no access we simply dont show it.
+        readableIds = set(self.authorization.filter_readable_buckets(
+            corpusId, [bucketInfo["bucketId"] for bucketInfo in bucketInfoArr]))
         for bucketInfo in bucketInfoArr:
-            try:
-                self.authorization.can_read_bucket(corpusId, bucketInfo["bucketId"])
-                bucketId = bucketInfo["bucketId"]
-                bucketCorpusId = BucketList.get_bucket_corpus_id(corpusId, bucketId)
-                dd = self.masterList.get_directory(bucketCorpusId)
-                res.append(
-                    Bucket(self.envId, self.bucketBindingIndex, self.authorization, dd, bucketInfo["name"], bucketId,
-                           bucketInfo["corpusId"]))
-            finally:
-                # If no access we simply dont show it.
-                pass
+            bucketId = bucketInfo["bucketId"]
+            if bucketId not in readableIds:
+                continue
+            bucketCorpusId = BucketList.get_bucket_corpus_id(corpusId, bucketId)
+            dd = self.masterList.get_directory(bucketCorpusId)
+            res.append(
+                Bucket(self.envId, self.bucketBindingIndex, self.authorization, dd, bucketInfo["name"], bucketId,
+                       bucketInfo["corpusId"]))
 
         return res
 
+    def get_corpus_json_schemas(self, corpusId: str, useScan=False) -> dict:
+        """
+        Returns the json schemas of all the buckets of a corpus, with one request for the schema bindings and at
+        most one for the schemas.
+
+        :param useScan: See Bucket.get_schemas_info
+        :return:    {bucketId: [{"schemaType":"type of schema","jsonSchema": json schema}]}
+        """
+        bindings = multi_indexes_small_search(self.bucketBindingIndex, {}, {"corpusId": corpusId},
+                                              ["jsonSchemaId", "docType", "bucketId"], {}, {}, useScan)
+        jsonSchemas = get_schema_list(self.envId, self.authorization).get_json_schema_strings(
+            [binding["jsonSchemaId"] for binding in bindings])
+        schemasPerBucket = {}
+        for binding in bindings:
+            schemasPerBucket.setdefault(binding["bucketId"], []).append(
+                {"schemaType": binding["docType"], "jsonSchema": json.loads(jsonSchemas[binding["jsonSchemaId"]])})
+        return schemasPerBucket
+
     def get_bucket_indexes(self, corpusId, bucketsIds: List[str] = [], bucketNames: List[str] = [],
                            docTypes=["default"]):
         """
@@ -384,6 +414,8 @@ class Bucket:
         except exceptions.NotFoundError:
             es.create(index=self.bucketBindingIndex, doc_type="default", id=id, body=bindingInfo)
             self.dd.add_or_update_schema(schemaList.get_es_properties(esHashTo), docType)
+        finally:
+            invalidate_corpus_structure(self.envId, self.corpusId)
 
     def delete_schema_type(self, docType: str):
         """
@@ -406,6 +438,8 @@ class Bucket:
 
         except exceptions.NotFoundError:
             raise SchemaTypeNotFoundException("Schema to delete not found {0}".format(docType))
+        finally:
+            invalidate_corpus_structure(self.envId, self.corpusId)
 
     def get_schemas_info(self, includeJson=False, useScan=False):
         """
@@ -417,21 +451,34 @@ class Bucket:
         :return:    {data: [{"schemaType":"type of schema","jsonSchema":"json of schema if applicable"}]}
         """
         result = {"data": []}
-        schemasBindings = multi_indexes_small_search(self.bucketBindingIndex, {},
-                                                     {"corpusId": self.corpusId, "bucketId": self.id},
-                                                     ["jsonSchemaId", "docType"], {}, {}, useScan)
         if includeJson:
-            schemasList = get_schema_list(self.envId, self.authorization)
-            for binding in schemasBindings:
-                schemaInfo = schemasList.get_json_schema_info(binding["jsonSchemaId"])
+            bindings = self._get_schemas_bindings(useScan)
+            jsonSchemas = get_schema_list(self.envId, self.authorization).get_json_schema_strings(
+                [binding["jsonSchemaId"] for binding in bindings])
+            for binding in bindings:
                 result["data"].append(
-                    {"schemaType": binding["docType"], "jsonSchema": json.dumps(schemaInfo["jsonSchema"])})
+                    {"schemaType": binding["docType"], "jsonSchema": jsonSchemas[binding["jsonSchemaId"]]})
         else:
-            for binding in schemasBindings:
+            for binding in self._get_schemas_bindings(useScan):
                 result["data"].append({"schemaType": binding["docType"]})
 
         return result
 
+    def get_json_schemas(self, useScan=False) -> List[dict]:
+        """
+        Returns the json schemas associated to the bucket, as dictionaries.
+
+        :param useScan: See get_schemas_info
+        :return:    [{"schemaType":"type of schema","jsonSchema": json schema}]
+        """
+        return [{"schemaType": schema["schemaType"], "jsonSchema": json.loads(schema["jsonSchema"])}
+                for schema in self.get_schemas_info(True, useScan)["data"]]
+
+    def _get_schemas_bindings(self, useScan=False) -> List[dict]:
+        return multi_indexes_small_search(self.bucketBindingIndex, {},
+                                          {"corpusId": self.corpusId, "bucketId": self.id},
+                                          ["jsonSchemaId", "docType"], {}, {}, useScan)
+
     def delete_annotations(self, schemaType: string):
         """
         Deletes all annotations with a given schema
@@ -440,24 +487,75 @@ class Bucket:
         self.dd.empty_doc_type(schemaType)
 
     def add_annotations_mini_batch(self, jsonAnnotationsWithIds: List, docType: str = "default",
-                                   shouldValidate: bool = False):
+                                   shouldValidate: bool = False) -> List:
         """
-        Add a batch of annotations. TERRIBLY INEFFICIENT.
-        If one annotation crashes, it stops in the middle of operation.
+        Add a batch of annotations of the same type. See add_annotations.
 
         :param jsonAnnotationWithIds:  Format : [anno1,annoN] with their ids.
                     (if no ids present they will be generated)
         :param docType:
-        :param shouldValidate:
-        :return:
+        :param shouldValidate:  If true, annotations are added one at a time by add_annotation, which validates them
+        :return:    [(annotationId, exception)] as returned by add_annotations
         """
+        if shouldValidate:
+            results = []
+            for annotation in jsonAnnotationsWithIds:
+                annotation = dict(annotation)
+                annotationId = annotation.pop("id", None)
+                results.append((self.add_annotation(annotation, docType, annotationId, shouldValidate), None))
+            return results
+
+        annotations = []
         for annotation in jsonAnnotationsWithIds:
-            annotationId = None
+            annotation = dict(annotation)
             if "id" in annotation:
-                annotationId = annotation["id"]
-                del annotation[id]
+                annotation[ANNOTATION_ID_FIELD] = annotation.pop("id")
+            annotation["schemaType"] = docType
+            annotations.append(annotation)
+        return self.add_annotations(annotations)
+
+    def add_annotations(self, jsonAnnotations: List[dict]) -> List:
+        """
+        Creates many annotations with bulk requests, one schema type at a time.
+        A failing annotation doesn't stop the others from being added.
 
-            self.add_annotation(annotation, docType, annotationId, shouldValidate)
+        :param jsonAnnotations: Annotations, each with its "schemaType" and optionally its "annotationId"
+                                    (generated if absent). "annotationId" is not stored in the annotation.
+        :return:    [(annotationId, exception)] in the order of jsonAnnotations. exception is None if the annotation
+                    was added, else the exception add_annotation would have raised (DocumentAlreadyExistsException,
+                    DocumentDoesNotRespectSchemaException) or SchemaTypeNotFoundException.
+        """
+        self.authorization.can_add_annotation(self.corpusId, self.id)
+
+        results = []
+        annotationsPerType = {}
+        seenIds = set()
+        for annotation in jsonAnnotations:
+            annotation = dict(annotation)
+            annotationId = annotation.pop(ANNOTATION_ID_FIELD, None) or gen_uuid()
+            schemaType = annotation.get("schemaType")
+            result = [annotationId, None]
+            results.append(result)
+            if not schemaType:
+                result[1] = SchemaTypeNotFoundException("Missing schemaType field")
+            elif (schemaType, annotationId) in seenIds:
+                result[1] = DocumentAlreadyExistsException("Annotation id: {0} appears twice".format(annotationId))
+            else:
+                seenIds.add((schemaType, annotationId))
+                annotationsPerType.setdefault(schemaType, []).append((annotationId, annotation, result))
+
+        for schemaType, annotations in annotationsPerType.items():
+            try:
+                failed = self.dd.add_documents(((annotationId, annotation) for annotationId, annotation, result
+                                                in annotations), schemaType, createDataIndexIfNotExist=False)
+            except DocumentDirectoryNoSchemaFoundException:
+                failed = [(annotationId, SchemaTypeNotFoundException(schemaType))
+                          for annotationId, annotation, result in annotations]
+            failedPerId = dict(failed)
+            for annotationId, annotation, result in annotations:
+                result[1] = failedPerId.get(annotationId)
+
+        return [tuple(result) for result in results]
 
     def get_es_index_per_schema_type(self):
         """
@@ -467,6 +565,14 @@ class Bucket:
         """
         return self.dd.get_indices_per_doc_type()
 
+    def bulk_load_mode(self, schemaTypes: List[str] = None):
+        """
+        Context manager speeding up the load of many annotations. See DocumentsDirectory.bulk_load_mode.
+
+        :param schemaTypes:     Schema types to load. If None, all schema types of the bucket.
+        """
+        return self.dd.bulk_load_mode(schemaTypes)
+
     def add_annotation(self, jsonAnnotation: dict, docType: str = "default", annotationId: str = None,
                        shouldValidate: bool = False):
         """
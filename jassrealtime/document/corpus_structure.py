@@ -0,0 +1,79 @@
+# coding: utf-8
+
+# Structure of a corpus: its languages, its buckets and the json schemas bound to each bucket.
+# Rebuilding it needs many elastic search requests, while it rarely changes and UI clients poll it constantly,
+# so it is cached per process. Every bucket or schema binding mutation invalidates the structure of its corpus.
+
+import hashlib
+import json
+import threading
+from typing import List
+
+from ..core.cache import TTLCache
+from ..core.settings_utils import get_corpus_structure_cache_ttl
+
+
+class CorpusStructure:
+    """
+    Read only snapshot of the structure of a corpus. Must not be modified since it is shared between requests.
+    """
+
+    def __init__(self, corpusId: str, languages: List[str], buckets: List[dict]):
+        """
+        :param corpusId:
+        :param languages:   Languages of the corpus
+        :param buckets:     [{"id": bucketId, "name": name, "schemas": [{"schemaType": type, "jsonSchema": dict}]}]
+        """
+        self.corpusId = corpusId
+        self.languages = languages
+        self.buckets = buckets
+        # Depends only on the content, so every process computes the same version for the same structure.
+        self.version = hashlib.sha1(
+            json.dumps({"languages": languages, "buckets": buckets}, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get_bucket(self, bucketId: str) -> dict:
+        """
+        :return:    The bucket structure, None if the bucket doesn't exist
+        """
+        for bucket in self.buckets:
+            if bucket["id"] == bucketId:
+                return bucket
+        return None
+
+
+# Process wide cache: (envId, corpusId) -> CorpusStructure
+_CORPUS_STRUCTURE_CACHE = TTLCache(get_corpus_structure_cache_ttl())
+# Incremented on every invalidation, so a structure built while the corpus was modified is not cached.
+_CORPUS_STRUCTURE_GENERATIONS = {}
+_CORPUS_STRUCTURE_LOCK = threading.Lock()
+
+
+def get_corpus_structure(envId: str, corpusId: str, build_structure) -> CorpusStructure:
+    """
+    Returns the cached structure of a corpus, or builds and caches it.
+
+    :param build_structure:     function() -> CorpusStructure, called if the structure is not cached
+    """
+    key = (envId, corpusId)
+    structure = _CORPUS_STRUCTURE_CACHE.get(key)
+    if structure is not None:
+        return structure
+
+    with _CORPUS_STRUCTURE_LOCK:
+        generation = _CORPUS_STRUCTURE_GENERATIONS.get(key, 0)
+    structure = build_structure()
+    with _CORPUS_STRUCTURE_LOCK:
+        if _CORPUS_STRUCTURE_GENERATIONS.get(key, 0) == generation:
+            _CORPUS_STRUCTURE_CACHE.set(key, structure)
+    return structure
+
+
+def invalidate_corpus_structure(envId: str, corpusId: str):
+    """
+    Removes the cached structure of a corpus. Must be called after any modification of its languages, buckets
+    or schema bindings. Other processes see the modification once their cached structure expires.
+    """
+    key = (envId, corpusId)
+    with _CORPUS_STRUCTURE_LOCK:
+        _CORPUS_STRUCTURE_GENERATIONS[key] = _CORPUS_STRUCTURE_GENERATIONS.get(key, 0) + 1
+        _CORPUS_STRUCTURE_CACHE.delete(key)
@@ -7,12 +7,17 @@ from elasticsearch_dsl.response import Hit
 
 from .bucket import *
 from .document_sub_corpus import *
+from .corpus_structure import CorpusStructure, get_corpus_structure, invalidate_corpus_structure
 from ..core.master_factory_list import get_master_document_directory_list, \
     get_master_document_sub_corpus_list, get_master_bucket_list
 
-from ..core.esutils import ES_DATE_FORMAT, convert_datetime_to_es, convert_es_date_to_datetime
+from ..core.cache import TTLCache
+from ..core.catalog import CATALOG, CORPUS
+from ..core.request_context import RequestContext, memoized, forget
+from ..core.esutils import ES_DATE_FORMAT, convert_datetime_to_es, convert_es_date_to_datetime, paginate_search, \
+    get_next_cursor
 from ..core.settings_utils import get_language_manager, get_scan_scroll_duration, \
-    get_nb_documents_per_scan_scroll
+    get_nb_documents_per_scan_scroll, get_corpus_count_cache_ttl
 
 from functools import reduce
 from operator import or_, and_
@@ -43,6 +48,9 @@ MODIFICATION_DATE_FIELD = "modificationDate"
 LANGUAGES_FIELD = "languages"
 CORPUS_DOCUMENT_COUNT = 'documentCount'
 
+# Process wide cache of the document counts of the corpus listing: envId -> {corpusId: documentCount}
+_CORPUS_COUNT_CACHE = TTLCache(get_corpus_count_cache_ttl())
+
 # list of default properties
 CORPUS_LIST_PROPERTIES_MAPPING = {
     "properties": {
@@ -164,7 +172,7 @@ class DocumentCorpus:
         return document
 
     def __init__(self, envId: str, dd: DocumentsDirectory, id: str, authorization: BaseAuthorization,
-                 languages: [str] = None, modificationDate: datetime = None):
+                 languages: [str] = None, modificationDate: datetime = None, context: RequestContext = None):
         """
             corpus["language"] = doc.get("language")
 
@@ -172,6 +180,7 @@ class DocumentCorpus:
         :param envId:              DocumentDirectory associated with this corpus. Contains all documents
         :param dd:                  DocumentDirectory containing all the document of the corpus
         :param id:                  Unique ID of corpus. (Unique for JIAS per envId)
+        :param context:             Request context, see master_factory_list
         """
 
         self.languages = languages
@@ -180,9 +189,23 @@ class DocumentCorpus:
         self.dd = dd
         self.id = id
         self.subCorpusType = id  # We create an index which will contain all the sub corpuses.
-        self.subCorpusList = get_master_document_sub_corpus_list(self.envId, self.authorization)
-        self.bucketList = get_master_bucket_list(self.envId, self.authorization)
         self.modificationDate = modificationDate
+        self.context = context
+        # Built when first used, since most requests on a corpus don't need them
+        self._subCorpusList = None
+        self._bucketList = None
+
+    @property
+    def subCorpusList(self):
+        if self._subCorpusList is None:
+            self._subCorpusList = get_master_document_sub_corpus_list(self.envId, self.authorization, self.context)
+        return self._subCorpusList
+
+    @property
+    def bucketList(self):
+        if self._bucketList is None:
+            self._bucketList = get_master_bucket_list(self.envId, self.authorization, self.context)
+        return self._bucketList
 
     def add_language(self, language: str):
         """
@@ -229,6 +252,46 @@ class DocumentCorpus:
 
         return id
 
+    def add_text_documents(self, documents) -> List:
+        """
+        Adds many text documents with bulk requests, each routed to the index of its language.
+        Unlike add_text_document, ids are not checked beforehand: the bulk create operations detect the conflicts.
+        A failing document doesn't stop the others from being added.
+
+        :param documents:   Iterable of {"text", "title", "language", "id" (optional, generated), "source" (optional)}
+        :return:    [(documentId, exception)] in the order of documents. exception is None if the document was added,
+                    else the exception add_text_document would have raised (DocumentAlreadyExistsException,
+                    CorpusDoesntContainLanguageException).
+        """
+        self.authorization.can_add_document_to_corpus(self.id)
+
+        results = []
+        documentsPerType = {}
+        seenIds = set()
+        for document in documents:
+            documentId = document.get("id") or gen_uuid()
+            language = document.get("language")
+            result = [documentId, None]
+            results.append(result)
+            if language not in self.languages:
+                result[1] = CorpusDoesntContainLanguageException(str(language))
+            elif documentId in seenIds:
+                result[1] = DocumentAlreadyExistsException("Document id: {0} appears twice".format(documentId))
+            else:
+                seenIds.add(documentId)
+                textDocument = dict(text=document.get("text", ""), title=document.get("title", ""),
+                                    language=language, source=document.get("source", ""))
+                documentsPerType.setdefault(language_doc_type(language), []).append((documentId, textDocument, result))
+
+        for docType, typeDocuments in documentsPerType.items():
+            failed = self.dd.add_documents(((documentId, textDocument) for documentId, textDocument, result
+                                            in typeDocuments), docType)
+            failedPerId = dict(failed)
+            for documentId, textDocument, result in typeDocuments:
+                result[1] = failedPerId.get(documentId)
+
+        return [tuple(result) for result in results]
+
     def mapDocumentHit(self, hit: Hit):
         document = {"id": hit.meta.id}
         self.addPropertyIfExists(document, hit, 'title')
@@ -238,23 +301,29 @@ class DocumentCorpus:
         return document
 
     def get_documents_count(self):
-        indices_per_doc_type = self.dd.get_indices_per_doc_type()
+        indices = list(self.dd.get_indices_per_doc_type().values())
+        if not indices:
+            return 0
         es = get_es_conn()
-        total_document_count = 0
-        for _, index in indices_per_doc_type.items():
-            index_count = es.count(index)
-            total_document_count = total_document_count + index_count["count"]
-        return total_document_count
+        return es.count(index=",".join(indices))["count"]
 
     def get_text_document(self, documentId):
-        rawDoc = self.dd.small_search(docTypes=self.languages_doc_types(), filterTerms={"_id": documentId}, useScan=False)
-        if not rawDoc:
+        document = self.get_text_documents_by_ids([documentId])[0]
+        if not document:
             raise DocumentNotFoundException(documentId)
 
-        document = self.mapDocument(rawDoc[0])
-
         return document
 
+    def get_text_documents_by_ids(self, documentIds: List[str]) -> List:
+        """
+        Returns many documents of the corpus by id, whatever their language, in one request.
+
+        :param documentIds:
+        :return:    For each id, in the same order, the document (see get_text_document) or None if not found
+        """
+        rawDocs = self.dd.get_documents_of_types(documentIds, self.languages_doc_types())
+        return [self.mapDocument(rawDoc) if rawDoc else None for rawDoc in rawDocs]
+
     def languages_doc_types(self):
         return [language_doc_type(language) for language in self.languages]
 
@@ -263,13 +332,28 @@ class DocumentCorpus:
 
     def get_text_documents(self, fromIndex: int, size: int, sortBy: str = None, sortOrder: str = None,
                            filterTitle: str = None, filterSource: str = None, filterJoin: str = None):
+        documents, nextCursor = self.get_text_documents_page(fromIndex, size, sortBy, sortOrder, filterTitle,
+                                                             filterSource, filterJoin)
+        return documents
+
+    def get_text_documents_page(self, fromIndex: int, size: int, sortBy: str = None, sortOrder: str = None,
+                                filterTitle: str = None, filterSource: str = None, filterJoin: str = None,
+                                cursor: str = None):
+        """
+        Returns a page of the documents of the corpus (without their text).
+
+        :param fromIndex:   Zero based index of the first document. Ignored if there is a cursor.
+        :param cursor:      nextCursor of the previous page, requested with the same sort and filters.
+            Raises InvalidCursorException if it is not a valid cursor.
+        :return:            documents, nextCursor (None if there is no next page)
+        """
         es = get_es_conn()
         search = Search(using=es, index=self.languages_indices())
-        search = search[fromIndex:fromIndex + size]
         search = search.source(["title", "language", "source"])
 
         if sortBy:
             search = search.sort(make_sort_field(sortBy, sortOrder))
+        search = paginate_search(search, fromIndex, size, cursor)
 
         filters = []
         add_filter(filters, "title", filterTitle)
@@ -278,11 +362,11 @@ class DocumentCorpus:
             es_filters = make_es_filters(filters, filterJoin)
             search = search.filter(es_filters)
 
-        search.execute()
+        response = search.execute()
 
-        documents = [self.mapDocumentHit(hit) for hit in search]
+        documents = [self.mapDocumentHit(hit) for hit in response]
 
-        return documents
+        return documents, get_next_cursor(response.hits, size)
 
     def get_document_ids(self) -> List[str]:
         """
@@ -380,12 +464,12 @@ class DocumentCorpus:
                 They are grouped the following way { docType : [id1,idn], docType2 ...}
 
         :param subCorpus:      Sub corpus to which to add documents
-        :return:
+        :return:    [(id, exception)] for documents which were not added (ex: DocumentAlreadyExistsException)
         """
 
         self.authorization.can_read_document_from_corpus(self.id)
-        subCorpus.add_documents_ref(docIdsByType)
         # TODO validate
+        return subCorpus.add_documents_ref(docIdsByType)
 
     # Buckets
 
@@ -405,6 +489,21 @@ class DocumentCorpus:
         """
         return self.bucketList.get_all_buckets_for_corpus(self.id)
 
+    def build_structure(self) -> CorpusStructure:
+        """
+        Reads the languages, buckets and bucket schemas of the corpus. Needs a few requests per bucket,
+        use DocumentCorpusList.get_corpus_structure to get the cached structure instead.
+
+        :return:    CorpusStructure
+        """
+        schemasPerBucket = self.bucketList.get_corpus_json_schemas(self.id)
+        buckets = []
+        for bucket in self.get_buckets():
+            schemas = sorted(schemasPerBucket.get(bucket.id, []), key=lambda schema: schema["schemaType"])
+            buckets.append({"id": bucket.id, "name": bucket.name, "schemas": schemas})
+        buckets.sort(key=lambda bucket: bucket["id"])
+        return CorpusStructure(self.id, list(self.languages), buckets)
+
     def get_bucket(self, bucketId: str) -> Bucket:
         """
         Returns a bucket of a given ID. If not found will throw an exception.
@@ -437,25 +536,26 @@ class DocumentCorpusList:
 
         masterList = get_master_document_directory_list(envId, authorization)
         corpusList = masterList.create_document_directory(sett['MASTER_DOCUMENT_CORPUS_ID'])
-        time.sleep(1)
         corpusList.add_or_update_schema(CORPUS_LIST_PROPERTIES_MAPPING, "default", True)
         DocumentSubCorpusList.create(envId, sett['DOCUMENT_SUB_CORPUS'], authorization)
 
         return DocumentCorpusList(envId, sett, authorization)
 
-    def __init__(self, envId, sett, authorization: BaseAuthorization):
+    def __init__(self, envId, sett, authorization: BaseAuthorization, context: RequestContext = None):
         """
         Creates a new corpus list. A corpus list contains all corpuses for a envId.
 
         :param envId:      envId associated with this corpus.
         :param sett:        settings for the corpus.
+        :param context:     Request context memoizing the corpora, see master_factory_list
         """
         self.envId = envId
         self.classPrefix = sett['CLASS_PREFIX']
         self.masterDocumentCorpusId = sett['MASTER_DOCUMENT_CORPUS_ID']
-        self.masterList = get_master_document_directory_list(envId, authorization)
+        self.masterList = get_master_document_directory_list(envId, authorization, context)
         self.dd = self.masterList.get_directory(self.masterDocumentCorpusId)
         self.authorization = authorization
+        self.context = context
 
     def delete(self):
         """
@@ -512,11 +612,12 @@ class DocumentCorpusList:
         utcDateTime = convert_es_date_to_datetime(corpus[MODIFICATION_DATE_FIELD])
 
         self.dd.add_document(corpus, id)
+        CATALOG.put(self.envId, CORPUS, id, corpus)
 
         # creating listing for sub corpus
         dd = self.masterList.create_document_directory(id, None, False)
         # TODO create authorizations
-        docCorpus = DocumentCorpus(self.envId, dd, id, self.authorization, [], utcDateTime)
+        docCorpus = DocumentCorpus(self.envId, dd, id, self.authorization, [], utcDateTime, self.context)
         for language in languages:
             docCorpus.add_language(language)
 
@@ -546,35 +647,50 @@ class DocumentCorpusList:
         corpus[MODIFICATION_DATE_FIELD] = self.generate_modification_date()
 
         self.dd.update_document(corpus, id)
+        CATALOG.remove(self.envId, CORPUS, id)
 
         for language in languages:
             docCorpus.add_language(language)
+        invalidate_corpus_structure(self.envId, id)
 
     def generate_modification_date(self):
         return convert_datetime_to_es(datetime.utcnow())
 
     def get_corpuses_list(self):
         """
-        Lists all corpuses. This only return corpus metadata.
+        Lists all corpuses the user is allowed to get. This only return corpus metadata.
 
         :return: { data : [ {id:"id",name:NAME_FIELD,platformId:PLATFORM_ID_FIELD}]}
         """
 
-        # TODO get security to filter list
-
         res = self.dd.small_search(useScan=False)
+        readableIds = set(self.authorization.filter_readable_corpuses([doc["id"] for doc in res]))
+        res = [doc for doc in res if doc["id"] in readableIds]
+        documentCounts = self.get_documents_count_per_corpus([doc["id"] for doc in res])
         corpuses = []
         for doc in res:
             corpusInfo = doc
-
-            # getting documents is very slow. will need to be changed eventually
-            corp = self.get_corpus(doc["id"])
             del corpusInfo["type"]
-            doc[CORPUS_DOCUMENT_COUNT] = corp.get_documents_count()
+            doc[CORPUS_DOCUMENT_COUNT] = documentCounts[doc["id"]]
             corpuses.append(corpusInfo)
 
         return corpuses
 
+    def get_documents_count_per_corpus(self, corpusIds: List[str]) -> Dict[str, int]:
+        """
+        Returns the number of documents of many corpuses, computed with a single request for all corpuses.
+        Counts are cached for a few seconds (see JASS_CORPUS_COUNT_CACHE_TTL), so they may lag behind recent
+        document additions.
+
+        :param corpusIds:   Ids of the corpuses
+        :return:            {corpusId: documentCount}
+        """
+        counts = _CORPUS_COUNT_CACHE.get(self.envId)
+        if counts is None or any(corpusId not in counts for corpusId in corpusIds):
+            counts = self.masterList.get_documents_count_per_directory(corpusIds)
+            _CORPUS_COUNT_CACHE.set(self.envId, counts)
+        return {corpusId: counts[corpusId] for corpusId in corpusIds}
+
     def get_corpus(self, id: str) -> DocumentCorpus:
         """
         Gets the corpus.
@@ -584,17 +700,30 @@ class DocumentCorpusList:
         """
 
         self.authorization.can_get_document_corpus(id)
+        return memoized(self.context, ("corpus", self.envId, id), lambda: self._read_corpus(id))
 
+    def _read_corpus(self, id: str) -> DocumentCorpus:
         try:
-            corpusInfo = self.dd.get_document(id)
+            corpusInfo = CATALOG.get(self.envId, CORPUS, id, lambda: self.dd.get_document(id))
             dd = self.masterList.get_directory(id)
             languages = corpusInfo.get(LANGUAGES_FIELD)
             modificationDate = convert_es_date_to_datetime(corpusInfo.get(MODIFICATION_DATE_FIELD))
             # todo add metadata
-            return DocumentCorpus(self.envId, dd, id, self.authorization, languages, modificationDate)
+            return DocumentCorpus(self.envId, dd, id, self.authorization, languages, modificationDate, self.context)
         except DocumentNotFoundException:
             raise CorpusNotFoundException(id)
 
+    def get_corpus_structure(self, id: str) -> CorpusStructure:
+        """
+        Gets the structure (languages, buckets and their schemas) of the corpus. It is cached for the process
+        and invalidated when a bucket or schema binding of the corpus is modified.
+
+        :param id: Id of the corpus
+        :return:
+        """
+        self.authorization.can_get_document_corpus(id)
+        return get_corpus_structure(self.envId, id, lambda: self.get_corpus(id).build_structure())
+
     def delete_corpus(self, id: str):
         """
         Deletes a corpus
@@ -621,5 +750,8 @@ class DocumentCorpusList:
                 pass
 
         # deletes all indexes associated with this corpus.
+        CATALOG.remove(self.envId, CORPUS, id)
+        forget(self.context, ("corpus", self.envId, id))
         self.dd.delete_document(id)
         self.masterList.delete_document_directory(corpus.dd)
+        invalidate_corpus_structure(self.envId, id)
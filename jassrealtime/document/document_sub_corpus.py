@@ -1,8 +1,8 @@
 import logging
 import uuid
-from io import StringIO
 
 from ..core.master_factory_list import get_master_document_directory_list, get_master_document_corpus_list
+from ..core.request_context import RequestContext
 
 from ..core.document_directory import *
 
@@ -50,22 +50,22 @@ class DocumentSubCorpusList():
 
         masterList = get_master_document_directory_list(envId, authorization)
         subCorpusList = masterList.create_document_directory(sett['MASTER_DOCUMENT_SUB_CORPUS_ID'])
-        time.sleep(1)
         subCorpusList.add_or_update_schema(SUB_CORPUS_LIST_PROPERTIES_MAPPING, "default")
 
         return DocumentSubCorpusList(envId, sett, authorization)
 
-    def __init__(self, envId, sett, authorization: BaseAuthorization):
+    def __init__(self, envId, sett, authorization: BaseAuthorization, context: RequestContext = None):
         """
         Creates a new corpus list. A corpus list contains all corpuses for a envId.
 
         :param envId:      envId associated with this corpus.
         :param sett:        settings for the corpus.
+        :param context:     Request context, see master_factory_list
         """
         self.envId = envId
         self.classPrefix = sett['CLASS_PREFIX']
         self.masterDocumentSubCorpusId = sett['MASTER_DOCUMENT_SUB_CORPUS_ID']
-        self.masterList = get_master_document_directory_list(envId, authorization)
+        self.masterList = get_master_document_directory_list(envId, authorization, context)
         self.dd = self.masterList.get_directory(self.masterDocumentSubCorpusId)
         self.authorization = authorization
 
@@ -225,7 +225,7 @@ class DocumentSubCorpus():
         self.authorization.can_add_document_id_to_sub_corpus(self.corpusId, self.id)
         self.dd.add_document(jsonDocument={"type": docType}, id=id)
 
-    def add_documents_ref(self, docIdsByType: List):
+    def add_documents_ref(self, docIdsByType: dict) -> List:
         """
         Adds a documents reference to sub corpus. Should only be done by document corpus class.
         Note this class does not validate the existance of documents
@@ -233,13 +233,8 @@ class DocumentSubCorpus():
         :param docIdsByType: Dictionnary containing doc references.
                 They are grouped the following way { docType : [id1,idn], docType2 ...}
 
-        :return:
+        :return: [(id, exception)] for references which were not added (ex: DocumentAlreadyExistsException)
         """
-        self.authorization.can_add_document_id_to_sub_corpus(self.id)
-        buf = StringIO()
-        for docType in docIdsByType:
-            for id in docIdsByType[docType]:
-                # createLine={ "create": { "_index": self., "_type": "{1}", "_id": "{2}" }}
-                # buf.write()
-                # TODO: Terrible inefficient piece of code. Will change later
-                self.dd.add_document(jsonDocument={"type": docType}, id=id)
+        self.authorization.can_add_document_id_to_sub_corpus(self.corpusId, self.id)
+        docRefs = ((id, {"type": docType}) for docType in docIdsByType for id in docIdsByType[docType])
+        return self.dd.add_documents(docRefs)
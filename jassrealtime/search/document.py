@@ -9,9 +9,11 @@ from elasticsearch_dsl.response import Hit
 from jassrealtime.document.document_corpus import make_sort_field, make_es_filters
 from ..document.interval import Interval
 from ..core.master_factory_list import get_master_bucket_list
+from ..core.request_context import RequestContext
 from ..security.base_authorization import BaseAuthorization
 from typing import List
-from ..core.esutils import get_multi_indexes_small_search_query, get_es_conn
+from ..core.esutils import get_multi_indexes_small_search_query, get_es_conn, paginate_search, get_next_cursor, \
+    execute_with_count
 from elasticsearch import helpers
 from .utils import add_offset_to_query, replaceFieldNames, deleteField
 from ..core.settings_utils import get_scan_scroll_duration, get_nb_documents_per_scan_scroll
@@ -31,7 +33,7 @@ def map_search_hit(hit: Hit):
 class DocumentSearch:
     def search_annotations_for_one_type(self, bucketId: str, schemaType: str, fromIndex: int, size: int,
                                         sortBy: str = None, sortOrder: str = None, filters: str = None,
-                                        filterJoin: str = None):
+                                        filterJoin: str = None, cursor: str = None, approximateCount: bool = False):
         """
         Search annotation of corpus for one schemaType of one bucket.
         This endpoint exists to facilitate getting a list of documents of a corpus from the metadata document annotation.
@@ -44,21 +46,23 @@ class DocumentSearch:
         :param sortOrder:
         :param filters:
         :param filterJoin:
-        :return:
+        :param cursor: nextCursor of the previous page, requested with the same sort and filters
+        :param approximateCount: If true, the annotations are not all counted: the count is a lower bound (see
+            execute_with_count and is_approximate_count_exact)
+        :return: count, annotations, nextCursor (None if there is no next page)
         """
 
         # Inspired from DocumentCorpus.get_text_documents
         es = get_es_conn()
 
         # Main divergence: indices of one bucket & schema
-        bucketList = get_master_bucket_list(self.envId, self.authorization)
+        bucketList = get_master_bucket_list(self.envId, self.authorization, self.context)
         bucket = bucketList.get_bucket(self.corpusId, bucketId)
         indices = bucket.dd.get_indices(docTypes=[schemaType])
         if not indices:
-            return 0, []
+            return 0, [], None
 
         search = Search(using=es, index=indices)
-        search = search[fromIndex:fromIndex + size]
 
         # Sort by score if no sort field specified
         if sortBy:
@@ -67,6 +71,7 @@ class DocumentSearch:
             actualSort = "_score"
 
         search = search.sort(actualSort)
+        search = paginate_search(search, fromIndex, size, cursor)
 
         if filters:
             es_filters = make_es_filters(filters, filterJoin)
@@ -75,11 +80,10 @@ class DocumentSearch:
             # Scoring is important for sorting searches with analyzers like Ngram, EdgeNgram, etc.
             search = search.query(es_filters)
 
-        count = search.count()
-
-        annotations = [map_search_hit(hit) for hit in search]
+        response, count = execute_with_count(search, None if cursor else fromIndex, approximateCount)
+        annotations = [map_search_hit(hit) for hit in response]
 
-        return count, annotations
+        return count, annotations, get_next_cursor(response.hits, size)
 
     def count_annotations_for_types(self, bucketId: str, schemaTypes: List[str]):
         """
@@ -94,7 +98,7 @@ class DocumentSearch:
 
         es = get_es_conn()
 
-        bucket_list = get_master_bucket_list(self.envId, self.authorization)
+        bucket_list = get_master_bucket_list(self.envId, self.authorization, self.context)
         bucket = bucket_list.get_bucket(self.corpusId, bucketId)
 
         counts = {}
@@ -115,7 +119,7 @@ class DocumentSearch:
 
         es = get_es_conn()
 
-        bucketList = get_master_bucket_list(self.envId, self.authorization)
+        bucketList = get_master_bucket_list(self.envId, self.authorization, self.context)
         bucket = bucketList.get_bucket(self.corpusId, bucketId)
 
         # Erase actual indices
@@ -144,7 +148,7 @@ class DocumentSearch:
         if offsets:
             raise NotImplementedError()
         else:
-            bucketList = get_master_bucket_list(self.envId, self.authorization)
+            bucketList = get_master_bucket_list(self.envId, self.authorization, self.context)
             bucket = bucketList.get_bucket(self.corpusId, bucketId)
             annotations = bucket.dd.small_search(docTypes=[schemaType], filterTerms=self.make_document_filter_terms())
             if annotations:
@@ -168,7 +172,7 @@ class DocumentSearch:
 
         res = {self.corpusId: {}}
 
-        bucketList = get_master_bucket_list(self.envId, self.authorization)
+        bucketList = get_master_bucket_list(self.envId, self.authorization, self.context)
         allBuckets = bucketList.get_all_buckets_for_corpus(self.corpusId)
         buckets = []
 
@@ -239,15 +243,18 @@ class DocumentSearch:
         else:
             return {}
 
-    def __init__(self, envId: str, authorization: BaseAuthorization, documentIds: List[str], corpusId: str):
+    def __init__(self, envId: str, authorization: BaseAuthorization, documentIds: List[str], corpusId: str,
+                 context: RequestContext = None):
         """
 
         :param envId:
         :param authorization:
         :param documentIds:
         :param corpusId:
+        :param context:     Request context, see master_factory_list
         """
         self.envId = envId
         self.authorization = authorization
         self.documentIds = documentIds
         self.corpusId = corpusId
+        self.context = context
@@ -2,13 +2,20 @@ from elasticsearch_dsl import Search, Q, A
 from elasticsearch_dsl.response import Hit
 
 from jassrealtime.core.document_directory import DocumentNotFoundException
-from jassrealtime.search.document import map_search_hit
 from .DocumentsBy import DocumentsBy
 from ...search.multicorpus.multi_corpus import MultiCorpus
-from ...core.esutils import get_es_conn
+from ...core.esutils import get_es_conn, mget_from_indices, encode_cursor, decode_cursor, \
+    InvalidCursorException
+from ...core.request_context import RequestContext
 from ...security.base_authorization import BaseAuthorization
 
 
+# Maximum number of documents per composite aggregation request when skipping the documents before 'from'
+COMPOSITE_SKIP_SIZE = 1000
+# Below this number of documents, the cardinality count is exact (40000 is the maximum elastic search accepts)
+CARDINALITY_PRECISION_THRESHOLD = 40000
+
+
 def schema_types_of(queries: list) -> set:
     return {query["schema_type"] for query in queries}
 
@@ -26,14 +33,23 @@ def to_match_query(query: dict) -> tuple:
 
 
 class DocumentsByAnnotation(DocumentsBy):
-    def __init__(self, env_id: str, authorization: BaseAuthorization):
+    def __init__(self, env_id: str, authorization: BaseAuthorization, context: RequestContext = None):
         self.env_id = env_id
         self.authorization = authorization
-        self.multi_corpus = MultiCorpus(env_id, authorization)
+        self.multi_corpus = MultiCorpus(env_id, authorization, context)
 
-    def documents_by_annotation(self, grouped_targets: dict, queries: list, from_index: int, size: int) -> tuple:
+    def documents_by_annotation(self, grouped_targets: dict, queries: list, from_index: int, size: int,
+                                cursor: str = None) -> tuple:
         """
-        Paginated documents found by annotation.
+        Paginated documents found by annotation, ordered by document id.
+
+        The annotations are grouped by document with a composite aggregation, which pages through all the documents
+        without loading them in memory. Deep pages requested with 'from' need to page through all the documents
+        before them, so a cursor should be used to iterate over all the results.
+
+        :param from_index:  ZERO based index, ignored with a cursor
+        :param cursor:      next_cursor of the previous page, requested with the same targets and queries
+        :return:            count, documents, next_cursor (None if there is no next page)
         """
 
         # Get a set of all schema types
@@ -47,47 +63,81 @@ class DocumentsByAnnotation(DocumentsBy):
         match_queries = [to_match_query(query) for query in queries]
         grouped_queries = self.group_queries_by_operator(match_queries)
 
-        # Actual annotation search
+        # Actual annotation search, only the aggregations are needed
         es = get_es_conn()
         search = Search(using=es, index=indices_argument)
-        search = search.source(["_documentID"])
+        search = search[0:0]
 
         search.query = Q('bool',
                          must=grouped_queries["must"],
                          must_not=grouped_queries["must_not"],
                          should=grouped_queries["should"])
 
-        # Note: using aggregation means we could lose some hits
-        # "when there are lots of unique terms, Elasticsearch only returns the top terms"
-        # https://www.elastic.co/guide/en/elasticsearch/reference/6.1/search-aggregations-bucket-terms-aggregation.html#CO105-2
+        if cursor:
+            after_document_id = self.decode_document_cursor(cursor)
+        else:
+            after_document_id = self.skip_documents(search, from_index)
 
-        aggregate_by_document_id = A('terms', field='_documentID')
-        search.aggs.bucket('doc_ids', aggregate_by_document_id)
+        search.aggs.metric('doc_count', 'cardinality', field='_documentID',
+                           precision_threshold=CARDINALITY_PRECISION_THRESHOLD)
+        search.aggs.bucket('doc_ids', self.documents_aggregation(size, after_document_id))
         response = search.execute()
-        aggregation = response.aggregations['doc_ids']
-        count = len(aggregation.buckets)  # we want the count before slicing
-
-        # Note: Elasticsearch DSL slicing API does not work with aggregations, so we slice on aggregation results
-        buckets = aggregation.buckets[from_index:from_index+size]
+        count = response.aggregations['doc_count'].value
+        buckets = response.aggregations['doc_ids'].buckets
 
         # Get document information from document id
         # (Document id uniqueness is guaranteed by the aggregation.)
-        document_ids = [bucket['key'] for bucket in buckets]
+        document_ids = [bucket.key.document_id for bucket in buckets]
         documents = self.documents_by_ids(grouped_targets, document_ids)
 
         documents_with_score = self.join_documents_with_score(buckets, documents)
 
-        return count, documents_with_score
+        next_cursor = encode_cursor([document_ids[-1]]) if len(buckets) == size else None
+        return count, documents_with_score, next_cursor
+
+    @staticmethod
+    def documents_aggregation(size: int, after_document_id: str = None) -> A:
+        """
+        Composite aggregation of the annotations by document id, for one page of documents.
+        """
+        after = {} if after_document_id is None else {'after': {'document_id': after_document_id}}
+        return A('composite', sources=[{'document_id': {'terms': {'field': '_documentID'}}}], size=size, **after)
+
+    def skip_documents(self, search: Search, from_index: int) -> str:
+        """
+        Pages through the first from_index documents found by the search.
+
+        :return:    Id of the last skipped document, None if there is none
+        """
+        after_document_id = None
+        while from_index > 0:
+            page_size = min(from_index, COMPOSITE_SKIP_SIZE)
+            skip_search = search._clone()
+            skip_search.aggs.bucket('doc_ids', self.documents_aggregation(page_size, after_document_id))
+            buckets = skip_search.execute().aggregations['doc_ids'].buckets
+            if not buckets:
+                break
+            # The response has no after_key before elastic search 6.3, so the last key is used.
+            after_document_id = buckets[-1].key.document_id
+            from_index -= len(buckets)
+            if len(buckets) < page_size:
+                break
+        return after_document_id
+
+    @staticmethod
+    def decode_document_cursor(cursor: str) -> str:
+        values = decode_cursor(cursor)
+        if len(values) != 1 or not isinstance(values[0], str):
+            raise InvalidCursorException("Invalid cursor: '{0}'".format(cursor))
+        return values[0]
 
     @staticmethod
     def join_documents_with_score(buckets, documents):
         """
-        Join documents with score while retaining scoring order.
+        Join documents with score while retaining the order of the buckets.
 
         We will use the number of matching annotations per document as a naive score.
 
-        The buckets are naturally ordered by descending number of annotations.
-
         :param buckets:
         :param documents:
         :return:
@@ -95,11 +145,11 @@ class DocumentsByAnnotation(DocumentsBy):
         document_map = {document['id']: document for document in documents}
         documents_with_score = []
         for bucket in buckets:
-            document_id = bucket['key']
+            document_id = bucket.key.document_id
             document = document_map.get(document_id, None)
             if document is None:
                 raise DocumentNotFoundException(document_id)
-            score = bucket['doc_count']
+            score = bucket.doc_count
             document['score'] = score
             documents_with_score.append(document)
         return documents_with_score
@@ -120,14 +170,21 @@ class DocumentsByAnnotation(DocumentsBy):
         return result
 
     def documents_by_ids(self, grouped_targets, document_ids):
-        indices = self.target_text_document_indices(grouped_targets)
-        indices_argument = ','.join(indices)
-
-        es = get_es_conn()
-        search = Search(using=es, index=indices_argument)
-        search = search.source(["title", "language", "source"])
-        search.query = Q({"terms": {"_id": document_ids}})
-
-        documents = [map_search_hit(hit) for hit in search.scan()]
+        """
+        Gets the documents of the targeted corpora, in a single mget request.
+        """
+        index_types = []
+        for corpus_id in grouped_targets.keys():
+            corpus = self.multi_corpus.corpus_from_id(corpus_id)
+            index_types.extend((index, doc_type) for doc_type, index in corpus.dd.get_indices_per_doc_type().items())
+
+        hits = mget_from_indices(document_ids, index_types, ["title", "language", "source"]) if index_types else []
+
+        documents = []
+        for hit in hits:
+            if hit:
+                document = hit.get("_source", {})
+                document["id"] = hit["_id"]
+                documents.append(document)
 
         return documents
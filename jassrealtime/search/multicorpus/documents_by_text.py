@@ -4,7 +4,8 @@ from jassrealtime.core.settings_utils import get_language_manager
 from .DocumentsBy import DocumentsBy
 from ...core.language_manager import LanguageManager
 from ...search.multicorpus.multi_corpus import MultiCorpus
-from ...core.esutils import get_es_conn
+from ...core.esutils import get_es_conn, execute_with_count
+from ...core.request_context import RequestContext
 from ...security.base_authorization import BaseAuthorization
 
 
@@ -18,14 +19,19 @@ def to_match_query(language_manager: LanguageManager, query: dict) -> tuple:
 
 
 class DocumentsByText(DocumentsBy):
-    def __init__(self, env_id: str, authorization: BaseAuthorization):
+    def __init__(self, env_id: str, authorization: BaseAuthorization, context: RequestContext = None):
         self.env_id = env_id
         self.authorization = authorization
-        self.multi_corpus = MultiCorpus(env_id, authorization)
+        self.multi_corpus = MultiCorpus(env_id, authorization, context)
 
-    def documents_by_text(self, grouped_targets: dict, queries: list, from_index: int, size: int) -> tuple:
+    def documents_by_text(self, grouped_targets: dict, queries: list, from_index: int, size: int,
+                          approximate_count: bool = False) -> tuple:
         """
         Paginated documents found by text.
+
+        :param approximate_count: If true, the documents are not all counted: the count is a lower bound (see
+            execute_with_count and is_approximate_count_exact)
+        :return: count, documents
         """
         # For pagination/score sorting to work, we need to query all the different corpus indices in the same
         # Elasticsearch query.
@@ -49,7 +55,7 @@ class DocumentsByText(DocumentsBy):
                          should=grouped_queries["should"])
 
         search = search[from_index:from_index + size]
-        count = search.count()
-        documents = [self.map_hit_with_score(hit) for hit in search]
+        response, count = execute_with_count(search, from_index, approximate_count)
+        documents = [self.map_hit_with_score(hit) for hit in response]
 
         return count, documents
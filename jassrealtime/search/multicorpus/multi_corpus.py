@@ -1,12 +1,15 @@
+import hashlib
 import json
 
 from elasticsearch_dsl import Search, Q
 from typing import List
 
-from ...core.esutils import get_es_conn
+from ...core.esutils import get_es_conn, paginate_search, get_next_cursor, execute_with_count
+from ...core.request_context import RequestContext
 from ...core.schema_list import JSON_SCHEMA_PRIMITIVE_TYPES
 from ...core.settings_utils import get_settings
-from ...document.bucket import Bucket
+from ...document.bucket import BucketNotFoundException
+from ...document.corpus_structure import CorpusStructure
 from ...document.document_corpus import make_sort_field, make_es_filters, get_master_document_corpus_list, \
     DocumentCorpus
 from ...search.document import map_search_hit
@@ -15,17 +18,19 @@ from ...security.security_selector import get_autorisation
 
 
 class MultiCorpus:
-    def __init__(self, env_id: str, authorization: BaseAuthorization):
+    def __init__(self, env_id: str, authorization: BaseAuthorization, context: RequestContext = None):
+        """
+        :param context: Request context, in which the corpora are memoized. See master_factory_list.
+        """
         self.env_id = env_id
         self.authorization = authorization
+        self.context = context
 
-    @staticmethod
     def get_annotations_of_type(self, corpus_ids, schema_type, from_index, size, sort_by, sort_order, filters,
-                                filter_join):
+                                filter_join, cursor=None, approximate_count=False):
         """
         Paginated annotations of the specified type.
 
-        :param self:
         :param corpus_ids:
         :param schema_type:
         :param from_index:
@@ -34,15 +39,16 @@ class MultiCorpus:
         :param sort_order:
         :param filters:
         :param filter_join:
-        :return:
+        :param cursor: next_cursor of the previous page, requested with the same sort and filters
+        :param approximate_count: If true, the annotations are not all counted: the count is a lower bound (see
+            execute_with_count and is_approximate_count_exact)
+        :return: count, annotations, next_cursor (None if there is no next page)
         """
         # Specify all annotations indices for specified corpora
         indices = self.partial_corpora_indices(corpus_ids)
 
         es = get_es_conn()
         search = Search(using=es, index=indices)
-        search = search[
-                 from_index:from_index + size]  # We are forced to use the scrolling API to sort (scan won't work)
 
         # Sort by score if no sort field specified
         if sort_by:
@@ -51,6 +57,7 @@ class MultiCorpus:
             actual_sort = "_score"
 
         search = search.sort(actual_sort)
+        search = paginate_search(search, from_index, size, cursor)
 
         # Need to restrict the search annotations to the given schema type.
         # The alternative is doing a first search to retrieve only the indices of the given schema type.
@@ -67,11 +74,10 @@ class MultiCorpus:
             # Here, we use filter because it's faster and scoring is not relevant
             search = search.filter(schema_type_query)
 
-        count = search.count()
-
-        annotations = [map_search_hit(hit) for hit in search]
+        response, count = execute_with_count(search, None if cursor else from_index, approximate_count)
+        annotations = [map_search_hit(hit) for hit in response]
 
-        return count, annotations
+        return count, annotations, get_next_cursor(response.hits, size)
 
     def partial_corpora_indices(self, corpus_ids: List[str]) -> str:
         """
@@ -98,25 +104,41 @@ class MultiCorpus:
         structure = []
 
         for corpusId, buckets in grouped_targets.items():
-            corpus = self.corpus_from_id(corpusId)
+            corpus_structure = self.corpus_structure_from_id(corpusId)
             group_structure = {"corpusId": corpusId,
-                               "languages": corpus.languages,
-                               "groups": self.buckets_types(corpus, buckets)}
+                               "languages": corpus_structure.languages,
+                               "groups": self.buckets_types(corpus_structure, buckets)}
             structure.append(group_structure)
 
         return structure
 
+    def query_structure_version(self, grouped_targets: dict) -> str:
+        """
+        Version of the query structure of the targets, which changes whenever the query structure changes.
+        Computed from the cached corpus structures, without building the query structure.
+        """
+        versions = [[corpus_id, buckets, self.corpus_structure_from_id(corpus_id).version]
+                    for corpus_id, buckets in grouped_targets.items()]
+        return hashlib.sha1(json.dumps(versions).encode("utf-8")).hexdigest()
+
+    def corpus_structure_from_id(self, corpus_id: str) -> CorpusStructure:
+        authorization = get_autorisation(self.env_id, None, None)
+        corpora = get_master_document_corpus_list(self.env_id, authorization, self.context)
+        return corpora.get_corpus_structure(corpus_id)
+
     def corpus_from_id(self, corpus_id: str) -> DocumentCorpus:
         authorization = get_autorisation(self.env_id, None, None)
-        corpora = get_master_document_corpus_list(self.env_id, authorization)
+        corpora = get_master_document_corpus_list(self.env_id, authorization, self.context)
         return corpora.get_corpus(corpus_id)
 
-    def buckets_types(self, corpus: DocumentCorpus, bucket_ids: list) -> list:
+    def buckets_types(self, corpus_structure: CorpusStructure, bucket_ids: list) -> list:
         buckets = []
         for bucket_id in bucket_ids:
-            bucket = corpus.get_bucket(bucket_id)
+            bucket = corpus_structure.get_bucket(bucket_id)
+            if bucket is None:
+                raise BucketNotFoundException(bucket_id)
             buckets.append({"bucketId": bucket_id,
-                            "name": bucket.name,
+                            "name": bucket["name"],
                             "types": self.bucket_types(bucket)})
         return buckets
 
@@ -148,12 +170,13 @@ class MultiCorpus:
 
         return searchable_properties
 
-    def bucket_types(self, bucket: Bucket) -> list:
-        schemas_info = bucket.get_schemas_info(includeJson=True)["data"]
+    def bucket_types(self, bucket: dict) -> list:
+        """
+        :param bucket:  Bucket of a CorpusStructure
+        """
         properties_by_schema = []
-        for schema_info in schemas_info:
-            schema = json.loads(schema_info["jsonSchema"])
+        for schema_info in bucket["schemas"]:
             properties_by_schema.append(
-                {"schemaType": schema_info["schemaType"], "properties": self.properties(schema)})
+                {"schemaType": schema_info["schemaType"], "properties": self.properties(schema_info["jsonSchema"])})
 
         return properties_by_schema
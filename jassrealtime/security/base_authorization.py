@@ -1,5 +1,6 @@
 # coding: utf-8
 from builtins import staticmethod
+from typing import List
 
 
 class SecurityToken:
@@ -91,6 +92,47 @@ class BaseAuthorization:
         self.tokenType = tokenType
         self.tokenType = securityToken
         self.envId = envId
+        # (check name, args) -> bool. Lives as long as this object, see security_selector.get_autorisation
+        self._decisions = {}
+
+    def get_expiration_time(self):
+        """
+        :return:    Epoch time, in seconds, at which the token of this authorization expires. None if it doesn't.
+        """
+        return None
+
+    def is_allowed(self, check, *args) -> bool:
+        """
+        Runs a permission check (ex: self.can_read_bucket) once, and remembers its decision.
+
+        :param check:   One of the can_* methods of this object
+        :param args:    Arguments of check
+        :return:        False if check raises PermissionDenied
+        """
+        key = (check.__name__,) + args
+        decision = self._decisions.get(key)
+        if decision is None:
+            try:
+                check(*args)
+                decision = True
+            except PermissionDenied:
+                decision = False
+            self._decisions[key] = decision
+        return decision
+
+    def filter_readable_corpuses(self, corpusIds: List[str]) -> List[str]:
+        """
+        Returns the corpuses the user is allowed to get, in the order of corpusIds.
+        Subclasses checking permissions remotely should override it to decide for all corpuses at once.
+        """
+        return [corpusId for corpusId in corpusIds if self.is_allowed(self.can_get_document_corpus, corpusId)]
+
+    def filter_readable_buckets(self, corpusId: str, bucketIds: List[str]) -> List[str]:
+        """
+        Returns the buckets of the corpus the user is allowed to read, in the order of bucketIds.
+        Subclasses checking permissions remotely should override it to decide for all buckets at once.
+        """
+        return [bucketId for bucketId in bucketIds if self.is_allowed(self.can_read_bucket, corpusId, bucketId)]
 
     def can_create_env(self):
         """
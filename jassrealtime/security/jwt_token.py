@@ -1,13 +1,35 @@
+import time
 from typing import Dict
 
+from ..core.cache import TTLCache
+from ..core.settings_utils import get_authorization_cache_ttl, get_authorization_cache_size
+
+# jwtToken -> token info, so a token is verified once per JASS_AUTHORIZATION_CACHE_TTL, and never after it expires
+_TOKEN_INFO_CACHE = TTLCache(get_authorization_cache_ttl(), get_authorization_cache_size())
+
 
 def get_token_info(jwtToken) -> Dict:
     """
-    TODO: create implementation for JWT token
+    Returns the info of a verified token. Verifications are cached, see _TOKEN_INFO_CACHE.
 
     :param jwtToken: jwt token containing permissions
     :return: dictionary: {"username": ...,"env"  }. Username for whom token was issues.
         env on which to execute the action. Optional if performaing env creation/deletion.
     """
+    tokenInfo = _TOKEN_INFO_CACHE.get(jwtToken)
+    if tokenInfo is None:
+        tokenInfo = verify_token(jwtToken)
+        # exp: expiration time claim, in seconds since epoch
+        _TOKEN_INFO_CACHE.set(jwtToken, tokenInfo, tokenInfo["exp"] - time.time() if "exp" in tokenInfo else None)
+    return dict(tokenInfo)
+
+
+def verify_token(jwtToken) -> Dict:
+    """
+    TODO: create implementation for JWT token
+
+    :param jwtToken: jwt token containing permissions
+    :return: See get_token_info
+    """
 
     return {"username": "test", "env": "test"}
@@ -1,5 +1,12 @@
+import time
 from typing import Dict
 from .base_authorization import BaseAuthorization
+from ..core.cache import TTLCache
+from ..core.settings_utils import get_authorization_cache_ttl, get_authorization_cache_size
+
+# (envId, userToken, tokenType) -> authorization. Reusing the authorization of a token avoids verifying the token
+# and re-deciding its permissions on every request.
+_AUTHORIZATION_CACHE = TTLCache(get_authorization_cache_ttl(), get_authorization_cache_size())
 
 
 def get_autorisation(envId: str, userToken, tokenType) -> BaseAuthorization:
@@ -10,7 +17,15 @@ def get_autorisation(envId: str, userToken, tokenType) -> BaseAuthorization:
     :param userToken:  Object containing token data
     :param tokenType:  Describes the type of token used.
     :return:           An authorisation object. All authorisation objects subclass BaseAuthorisation.
+                       It is shared by the requests of the same token until JASS_AUTHORIZATION_CACHE_TTL expires,
+                       or the token expires.
     """
-
-    # TODO
-    return BaseAuthorization.create_authorization(envId, userToken, tokenType)
+    key = (envId, userToken, tokenType)
+    authorization = _AUTHORIZATION_CACHE.get(key)
+    if authorization is None:
+        # TODO
+        authorization = BaseAuthorization.create_authorization(envId, userToken, tokenType)
+        expirationTime = authorization.get_expiration_time()
+        _AUTHORIZATION_CACHE.set(key, authorization,
+                                 None if expirationTime is None else expirationTime - time.time())
+    return authorization
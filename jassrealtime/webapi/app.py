@@ -6,11 +6,11 @@ import logging
 from tornado.httpserver import HTTPServer
 
 from jassrealtime.core.env import EnvList, EnvNotFoundException
-from jassrealtime.core.master_factory_list import get_env_list
+from jassrealtime.core.master_factory_list import get_env_list, get_schema_list
 from jassrealtime.core.settings_utils import can_manage_env, can_rebuild_env, get_settings, \
-    get_env_id, get_log_level, get_nb_cores, get_expose_swagger
+    get_env_id, get_log_level, get_nb_cores, get_expose_swagger, get_expose_metrics
 from jassrealtime.security.security_selector import get_autorisation
-from jassrealtime.core.esutils import es_wait_ready
+from jassrealtime.core.esutils import es_wait_ready, close_es_con
 from jassrealtime.webapi.handlers.annotation_count import AnnotationCountHandler
 
 from jassrealtime.webapi.handlers.corpus import CorporaHandler
@@ -19,8 +19,10 @@ from jassrealtime.webapi.handlers.env import EnvHandler, EnvFolderHandler
 from jassrealtime.webapi.handlers.rebuildenv import RebuildEnvHandler
 from jassrealtime.webapi.handlers.bucket import BucketHandler, BucketFolderHandler
 from jassrealtime.webapi.handlers.bucket_schema import BucketSchemaHandler, BucketSchemaDeleteHandler
-from jassrealtime.webapi.handlers.annotations import AnnotationHandler, AnnotationFolderHandler
-from jassrealtime.webapi.handlers.document import DocumentHandler, DocumentFolderHandler, DocumentIdsHandler
+from jassrealtime.webapi.handlers.annotations import AnnotationHandler, AnnotationFolderHandler, \
+    AnnotationBulkHandler
+from jassrealtime.webapi.handlers.document import DocumentHandler, DocumentFolderHandler, DocumentIdsHandler, \
+    DocumentMgetHandler, DocumentBulkHandler
 from jassrealtime.webapi.handlers.search_documents_by_annotation import SearchDocumentsByAnnotationHandler
 from jassrealtime.webapi.handlers.search_documents_by_text import SearchDocumentsByTextHandler
 from jassrealtime.webapi.handlers.search_documents_query_structure import SearchDocumentQueryStructureHandler
@@ -30,6 +32,7 @@ from jassrealtime.webapi.handlers.search import DocumentSearchHandler, DocumentF
 from jassrealtime.webapi.batch_handlers.batch_annotations import BatchAnnotationsUploadHandler, \
     BatchAnnotationsDownloadHandler
 from jassrealtime.webapi.batch_handlers.batch_documents import BatchDocumentsHandler
+from jassrealtime.webapi.handlers.metrics import MetricsHandler
 
 settings = {}
 
@@ -52,12 +55,17 @@ handlers = [
     (r"/corpora", CorporaHandler),
     (r"/corpora/{0}/structure".format(idsStruct), StructureHandler),
     (r"/corpora/{0}/documentIds".format(idsStruct), DocumentIdsHandler),
+    # before documents/{id}, since _mget and _bulk are valid ids
+    (r"/corpora/{0}/documents/_mget".format(idsStruct), DocumentMgetHandler),
+    (r"/corpora/{0}/documents/_bulk".format(idsStruct), DocumentBulkHandler),
     (r"/corpora/{0}/documents/{0}".format(idsStruct), DocumentHandler),
     (r"/corpora/{0}/documents".format(idsStruct), DocumentFolderHandler),
     (r"/corpora/{0}/buckets".format(idsStruct), BucketHandler),
     (r"/corpora/{0}/buckets/{0}".format(idsStruct), BucketFolderHandler),
     (r"/corpora/{0}/buckets/{0}/schemas".format(idsStruct), BucketSchemaHandler),
     (r"/corpora/{0}/buckets/{0}/schemas/{0}".format(idsStruct), BucketSchemaDeleteHandler),
+    # before annotations/{id}, since _bulk is a valid id
+    (r"/corpora/{0}/buckets/{0}/annotations/_bulk".format(idsStruct), AnnotationBulkHandler),
     (r"/corpora/{0}/buckets/{0}/annotations/{0}".format(idsStruct), AnnotationHandler),
     (r"/corpora/{0}/buckets/{0}/annotations".format(idsStruct), AnnotationFolderHandler),
     (r"/corpora/{0}/buckets/{0}/annotationCount".format(idsStruct), AnnotationCountHandler),
@@ -79,10 +87,14 @@ def make_app():
     setup_logging()
     initialize_es()
     set_up_environment()
+    preload_schemas()
 
     if can_rebuild_env():
         handlers.append((r"/rebuildenv", RebuildEnvHandler))
 
+    if get_expose_metrics():
+        handlers.append((r"/metrics", MetricsHandler))
+
     if can_manage_env():
         handlers.append((r"/envs".format(idsStruct), EnvFolderHandler))
         handlers.append((r"/envs/{0}".format(idsStruct), EnvHandler))
@@ -134,8 +146,18 @@ def set_up_environment():
         envList.create_env(envId)
 
 
+def preload_schemas():
+    """
+    Loads the schemas of the environment in memory before the server processes are forked, so they all share them.
+    """
+    envId = get_env_id()
+    get_schema_list(envId, get_autorisation(envId, None, None)).preload_cache()
+
+
 if __name__ == "__main__":
     server = HTTPServer(make_app())
     server.bind(8888)
+    # The connection used to initialize elastic search must not be shared by the forked processes
+    close_es_con()
     server.start(get_nb_cores())
     tornado.ioloop.IOLoop.current().start()
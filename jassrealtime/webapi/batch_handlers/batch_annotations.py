@@ -24,7 +24,7 @@ class BatchAnnotationsUploadHandler(BaseHandler):
     def options(self, corpusId, bucketId):
         self.write_and_set_status(None, HTTPStatus.OK)
 
-    def post(self, corpusId, bucketId):
+    async def post(self, corpusId, bucketId):
         try:
             envId = get_env_id()
             authorization = get_autorisation(envId, None, None)
@@ -36,16 +36,22 @@ class BatchAnnotationsUploadHandler(BaseHandler):
             ext = os.path.splitext(fname)[1]
             zipName = str(uuid1) + ext
             zipPath = os.path.join(tmpUploadFolder, zipName)
-            f = open(zipPath, 'bw')
-            f.write(fileinfo['body'])
-            f.close()
+            bulkLoadMode = self.get_query_argument("bulkLoadMode", "false").lower() == "true"
 
-            # add annotations in batch
-            batchCorpus = Corpus(envId, authorization, corpusId)
-            errors = batchCorpus.add_annotations(bucketId, zipPath)
+            def add_annotations():
+                f = open(zipPath, 'bw')
+                f.write(fileinfo['body'])
+                f.close()
+
+                # add annotations in batch
+                batchCorpus = Corpus(envId, authorization, corpusId)
+                errors = batchCorpus.add_annotations(bucketId, zipPath, bulkLoadMode=bulkLoadMode)
 
-            # delete zip file
-            os.remove(zipPath)
+                # delete zip file
+                os.remove(zipPath)
+                return errors
+
+            errors = await self.run_blocking(add_annotations)
 
             if errors:
                 self.write_and_set_status(errors,
@@ -64,7 +70,7 @@ class BatchAnnotationsDownloadHandler(BaseHandler):
     def options(self, corpusId, bucketId, tmpUrlId):
         self.write_and_set_status(None, HTTPStatus.OK)
 
-    def get(self, corpusId):
+    async def get(self, corpusId):
         try:
             envId = get_env_id()
             authorization = get_autorisation(envId, None, None)
@@ -78,9 +84,9 @@ class BatchAnnotationsDownloadHandler(BaseHandler):
                 bucketIds = bucketIdsStr.split(",")
 
             batchCorpus = Corpus(envId, authorization, corpusId)
-            zipPath = batchCorpus.create_tmp_annotations_zip(bucketIds, schemaTypes)
-            self.send_zip_file_with_get(zipPath, os.path.basename(zipPath))
-            batchCorpus.clear_temporary_files()
+            await self.send_zip_stream(lambda fileStorage: batchCorpus.write_annotations_zip(fileStorage, bucketIds,
+                                                                                            schemaTypes),
+                                       str(uuid1()) + ".zip")
         except CorpusNotFoundException:
             self.write_and_set_status({MESSAGE: "Specified corpus not found"},
                                       HTTPStatus.NOT_FOUND)
@@ -89,7 +95,7 @@ class BatchAnnotationsDownloadHandler(BaseHandler):
             self.write_and_set_status({MESSAGE: "Internal server error", TRACE: trace},
                                       HTTPStatus.INTERNAL_SERVER_ERROR)
 
-    def post(self, corpusId):
+    async def post(self, corpusId):
         try:
 
             envId = get_env_id()
@@ -121,10 +127,10 @@ class BatchAnnotationsDownloadHandler(BaseHandler):
             if bucketIdsStr:
                 bucketIds = bucketIdsStr.split(",")
 
-            batchCorpus = Corpus(envId, authorization, corpusId)
+            batchCorpus = await self.run_blocking(Corpus, envId, authorization, corpusId)
 
-            batchCorpus.upload_annotations(bucketIds, schemaTypes, destUrl, zipFileName, isSendPut, isMultipart,
-                                           multipartFieldName)
+            await self.run_blocking(batchCorpus.upload_annotations, bucketIds, schemaTypes, destUrl, zipFileName,
+                                    isSendPut, isMultipart, multipartFieldName)
 
             self.write_and_set_status({}, HTTPStatus.OK)
         except CorpusNotFoundException:
@@ -1,6 +1,7 @@
-import json, os
+import json
 import traceback
 from http import HTTPStatus
+from uuid import uuid1
 
 from jassrealtime.webapi.handlers.base_handler import BaseHandler
 
@@ -17,15 +18,12 @@ class BatchDocumentsHandler(BaseHandler):
     def options(self, corpusId):
         self.write_and_set_status(None, HTTPStatus.OK)
 
-    def get(self, corpusId):
+    async def get(self, corpusId):
         try:
             envId = get_env_id()
             authorization = get_autorisation(envId, None, None)
             documentCorpus = DocumentCorpus(envId, authorization, corpusId)
-            zipPath = documentCorpus.get_documents_zip()
-            zipName = os.path.basename(zipPath)
-            self.send_zip_file_with_get(zipPath, zipName)
-            documentCorpus.clear_temporary_files()
+            await self.send_zip_stream(documentCorpus.write_documents_zip, str(uuid1()) + ".zip")
 
         except CorpusNotFoundException:
             self.write_and_set_status({MESSAGE: "Specified corpus not found"},
@@ -37,7 +35,7 @@ class BatchDocumentsHandler(BaseHandler):
             self.write_and_set_status({MESSAGE: "Internal server error", TRACE: trace},
                                       HTTPStatus.INTERNAL_SERVER_ERROR)
 
-    def post(self, corpusId):
+    async def post(self, corpusId):
         try:
 
             envId = get_env_id()
@@ -59,8 +57,9 @@ class BatchDocumentsHandler(BaseHandler):
                                           HTTPStatus.UNPROCESSABLE_ENTITY)
                 return
 
-            documentCorpus = DocumentCorpus(envId, authorization, corpusId)
-            documentCorpus.upload_documents(destUrl, zipFileName, isSendPut, isMultipart, multipartFieldName)
+            documentCorpus = await self.run_blocking(DocumentCorpus, envId, authorization, corpusId)
+            await self.run_blocking(documentCorpus.upload_documents, destUrl, zipFileName, isSendPut, isMultipart,
+                                    multipartFieldName)
 
             self.write_and_set_status({}, HTTPStatus.OK)
         except CorpusNotFoundException:
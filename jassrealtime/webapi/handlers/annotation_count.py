@@ -13,7 +13,7 @@ class AnnotationCountHandler(BaseHandler):
     def options(self, corpusId, bucketId):
         self.write_and_set_status(None, HTTPStatus.OK)
 
-    def get(self, corpusId, bucketId):
+    async def get(self, corpusId, bucketId):
         try:
             schemaTypesArgument = self.get_query_argument("schemaTypes", default=None)
             if not schemaTypesArgument:
@@ -25,9 +25,10 @@ class AnnotationCountHandler(BaseHandler):
 
             envId = get_env_id()
             authorization = get_autorisation(envId, None, None)
-            documentSearch = DocumentSearch(envId, authorization, [], corpusId)
+            context = self.get_request_context()
+            documentSearch = DocumentSearch(envId, authorization, [], corpusId, context)
 
-            counts = documentSearch.count_annotations_for_types(bucketId, schemaTypes)
+            counts = await self.run_blocking(documentSearch.count_annotations_for_types, bucketId, schemaTypes)
 
             self.write_and_set_status(counts, HTTPStatus.OK)
         except BucketNotFoundException:
@@ -1,5 +1,4 @@
 import json
-import json
 import traceback
 from http import HTTPStatus
 from json import JSONDecodeError
@@ -9,18 +8,19 @@ from jassrealtime.webapi.handlers.base_handler import BaseHandler
 
 from jassrealtime.core.master_factory_list import get_master_bucket_list
 from jassrealtime.document.bucket import DocumentAlreadyExistsException, DocumentNotFoundException, \
-    BucketNotFoundException
+    BucketNotFoundException, DocumentDoesNotRespectSchemaException, SchemaTypeNotFoundException
 from jassrealtime.security.security_selector import get_autorisation
 from jassrealtime.webapi.handlers.parameter_names import *
 from jassrealtime.core.settings_utils import get_env_id, get_settings
 
 
 class AnnotationFolderHandler(BaseHandler):
-    def post(self, corpusId, bucketId):
+    async def post(self, corpusId, bucketId):
         try:
             body = json.loads(self.request.body.decode("utf-8"))
             envId = get_env_id()
             authorization = get_autorisation(envId, None, None)
+            context = self.get_request_context()
             docType = None
             annotationId = None
 
@@ -39,9 +39,12 @@ class AnnotationFolderHandler(BaseHandler):
                     HTTPStatus.UNPROCESSABLE_ENTITY)
                 return
 
-            annotationId = get_master_bucket_list(envId, authorization) \
-                .get_bucket(corpusId, bucketId) \
-                .add_annotation(body, docType, annotationId, shouldValidate)
+            def add_annotation():
+                return get_master_bucket_list(envId, authorization, context) \
+                    .get_bucket(corpusId, bucketId) \
+                    .add_annotation(body, docType, annotationId, shouldValidate)
+
+            annotationId = await self.run_blocking(add_annotation)
 
             self.write_and_set_status({"id": annotationId},
                                       HTTPStatus.OK)
@@ -62,11 +65,12 @@ class AnnotationFolderHandler(BaseHandler):
     def options(self, corpusId, bucketId):
         self.write_and_set_status(None, HTTPStatus.OK)
 
-    def put(self, corpusId, bucketId):
+    async def put(self, corpusId, bucketId):
         try:
             body = json.loads(self.request.body.decode("utf-8"))
             envId = get_env_id()
             authorization = get_autorisation(envId, None, None)
+            context = self.get_request_context()
             docType = None
             annotationId = None
 
@@ -98,15 +102,18 @@ class AnnotationFolderHandler(BaseHandler):
                         HTTPStatus.UNPROCESSABLE_ENTITY)
                     return
 
-            bucket = get_master_bucket_list(envId, authorization).get_bucket(corpusId, bucketId)
-            storedAnnotation = bucket.get_annotation(id=annotationId, docType=docType)
+            def get_bucket_and_annotation():
+                bucket = get_master_bucket_list(envId, authorization, context).get_bucket(corpusId, bucketId)
+                return bucket, bucket.get_annotation(id=annotationId, docType=docType)
+
+            bucket, storedAnnotation = await self.run_blocking(get_bucket_and_annotation)
             if storedAnnotation["schemaType"] != docType:
                 self.write_and_set_status(
                     {MESSAGE: "You cannot change the schemaType of an annotation."},
                     HTTPStatus.UNPROCESSABLE_ENTITY)
                 return
 
-            bucket.update_annotation(body, docType, annotationId, shouldValidate)
+            await self.run_blocking(bucket.update_annotation, body, docType, annotationId, shouldValidate)
 
             self.write_and_set_status(None,
                                       HTTPStatus.NO_CONTENT)
@@ -121,7 +128,7 @@ class AnnotationFolderHandler(BaseHandler):
             self.write_and_set_status({MESSAGE: "Internal server error", TRACE: trace},
                                       HTTPStatus.INTERNAL_SERVER_ERROR)
 
-    def delete(self, corpusId, bucketId):
+    async def delete(self, corpusId, bucketId):
         try:
             schemaTypesArgument = self.get_query_argument("schemaTypes", default=None)
             if not schemaTypesArgument:
@@ -133,9 +140,10 @@ class AnnotationFolderHandler(BaseHandler):
 
             envId = get_env_id()
             authorization = get_autorisation(envId, None, None)
-            documentSearch = DocumentSearch(envId, authorization, None, corpusId)
+            context = self.get_request_context()
+            documentSearch = DocumentSearch(envId, authorization, None, corpusId, context)
 
-            documentSearch.delete_annotations_for_types(bucketId, schemaTypes)
+            await self.run_blocking(documentSearch.delete_annotations_for_types, bucketId, schemaTypes)
 
             self.write_and_set_status(None, HTTPStatus.NO_CONTENT)
         except BucketNotFoundException:
@@ -148,7 +156,7 @@ class AnnotationFolderHandler(BaseHandler):
 
 
 class AnnotationHandler(BaseHandler):
-    def get(self, corpusId, bucketId, annotationId):
+    async def get(self, corpusId, bucketId, annotationId):
         try:
             docType = self.get_argument("schemaType", None)
             if not docType:
@@ -158,9 +166,14 @@ class AnnotationHandler(BaseHandler):
 
             envId = get_env_id()
             authorization = get_autorisation(envId, None, None)
-            anno = get_master_bucket_list(envId, authorization) \
-                .get_bucket(corpusId, bucketId) \
-                .get_annotation(annotationId, docType)
+            context = self.get_request_context()
+
+            def get_annotation():
+                return get_master_bucket_list(envId, authorization, context) \
+                    .get_bucket(corpusId, bucketId) \
+                    .get_annotation(annotationId, docType)
+
+            anno = await self.run_blocking(get_annotation)
 
             annotationId = anno["id"]
             anno["annotationId"] = anno["id"]
@@ -178,10 +191,11 @@ class AnnotationHandler(BaseHandler):
             self.write_and_set_status({MESSAGE: "Internal server error", TRACE: trace},
                                       HTTPStatus.INTERNAL_SERVER_ERROR)
 
-    def delete(self, corpusId, bucketId, annotationId):
+    async def delete(self, corpusId, bucketId, annotationId):
         try:
             envId = get_env_id()
             authorization = get_autorisation(envId, None, None)
+            context = self.get_request_context()
             docType = self.get_argument("schemaType", None)
             if not docType:
                 self.write_and_set_status(
@@ -189,9 +203,12 @@ class AnnotationHandler(BaseHandler):
                     HTTPStatus.NOT_FOUND)
                 return
 
-            get_master_bucket_list(envId, authorization) \
-                .get_bucket(corpusId, bucketId) \
-                .delete_annotation(annotationId, docType)
+            def delete_annotation():
+                get_master_bucket_list(envId, authorization, context) \
+                    .get_bucket(corpusId, bucketId) \
+                    .delete_annotation(annotationId, docType)
+
+            await self.run_blocking(delete_annotation)
             self.write_and_set_status(None,
                                       HTTPStatus.NO_CONTENT)
         except BucketNotFoundException:
@@ -207,3 +224,83 @@ class AnnotationHandler(BaseHandler):
 
     def options(self, corpusId, bucketId, annotationId):
         self.write_and_set_status(None, HTTPStatus.OK)
+
+
+def parse_bulk_annotations(body: str, contentType: str) -> list:
+    """
+    Parses the body of a bulk annotation request: a json list of annotations, {"data": [annotations]} (format of
+    the batch zip files), or one annotation per line (NDJSON).
+
+    :raise JSONDecodeError: if the body is invalid
+    :raise ValueError:      if the body is valid json but doesn't contain a list of annotations
+    """
+    if contentType.startswith("application/x-ndjson"):
+        annotations = [json.loads(line) for line in body.splitlines() if line.strip()]
+    else:
+        annotations = json.loads(body)
+        if isinstance(annotations, dict):
+            annotations = annotations.get("data")
+    if not isinstance(annotations, list) or not all(isinstance(annotation, dict) for annotation in annotations):
+        raise ValueError("Expected a list of annotations")
+    return annotations
+
+
+def bulk_annotation_status(annotationId: str, error: Exception) -> dict:
+    """
+    Per annotation result of a bulk request, with the status the single annotation request would have returned.
+    """
+    if error is None:
+        return {"annotationId": annotationId, "status": HTTPStatus.CREATED.value}
+    if isinstance(error, DocumentAlreadyExistsException):
+        status = HTTPStatus.CONFLICT
+        message = "Annotation with the same id already exist"
+    elif isinstance(error, DocumentDoesNotRespectSchemaException):
+        status = HTTPStatus.UNPROCESSABLE_ENTITY
+        message = "Annotation fields dont respect schema"
+    elif isinstance(error, SchemaTypeNotFoundException):
+        status = HTTPStatus.UNPROCESSABLE_ENTITY
+        message = "Schema type not found in bucket: {0}".format(error)
+    else:
+        status = HTTPStatus.INTERNAL_SERVER_ERROR
+        message = str(error)
+    return {"annotationId": annotationId, "status": status.value, MESSAGE: message}
+
+
+class AnnotationBulkHandler(BaseHandler):
+    async def post(self, corpusId, bucketId):
+        try:
+            annotations = parse_bulk_annotations(self.request.body.decode("utf-8"),
+                                                 self.request.headers.get("Content-Type", ""))
+            envId = get_env_id()
+            authorization = get_autorisation(envId, None, None)
+            context = self.get_request_context()
+
+            if get_settings()['USE_ANNOTATION_AND_SCHEMA_VALIDATOR']:
+                self.write_and_set_status({MESSAGE: "Annotation validation is not supported by bulk creation"},
+                                          HTTPStatus.NOT_IMPLEMENTED)
+                return
+
+            def add_annotations():
+                return get_master_bucket_list(envId, authorization, context) \
+                    .get_bucket(corpusId, bucketId) \
+                    .add_annotations(annotations)
+
+            results = await self.run_blocking(add_annotations)
+
+            items = [bulk_annotation_status(annotationId, error) for annotationId, error in results]
+            self.write_and_set_status({"items": items,
+                                       "errorsCount": len([item for item in items if MESSAGE in item])},
+                                      HTTPStatus.OK)
+        except BucketNotFoundException:
+            self.write_and_set_status({MESSAGE: "Specified bucket not found"},
+                                      HTTPStatus.NOT_FOUND)
+        except (JSONDecodeError, ValueError):
+            self.write_and_set_status({MESSAGE: "Invalid JSON format for annotations"},
+                                      HTTPStatus.BAD_REQUEST)
+        except Exception:
+            trace = traceback.format_exc().splitlines()
+            self.write_and_set_status({MESSAGE: "Internal server error", TRACE: trace},
+                                      HTTPStatus.INTERNAL_SERVER_ERROR)
+
+    def options(self, corpusId, bucketId):
+        self.write_and_set_status(None, HTTPStatus.OK)
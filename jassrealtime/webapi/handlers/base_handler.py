@@ -1,11 +1,64 @@
 import json
+import logging
+import threading
+import traceback
 from codecs import BOM_UTF8
 from http import HTTPStatus
+from tornado.concurrent import Future, chain_future
+from tornado.ioloop import IOLoop
 from tornado.web import RequestHandler
 
+from jassrealtime.batch.stream_file_storage import ChunkedStream, StreamZipFileStorage
+from jassrealtime.core.executor import submit_blocking
+from jassrealtime.core.metrics import HTTP_REQUEST_SECONDS
+from jassrealtime.core.request_context import RequestContext
+from jassrealtime.core.settings_utils import is_trace_header_allowed, get_slow_request_threshold, \
+    get_trace_body_length, get_env_id
+from jassrealtime.core.tracing import RequestTrace, traced
+from jassrealtime.security.security_selector import get_autorisation
 from jassrealtime.webapi.handlers.parameter_names import MESSAGE
 from jassrealtime.webapi.handlers.utils import add_cors
 
+# Request header asking for the elastic search calls made by the request, returned in the same response header
+TRACE_HEADER = "X-Jass-Trace"
+
+
+class ResponseStream(ChunkedStream):
+    """
+    Sends the chunks written to it, from a worker thread, as the chunked body of the response of a handler.
+    Each chunk is written and flushed on the IOLoop thread; the worker waits until the chunk is sent, so a slow
+    client slows down the writer instead of filling the memory.
+    """
+
+    def __init__(self, handler: 'BaseHandler', ioLoop: IOLoop):
+        super().__init__()
+        self.handler = handler
+        self.ioLoop = ioLoop
+
+    def send_chunk(self, chunk: bytes):
+        sent = threading.Event()
+        errors = []
+
+        def on_flushed(future):
+            if future.exception():
+                errors.append(future.exception())
+            sent.set()
+
+        def write():
+            try:
+                self.handler.write(chunk)
+                self.handler.flush().add_done_callback(on_flushed)
+            except Exception as e:
+                errors.append(e)
+                sent.set()
+
+        self.ioLoop.add_callback(write)
+        while not sent.wait(1):
+            if self.handler.connectionClosed:
+                raise IOError("Connection closed by client")
+        if errors:
+            raise IOError("Failed to send response: {0}".format(errors[0]))
+
 
 class BaseHandler(RequestHandler):
     """
@@ -14,6 +67,47 @@ class BaseHandler(RequestHandler):
 
     """
 
+    connectionClosed = False
+    # Elastic search calls of the request, None if it is not traced
+    trace = None
+    isTraceReturned = False
+    # Domain objects resolved while serving the request, see get_request_context
+    requestContext = None
+
+    def prepare(self):
+        self.isTraceReturned = is_trace_header_allowed() and bool(self.request.headers.get(TRACE_HEADER))
+        if self.isTraceReturned or get_slow_request_threshold() > 0:
+            self.trace = RequestTrace(get_trace_body_length())
+
+    def on_connection_close(self):
+        self.connectionClosed = True
+
+    def finish(self, chunk=None):
+        # streamed responses already sent their headers
+        if self.isTraceReturned and not self._headers_written:
+            self.set_header(TRACE_HEADER, json.dumps(self.trace.to_dict()))
+        return super().finish(chunk)
+
+    def on_finish(self):
+        requestTime = self.request.request_time()
+        HTTP_REQUEST_SECONDS.observe(requestTime, handler=type(self).__name__,
+                                     method=self.request.method, status=self.get_status())
+        threshold = get_slow_request_threshold()
+        if self.trace is not None and 0 < threshold <= requestTime:
+            logging.getLogger(__name__).warning("Slow request {0} {1} ({2}, {3:.3f}s): {4}".format(
+                self.request.method, self.request.uri, self.get_status(), requestTime,
+                json.dumps(self.trace.to_dict())))
+
+    def get_request_context(self) -> RequestContext:
+        """
+        :return:    Context of the request, created on first use. Lists, corpora and buckets obtained through it are
+                    built once per request.
+        """
+        if self.requestContext is None:
+            envId = get_env_id()
+            self.requestContext = RequestContext(envId, get_autorisation(envId, None, None))
+        return self.requestContext
+
     def write_and_set_status(self, message: dict, status: HTTPStatus):
         """
         Writes message and set status. Adds coors headers if applies
@@ -26,6 +120,41 @@ class BaseHandler(RequestHandler):
         add_cors(self)
         self.set_status(status)
 
+    def is_not_modified(self, version: str) -> bool:
+        """
+        Sets the Etag header of the response to version. If the client already has this version (If-None-Match
+        header), the status is set to 304 and nothing should be written.
+
+        :param version: Changes whenever the content of the response changes
+        :return:        True if the response is not modified
+        """
+        self.set_header("Etag", '"{0}"'.format(version))
+        if self.check_etag_header():
+            self.write_and_set_status(None, HTTPStatus.NOT_MODIFIED)
+            return True
+        return False
+
+    def run_blocking(self, fn, *args, **kwargs) -> Future:
+        """
+        Runs a blocking function (elastic search requests, file io) in the worker thread pool, so the IOLoop
+        keeps serving other requests meanwhile. Should be awaited from an async handler method:
+
+            corpus = await self.run_blocking(corpusList.get_corpus, corpusId)
+
+        fn runs in another thread, so it must not call the handler (write, set_status ...).
+        Its elastic search calls are recorded in the trace of the request, if it is traced.
+
+        :param fn:  Blocking function to call with args and kwargs
+        :return:    tornado Future of the result of fn. Exceptions raised by fn are raised by await.
+        """
+        if self.trace is not None:
+            fn = traced(self.trace, fn)
+        future = Future()
+        ioLoop = IOLoop.current()
+        # the callback is run on the IOLoop thread once the worker thread is done
+        ioLoop.add_future(submit_blocking(fn, *args, **kwargs), lambda done: chain_future(done, future))
+        return future
+
     def strip_body_bom(self, bom=BOM_UTF8):
         body = self.request.body
         if body.startswith(bom):
@@ -33,22 +162,30 @@ class BaseHandler(RequestHandler):
 
         return json.loads(body.decode("utf-8"))
 
-    def send_zip_file_with_get(self, localFilePath: str, downloadFileName: str = 'default.zip'):
+    async def send_zip_stream(self, write_zip, downloadFileName: str = 'default.zip'):
         """
-        Sends a local zip file, via get request
-        :param localFilePath:
+        Sends a zip, via get request, while it is written, without temporary file.
+        If writing the zip fails before anything was sent, the exception is raised so an error status can be returned.
+        Afterwards, the connection is closed, so the client receives an incomplete response.
+
+        :param write_zip:   Blocking function(fileStorage: StreamZipFileStorage) writing and closing the zip.
+                                Runs in the worker thread pool.
         :param downloadFileName:
         :return:
         """
-        buf_size = 4096
+        stream = ResponseStream(self, IOLoop.current())
         self.set_header('Content-Type', 'application/zip')
         self.set_header('Content-Disposition', 'attachment; filename=' + downloadFileName)
-        with open(localFilePath, 'rb') as f:
-            while True:
-                data = f.read(buf_size)
-                if not data:
-                    break
-                self.write(data)
+        try:
+            await self.run_blocking(write_zip, StreamZipFileStorage(stream))
+        except Exception:
+            if not stream.started:
+                self.clear()
+                raise
+            logging.getLogger(__name__).error("Failed to send {0}: {1}".format(downloadFileName,
+                                                                               traceback.format_exc()))
+            self.request.connection.close()
+            return
         self.finish()
 
     def missing_required_field(self, required_field):
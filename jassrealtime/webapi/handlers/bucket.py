@@ -14,11 +14,12 @@ from jassrealtime.webapi.handlers.utils import valid_es_id
 
 
 class BucketHandler(BaseHandler):
-    def post(self, corpusId):
+    async def post(self, corpusId):
         try:
             body = json.loads(self.request.body.decode("utf-8"))
             envId = get_env_id()
             authorization = get_autorisation(envId, None, None)
+            context = self.get_request_context()
             bucketId = None
             bucketName = None
 
@@ -34,8 +35,11 @@ class BucketHandler(BaseHandler):
                                           HTTPStatus.UNPROCESSABLE_ENTITY)
                 return
 
-            bucket = get_master_document_corpus_list(envId, authorization). \
-                get_corpus(corpusId).create_bucket(bucketName, bucketId)
+            def create_bucket():
+                return get_master_document_corpus_list(envId, authorization, context). \
+                    get_corpus(corpusId).create_bucket(bucketName, bucketId)
+
+            bucket = await self.run_blocking(create_bucket)
             self.write_and_set_status({"id": bucket.id},
                                       HTTPStatus.OK)
         except BucketAlreadyExistsException:
@@ -54,12 +58,17 @@ class BucketHandler(BaseHandler):
 
 
 class BucketFolderHandler(BaseHandler):
-    def delete(self, corpusId, bucketId):
+    async def delete(self, corpusId, bucketId):
         try:
             envId = get_env_id()
             authorization = get_autorisation(envId, None, None)
-            corpus = get_master_document_corpus_list(envId, authorization).get_corpus(corpusId)
-            corpus.delete_bucket(bucketId)
+            context = self.get_request_context()
+
+            def delete_bucket():
+                corpus = get_master_document_corpus_list(envId, authorization, context).get_corpus(corpusId)
+                corpus.delete_bucket(bucketId)
+
+            await self.run_blocking(delete_bucket)
             self.write_and_set_status(None, HTTPStatus.NO_CONTENT)
         except BucketNotFoundException as err:
             self.write_and_set_status({MESSAGE: "Bucket does not exist.Extra info: '{0}'".format(err)},
@@ -5,6 +5,7 @@ from http import HTTPStatus
 from jassrealtime.webapi.handlers.base_handler import BaseHandler
 
 from jassrealtime.core.master_factory_list import get_master_document_corpus_list, get_schema_list
+from jassrealtime.core.request_context import RequestContext
 from jassrealtime.security.security_selector import get_autorisation
 from jassrealtime.webapi.handlers.parameter_names import *
 from jassrealtime.core.settings_utils import get_env_id
@@ -16,21 +17,38 @@ from jassrealtime.document.document_corpus import CorpusNotFoundException
 from jassrealtime.document.bucket import BucketNotFoundException
 
 
+def get_bucket_and_schemas(envId, authorization, corpusId: str, bucketId: str, context: RequestContext = None):
+    """
+    Returns the bucket and the infos of its schemas (without json schemas).
+    """
+    bucket = get_master_document_corpus_list(envId, authorization, context).get_corpus(corpusId).get_bucket(bucketId)
+    return bucket, bucket.get_schemas_info(False)
+
+
+def bind_schema(envId, authorization, bucket, body: dict, schemaType: str, targetType: TargetType,
+                nestedFields: list, context: RequestContext = None):
+    """
+    Adds the json schema to the schema list (if not already there) and binds it to the bucket under schemaType.
+    """
+    schemaId = get_schema_list(envId, authorization, context).add_json_schema_as_hash(body, False, nestedFields)
+    bucket.add_or_update_schema_to_bucket(schemaId, schemaType, targetType, {})
+
+
 class BucketSchemaDeleteHandler(BaseHandler):
-    def delete(self, corpusId, bucketId, schemaType):
+    async def delete(self, corpusId, bucketId, schemaType):
         try:
             envId = get_env_id()
             authorization = get_autorisation(envId, None, None)
 
-            bucket = get_master_document_corpus_list(envId, authorization).get_corpus(corpusId).get_bucket(bucketId)
-            schemas = bucket.get_schemas_info(False)
+            bucket, schemas = await self.run_blocking(get_bucket_and_schemas, envId, authorization, corpusId, bucketId,
+                                                      self.get_request_context())
             schemaTypes = [schema['schemaType'] for schema in schemas['data']]
             if not schemaType in schemaTypes:
                 self.write_and_set_status({MESSAGE: "Schema Type: {0} does not exist".format(schemaType)},
                                           HTTPStatus.NOT_FOUND)
                 return
 
-            bucket.delete_schema_type(schemaType)
+            await self.run_blocking(bucket.delete_schema_type, schemaType)
             self.write_and_set_status(None, HTTPStatus.NO_CONTENT)
         except CorpusNotFoundException as err:
             self.write_and_set_status({MESSAGE: "Corpus does not exist.Extra info: '{0}'".format(err)},
@@ -48,7 +66,7 @@ class BucketSchemaDeleteHandler(BaseHandler):
 
 
 class BucketSchemaHandler(BaseHandler):
-    def post(self, corpusId, bucketId):
+    async def post(self, corpusId, bucketId):
         try:
             body = self.strip_body_bom()
             envId = get_env_id()
@@ -67,8 +85,8 @@ class BucketSchemaHandler(BaseHandler):
                                           HTTPStatus.UNPROCESSABLE_ENTITY)
                 return
 
-            bucket = get_master_document_corpus_list(envId, authorization).get_corpus(corpusId).get_bucket(bucketId)
-            schemas = bucket.get_schemas_info(False)
+            bucket, schemas = await self.run_blocking(get_bucket_and_schemas, envId, authorization, corpusId, bucketId,
+                                                      self.get_request_context())
             schemaTypes = [schema['schemaType'] for schema in schemas['data']]
             if schemaType in schemaTypes:
                 self.write_and_set_status(
@@ -81,8 +99,8 @@ class BucketSchemaHandler(BaseHandler):
             nestedFields = []
             if targetType == TargetType.document_surface1d:
                 nestedFields.append("offsets")
-            schemaId = get_schema_list(envId, authorization).add_json_schema_as_hash(body, False, nestedFields)
-            bucket.add_or_update_schema_to_bucket(schemaId, schemaType, targetType, {})
+            await self.run_blocking(bind_schema, envId, authorization, bucket, body, schemaType, targetType,
+                                    nestedFields, self.get_request_context())
 
             self.write_and_set_status(None, HTTPStatus.NO_CONTENT)
         except CorpusNotFoundException as err:
@@ -102,7 +120,7 @@ class BucketSchemaHandler(BaseHandler):
     def options(self, corpusId, bucketId):
         self.write_and_set_status(None, HTTPStatus.OK)
 
-    def put(self, corpusId, bucketId):
+    async def put(self, corpusId, bucketId):
         try:
             body = self.strip_body_bom()
             envId = get_env_id()
@@ -122,8 +140,8 @@ class BucketSchemaHandler(BaseHandler):
                 return
 
             # Is there currently a schema of schemaType associated with the bucket?
-            bucket = get_master_document_corpus_list(envId, authorization).get_corpus(corpusId).get_bucket(bucketId)
-            schemas = bucket.get_schemas_info(False)
+            bucket, schemas = await self.run_blocking(get_bucket_and_schemas, envId, authorization, corpusId, bucketId,
+                                                      self.get_request_context())
             schemaTypes = [schema['schemaType'] for schema in schemas['data']]
             if schemaType not in schemaTypes:
                 self.write_and_set_status(
@@ -137,8 +155,8 @@ class BucketSchemaHandler(BaseHandler):
             nestedFields = []
             if targetType == TargetType.document_surface1d:
                 nestedFields.append("offsets")
-            schemaId = get_schema_list(envId, authorization).add_json_schema_as_hash(body, False, nestedFields)
-            bucket.add_or_update_schema_to_bucket(schemaId, schemaType, targetType, {})
+            await self.run_blocking(bind_schema, envId, authorization, bucket, body, schemaType, targetType,
+                                    nestedFields, self.get_request_context())
 
             self.write_and_set_status(None, HTTPStatus.NO_CONTENT)
         except EsSchemaMigrationInvalidException as err:
@@ -22,11 +22,12 @@ CORPUS_DOCUMENT_COUNT = 'documentCount'
 
 
 class CorporaHandler(BaseHandler):
-    def post(self):
+    async def post(self):
         body = self.request.body.decode("utf-8")
         try:
             envId = get_env_id()
             authorization = get_autorisation(envId, None, None)
+            context = self.get_request_context()
             json_args = json.loads(body)
             for requiredField in [CORPUS_LANGUAGES]:
                 if requiredField not in json_args:
@@ -56,8 +57,10 @@ class CorporaHandler(BaseHandler):
                                           HTTPStatus.UNPROCESSABLE_ENTITY)
                 return
 
-            corpora = get_master_document_corpus_list(envId, authorization)
-            corpus = corpora.create_corpus(corpusId, languages)
+            def create_corpus():
+                return get_master_document_corpus_list(envId, authorization, context).create_corpus(corpusId, languages)
+
+            corpus = await self.run_blocking(create_corpus)
             self.write_and_set_status({"id": corpus.id},
                                       HTTPStatus.OK)
         except CorpusNotFoundException:
@@ -77,12 +80,16 @@ class CorporaHandler(BaseHandler):
     def options(self):
         self.write_and_set_status(None, HTTPStatus.OK)
 
-    def get(self):
+    async def get(self):
         try:
             envId = get_env_id()
             authorization = get_autorisation(envId, None, None)
-            corpora = get_master_document_corpus_list(envId, authorization)
-            corporaInfos = corpora.get_corpuses_list()
+            context = self.get_request_context()
+
+            def get_corpuses_list():
+                return get_master_document_corpus_list(envId, authorization, context).get_corpuses_list()
+
+            corporaInfos = await self.run_blocking(get_corpuses_list)
             self.write_and_set_status({"data": corporaInfos},
                                       HTTPStatus.OK)
         except Exception:
@@ -92,18 +99,22 @@ class CorporaHandler(BaseHandler):
 
 
 class CorpusHandler(BaseHandler):
-    def get(self, corpusId):
+    async def get(self, corpusId):
         try:
             envId = get_env_id()
             authorization = get_autorisation(envId, None, None)
-            corpora = get_master_document_corpus_list(envId, authorization)
-            corpus = corpora.get_corpus(corpusId)
-            info = {
-                CORPUS_ID: corpus.id,
-                CORPUS_LANGUAGES: corpus.languages,
-                CORPUS_MODIFICATION_DATE: datetime_to_json_str(corpus.modificationDate),
-                CORPUS_DOCUMENT_COUNT: corpus.get_documents_count()
-            }
+            context = self.get_request_context()
+
+            def get_corpus_info():
+                corpus = get_master_document_corpus_list(envId, authorization, context).get_corpus(corpusId)
+                return {
+                    CORPUS_ID: corpus.id,
+                    CORPUS_LANGUAGES: corpus.languages,
+                    CORPUS_MODIFICATION_DATE: datetime_to_json_str(corpus.modificationDate),
+                    CORPUS_DOCUMENT_COUNT: corpus.get_documents_count()
+                }
+
+            info = await self.run_blocking(get_corpus_info)
             self.write_and_set_status(info, HTTPStatus.OK)
 
         except CorpusNotFoundException:
@@ -118,11 +129,12 @@ class CorpusHandler(BaseHandler):
     def options(self, corpusId):
         self.write_and_set_status(None, HTTPStatus.OK)
 
-    def put(self, corpusId):
+    async def put(self, corpusId):
         try:
             body = self.request.body.decode("utf-8")
             envId = get_env_id()
             authorization = get_autorisation(envId, None, None)
+            context = self.get_request_context()
             json_args = json.loads(body)
 
             try:
@@ -139,8 +151,10 @@ class CorpusHandler(BaseHandler):
                                           HTTPStatus.UNPROCESSABLE_ENTITY)
                 return
 
-            corpora = get_master_document_corpus_list(envId, authorization)
-            corpus = corpora.update_corpus(corpusId, languages)
+            def update_corpus():
+                return get_master_document_corpus_list(envId, authorization, context).update_corpus(corpusId, languages)
+
+            await self.run_blocking(update_corpus)
             self.write_and_set_status(None, HTTPStatus.NO_CONTENT)
 
         except CorpusInvalidFieldException as ci:
@@ -156,12 +170,16 @@ class CorpusHandler(BaseHandler):
             self.write_and_set_status({MESSAGE: "Internal server error", TRACE: trace},
                                       HTTPStatus.INTERNAL_SERVER_ERROR)
 
-    def delete(self, corpusId):
+    async def delete(self, corpusId):
         try:
             envId = get_env_id()
             authorization = get_autorisation(envId, None, None)
-            corpora = get_master_document_corpus_list(envId, authorization)
-            corpora.delete_corpus(corpusId)
+            context = self.get_request_context()
+
+            def delete_corpus():
+                get_master_document_corpus_list(envId, authorization, context).delete_corpus(corpusId)
+
+            await self.run_blocking(delete_corpus)
             self.write_and_set_status(None, HTTPStatus.NO_CONTENT)
         except CorpusNotFoundException:
             self.write_and_set_status({MESSAGE: "Specified corpus not found"},
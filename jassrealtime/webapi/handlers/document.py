@@ -1,5 +1,8 @@
+import io
 import json
+import os
 import traceback
+import zipfile
 from http import HTTPStatus
 
 from elasticsearch import TransportError
@@ -7,17 +10,23 @@ from elasticsearch import TransportError
 from jassrealtime.webapi.handlers.base_handler import BaseHandler
 
 from jassrealtime.core.master_factory_list import get_master_document_corpus_list
+from jassrealtime.core.request_context import RequestContext
 from jassrealtime.document.document_corpus import DocumentAlreadyExistsException, CorpusNotFoundException, \
-    DocumentNotFoundException
+    DocumentNotFoundException, CorpusDoesntContainLanguageException
 from jassrealtime.security.security_selector import get_autorisation
 from jassrealtime.webapi.handlers.parameter_names import *
 from jassrealtime.core.settings_utils import get_env_id
+from jassrealtime.core.esutils import InvalidCursorException
 
 MAX_DOCUMENT_SIZE = 1000
 
 
+def get_corpus(envId, authorization, corpusId: str, context: RequestContext = None):
+    return get_master_document_corpus_list(envId, authorization, context).get_corpus(corpusId)
+
+
 class DocumentFolderHandler(BaseHandler):
-    def post(self, corpusId):
+    async def post(self, corpusId):
         try:
             body = json.loads(self.request.body.decode("utf-8"))
 
@@ -35,13 +44,14 @@ class DocumentFolderHandler(BaseHandler):
             title = body.get("title", "")
             source = body.get("source", "")
 
-            corpus = get_master_document_corpus_list(envId, authorization).get_corpus(corpusId)
+            corpus = await self.run_blocking(get_corpus, envId, authorization, corpusId,
+                                             self.get_request_context())
             if not language in corpus.languages:
                 self.write_and_set_status({MESSAGE: "Document language do not correspond to corpus language"},
                                           HTTPStatus.UNPROCESSABLE_ENTITY)
                 return
 
-            docId = corpus.add_text_document(text, title, language, docId, source)
+            docId = await self.run_blocking(corpus.add_text_document, text, title, language, docId, source)
 
             self.write_and_set_status({"id": docId},
                                       HTTPStatus.OK)
@@ -56,10 +66,12 @@ class DocumentFolderHandler(BaseHandler):
     def options(self, corpusId):
         self.write_and_set_status(None, HTTPStatus.OK)
 
-    def get(self, corpusId):
+    async def get(self, corpusId):
         """Get documents from corpus according to pagination"""
         try:
-            fromIndexArgument = self.get_query_argument("from")
+            cursor = self.get_query_argument("cursor", default=None)
+            fromIndexArgument = self.get_query_argument("from", default="0") if cursor else \
+                self.get_query_argument("from")
             fromIndex = int(fromIndexArgument)
             if fromIndex < 0:
                 self.write_and_set_status({MESSAGE: "'from' must cannot be less than zero"},
@@ -79,20 +91,24 @@ class DocumentFolderHandler(BaseHandler):
             envId = get_env_id()
             authorization = get_autorisation(envId, None, None)
 
-            corpus = get_master_document_corpus_list(envId, authorization).get_corpus(corpusId)
+            corpus = await self.run_blocking(get_corpus, envId, authorization, corpusId,
+                                             self.get_request_context())
             filterTitle = self.get_query_argument("filterTitle", default=None)
             filterSource = self.get_query_argument("filterSource", default=None)
             filterJoin = self.get_query_argument("filterJoin", default=None)
             sortBy = self.get_query_argument("sortBy", default=None)
             sortOrder = self.get_query_argument("sortOrder", default=None)
-            documents = corpus.get_text_documents(fromIndex, size, sortBy, sortOrder, filterTitle, filterSource,
-                                                  filterJoin)
+            documents, nextCursor = await self.run_blocking(corpus.get_text_documents_page, fromIndex, size, sortBy,
+                                                            sortOrder, filterTitle, filterSource, filterJoin, cursor)
 
-            self.write_and_set_status({"documents": documents},
+            self.write_and_set_status({"documents": documents, "nextCursor": nextCursor},
                                       HTTPStatus.OK)
         except CorpusNotFoundException:
             self.write_and_set_status({MESSAGE: "Specified corpus not found"},
                                       HTTPStatus.NOT_FOUND)
+        except InvalidCursorException as e:
+            self.write_and_set_status({MESSAGE: str(e)},
+                                      HTTPStatus.UNPROCESSABLE_ENTITY)
         except ValueError as ve:
             self.write_and_set_status({MESSAGE: "Invalid 'from' or 'size' parameter"},
                                       HTTPStatus.UNPROCESSABLE_ENTITY)
@@ -107,13 +123,14 @@ class DocumentFolderHandler(BaseHandler):
 
 
 class DocumentHandler(BaseHandler):
-    def get(self, corpusId, documentId):
+    async def get(self, corpusId, documentId):
         """Get a single document from corpus"""
         try:
             envId = get_env_id()
             authorization = get_autorisation(envId, None, None)
-            corpus = get_master_document_corpus_list(envId, authorization).get_corpus(corpusId)
-            document = corpus.get_text_document(documentId)
+            corpus = await self.run_blocking(get_corpus, envId, authorization, corpusId,
+                                             self.get_request_context())
+            document = await self.run_blocking(corpus.get_text_document, documentId)
 
             if document is None:
                 raise DocumentNotFoundException(documentId)
@@ -131,7 +148,7 @@ class DocumentHandler(BaseHandler):
             self.write_and_set_status({MESSAGE: "Internal server error", TRACE: trace},
                                       HTTPStatus.INTERNAL_SERVER_ERROR)
 
-    def delete(self, corpusId, documentId):
+    async def delete(self, corpusId, documentId):
         """Delete a single document an optionally its annotations"""
         try:
             delete_annotations_argument = self.get_query_argument("deleteAnnotations", None)
@@ -143,8 +160,9 @@ class DocumentHandler(BaseHandler):
 
             envId = get_env_id()
             authorization = get_autorisation(envId, None, None)
-            corpus = get_master_document_corpus_list(envId, authorization).get_corpus(corpusId)
-            document = corpus.delete_document(documentId, delete_annotations)
+            corpus = await self.run_blocking(get_corpus, envId, authorization, corpusId,
+                                             self.get_request_context())
+            document = await self.run_blocking(corpus.delete_document, documentId, delete_annotations)
             self.write_and_set_status(document,
                                       HTTPStatus.OK)
         except CorpusNotFoundException:
@@ -166,13 +184,14 @@ class DocumentIdsHandler(BaseHandler):
     def options(self, corpusId):
         self.write_and_set_status(None, HTTPStatus.OK)
 
-    def get(self, corpusId):
+    async def get(self, corpusId):
         try:
             envId = get_env_id()
             authorization = get_autorisation(envId, None, None)
-            corpus = get_master_document_corpus_list(envId, authorization).get_corpus(corpusId)
+            corpus = await self.run_blocking(get_corpus, envId, authorization, corpusId,
+                                             self.get_request_context())
 
-            documentIds = corpus.get_document_ids()
+            documentIds = await self.run_blocking(corpus.get_document_ids)
 
             self.write_and_set_status({"ids": documentIds},
                                       HTTPStatus.OK)
@@ -183,3 +202,131 @@ class DocumentIdsHandler(BaseHandler):
             trace = traceback.format_exc().splitlines()
             self.write_and_set_status({MESSAGE: "Internal server error", TRACE: trace},
                                       HTTPStatus.INTERNAL_SERVER_ERROR)
+
+
+class DocumentMgetHandler(BaseHandler):
+    def options(self, corpusId):
+        self.write_and_set_status(None, HTTPStatus.OK)
+
+    async def post(self, corpusId):
+        """Get many documents of a corpus by id, in one request"""
+        try:
+            body = json.loads(self.request.body.decode("utf-8"))
+            documentIds = body.get("ids") if isinstance(body, dict) else None
+            if not isinstance(documentIds, list):
+                self.missing_required_field("ids")
+                return
+            if len(documentIds) > MAX_DOCUMENT_SIZE:
+                self.write_and_set_status({MESSAGE: "At most {0} ids can be requested".format(MAX_DOCUMENT_SIZE)},
+                                          HTTPStatus.UNPROCESSABLE_ENTITY)
+                return
+
+            envId = get_env_id()
+            authorization = get_autorisation(envId, None, None)
+            corpus = await self.run_blocking(get_corpus, envId, authorization, corpusId,
+                                             self.get_request_context())
+            documents = await self.run_blocking(corpus.get_text_documents_by_ids, documentIds)
+
+            self.write_and_set_status({"data": [document for document in documents if document],
+                                       "notFound": [documentId for documentId, document in zip(documentIds, documents)
+                                                    if not document]},
+                                      HTTPStatus.OK)
+        except CorpusNotFoundException:
+            self.write_and_set_status({MESSAGE: "Specified corpus not found"},
+                                      HTTPStatus.NOT_FOUND)
+        except json.JSONDecodeError:
+            self.write_and_set_status({MESSAGE: "Invalid JSON format"},
+                                      HTTPStatus.BAD_REQUEST)
+        except Exception:
+            trace = traceback.format_exc().splitlines()
+            self.write_and_set_status({MESSAGE: "Internal server error", TRACE: trace},
+                                      HTTPStatus.INTERNAL_SERVER_ERROR)
+
+
+def parse_bulk_documents(body: bytes, contentType: str, language: str = None) -> list:
+    """
+    Parses the body of a bulk document request: one document per line (NDJSON), a json list of documents, or a zip
+    of <documentId>.txt files (format of the documents zip export) whose documents are all in language.
+
+    :raise ValueError:  if the body is invalid
+    """
+    if contentType.startswith("application/zip"):
+        try:
+            with zipfile.ZipFile(io.BytesIO(body)) as z:
+                names = [name for name in z.namelist() if not name.endswith("/")]
+                if not all(name.endswith(".txt") for name in names):
+                    raise ValueError("The zip must only contain <documentId>.txt files")
+                return [{"id": os.path.basename(name)[:-len(".txt")], "text": z.read(name).decode("utf-8-sig"),
+                         "language": language} for name in names]
+        except zipfile.BadZipFile:
+            raise ValueError("Invalid zip file")
+
+    text = body.decode("utf-8")
+    if contentType.startswith("application/x-ndjson"):
+        documents = [json.loads(line) for line in text.splitlines() if line.strip()]
+    else:
+        documents = json.loads(text)
+        if isinstance(documents, dict):
+            documents = documents.get("data")
+    if not isinstance(documents, list) or not all(isinstance(document, dict) for document in documents):
+        raise ValueError("Expected a list of documents")
+    return documents
+
+
+def bulk_document_status(documentId: str, error: Exception) -> dict:
+    """
+    Per document result of a bulk request, with the status the single document request would have returned.
+    """
+    if error is None:
+        return {"documentId": documentId, "status": HTTPStatus.CREATED.value}
+    if isinstance(error, DocumentAlreadyExistsException):
+        status = HTTPStatus.CONFLICT
+        message = "Document with the same id already exists"
+    elif isinstance(error, CorpusDoesntContainLanguageException):
+        status = HTTPStatus.UNPROCESSABLE_ENTITY
+        message = "Document language do not correspond to corpus language"
+    else:
+        status = HTTPStatus.INTERNAL_SERVER_ERROR
+        message = str(error)
+    return {"documentId": documentId, "status": status.value, MESSAGE: message}
+
+
+class DocumentBulkHandler(BaseHandler):
+    async def post(self, corpusId):
+        """Add many documents to a corpus, in bulk requests"""
+        try:
+            envId = get_env_id()
+            authorization = get_autorisation(envId, None, None)
+            corpus = await self.run_blocking(get_corpus, envId, authorization, corpusId,
+                                             self.get_request_context())
+
+            contentType = self.request.headers.get("Content-Type", "")
+            language = self.get_query_argument("language", default=None)
+            if contentType.startswith("application/zip") and not language:
+                if len(corpus.languages) != 1:
+                    self.missing_required_field("language")
+                    return
+                language = corpus.languages[0]
+
+            def add_documents():
+                return corpus.add_text_documents(parse_bulk_documents(self.request.body, contentType, language))
+
+            results = await self.run_blocking(add_documents)
+
+            items = [bulk_document_status(documentId, error) for documentId, error in results]
+            self.write_and_set_status({"items": items,
+                                       "errorsCount": len([item for item in items if MESSAGE in item])},
+                                      HTTPStatus.OK)
+        except CorpusNotFoundException:
+            self.write_and_set_status({MESSAGE: "Specified corpus not found"},
+                                      HTTPStatus.NOT_FOUND)
+        except ValueError as e:
+            self.write_and_set_status({MESSAGE: "Invalid documents: {0}".format(e)},
+                                      HTTPStatus.BAD_REQUEST)
+        except Exception:
+            trace = traceback.format_exc().splitlines()
+            self.write_and_set_status({MESSAGE: "Internal server error", TRACE: trace},
+                                      HTTPStatus.INTERNAL_SERVER_ERROR)
+
+    def options(self, corpusId):
+        self.write_and_set_status(None, HTTPStatus.OK)
@@ -11,7 +11,7 @@ from jassrealtime.webapi.handlers.parameter_names import *
 
 
 class EnvFolderHandler(BaseHandler):
-    def post(self):
+    async def post(self):
         try:
             body = json.loads(self.request.body.decode("utf-8"))
             envId = None
@@ -22,7 +22,7 @@ class EnvFolderHandler(BaseHandler):
                 envName = body["name"]
             # TODO replace by true authorization
             authorization = get_autorisation(envId, None, None)
-            env = get_env_list(authorization).create_env(envId, envName)
+            env = await self.run_blocking(get_env_list(authorization).create_env, envId, envName)
             self.write_and_set_status({"id": env.id, "name": env.name, "securityType": "basic"},
                                       HTTPStatus.OK)
         except EnvAlreadyExistWithSameIdException:
@@ -41,10 +41,10 @@ class EnvHandler(BaseHandler):
     def options(self, envId):
         self.write_and_set_status(None, HTTPStatus.OK)
 
-    def get(self, envId):
+    async def get(self, envId):
         try:
             authorization = get_autorisation(envId, None, None)
-            env = get_env_list(authorization).get_env(envId)
+            env = await self.run_blocking(get_env_list(authorization).get_env, envId)
             self.write_and_set_status(json.dumps({"id": env.id, "name": env.name, "securityType": "basic"}),
                                       HTTPStatus.OK)
         except EnvNotFoundException:
@@ -55,10 +55,10 @@ class EnvHandler(BaseHandler):
             self.write_and_set_status({MESSAGE: "Internal server error", TRACE: trace},
                                       HTTPStatus.INTERNAL_SERVER_ERROR)
 
-    def delete(self, envId):
+    async def delete(self, envId):
         try:
             authorization = get_autorisation(envId, None, None)
-            env = get_env_list(authorization).delete_env(envId)
+            await self.run_blocking(get_env_list(authorization).delete_env, envId)
             self.write_and_set_status(None,
                                       HTTPStatus.NO_CONTENT)
         except EnvNotFoundException:
@@ -0,0 +1,26 @@
+import traceback
+from http import HTTPStatus
+
+from jassrealtime.webapi.handlers.base_handler import BaseHandler
+from jassrealtime.webapi.handlers.parameter_names import *
+from jassrealtime.core.esutils import get_es_pool_stats
+from jassrealtime.core.metrics import REGISTRY, set_es_pool_metrics
+
+
+class MetricsHandler(BaseHandler):
+    """
+    Metrics of the process serving the request, in the prometheus text format.
+    """
+
+    def get(self):
+        try:
+            set_es_pool_metrics(get_es_pool_stats())
+            self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.write_and_set_status(REGISTRY.render(), HTTPStatus.OK)
+        except Exception:
+            trace = traceback.format_exc().splitlines()
+            self.write_and_set_status({MESSAGE: "Internal server error", TRACE: trace},
+                                      HTTPStatus.INTERNAL_SERVER_ERROR)
+
+    def options(self):
+        self.write_and_set_status(None, HTTPStatus.OK)
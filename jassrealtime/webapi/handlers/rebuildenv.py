@@ -13,18 +13,22 @@ from jassrealtime.core.esutils import es_wait_ready
 from time import sleep
 
 
+def rebuild_env(envId, authorization):
+    envList = get_env_list(authorization)
+    env = envList.get_env(envId)
+    envList.delete_env(env.id)
+    es_wait_ready(force=True)
+    sleep(5)
+    env = get_env_list(authorization).create_env(env.id, env.name)
+    es_wait_ready(force=True)
+
+
 class RebuildEnvHandler(BaseHandler):
-    def post(self):
+    async def post(self):
         try:
             envId = get_env_id()
             authorization = get_autorisation(envId, None, None)
-            envList = get_env_list(authorization)
-            env = envList.get_env(envId)
-            envList.delete_env(env.id)
-            es_wait_ready()
-            sleep(5)
-            env = get_env_list(authorization).create_env(env.id, env.name)
-            es_wait_ready()
+            await self.run_blocking(rebuild_env, envId, authorization)
             self.write_and_set_status(None,
                                       HTTPStatus.OK)
         except Exception:
@@ -12,7 +12,7 @@ from jassrealtime.core.settings_utils import get_env_id
 
 
 class SchemaHandler(BaseHandler):
-    def post(self):
+    async def post(self):
         try:
             body = json.loads(self.request.body.decode('utf-8'))
             envId = get_env_id()
@@ -30,8 +30,8 @@ class SchemaHandler(BaseHandler):
                                           HTTPStatus.UNPROCESSABLE_ENTITY)
                 return
 
-            id = get_schema_list(envId, authorization).add_json_schema(body["jsonSchema"],
-                                                                       schemaName, schemaDescription, schemaId)
+            id = await self.run_blocking(get_schema_list(envId, authorization).add_json_schema, body["jsonSchema"],
+                                         schemaName, schemaDescription, schemaId)
             self.write_and_set_status({"id": id},
                                       HTTPStatus.OK)
         except JsonSchemaAlreadyExistsException:
@@ -45,17 +45,18 @@ class SchemaHandler(BaseHandler):
     def options(self):
         self.write_and_set_status(None, HTTPStatus.OK)
 
-    def get(self):
+    async def get(self):
         try:
             envId = get_env_id()
             authorization = get_autorisation(envId, None, None)
             schemaId = self.get_argument("id", None)
             res = []
             if schemaId:
-                info = get_schema_list(envId, authorization).get_json_schema_info(schemaId)
+                info = await self.run_blocking(get_schema_list(envId, authorization).get_json_schema_info, schemaId)
                 res = [info]
             else:
-                res = get_schema_list(envId, authorization).get_json_schemas_infos(
+                res = await self.run_blocking(
+                    get_schema_list(envId, authorization).get_json_schemas_infos,
                     self.get_argument("name", None), self.get_argument("description", None),
                     self.get_argument("jsonSchemaHash", None), self.get_argument("esHash", None))
             self.write_and_set_status({"data": res},
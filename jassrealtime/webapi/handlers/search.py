@@ -1,6 +1,7 @@
 import traceback
 from http import HTTPStatus
 
+from jassrealtime.core.esutils import InvalidCursorException, is_approximate_count_exact
 from jassrealtime.core.settings_utils import get_env_id
 from jassrealtime.search.document import *
 from jassrealtime.search.multicorpus.multi_corpus import MultiCorpus
@@ -15,7 +16,7 @@ MAX_OFFSET_END = 9223372036854775807
 
 
 class DocumentSearchHandlerBase(BaseHandler):
-    def getAnnotations(self, corpusId, documentIds: List[str]):
+    async def getAnnotations(self, corpusId, documentIds: List[str]):
         schemaTypesByBucketId = {}
 
         try:
@@ -42,11 +43,12 @@ class DocumentSearchHandlerBase(BaseHandler):
 
         envId = get_env_id()
         authorization = get_autorisation(envId, None, None)
-        documentSearch = DocumentSearch(envId, authorization, documentIds, corpusId)
+        context = self.get_request_context()
+        documentSearch = DocumentSearch(envId, authorization, documentIds, corpusId, context)
         offsets = None
         if not (offsetBegin == MIN_OFFSET_BEGIN and offsetEnd == MAX_OFFSET_END):
             offsets = [Interval(offsetBegin, offsetEnd, False, False, False)]
-        res = documentSearch.get_annotations(schemaTypesByBucketId, offsets)
+        res = await self.run_blocking(documentSearch.get_annotations, schemaTypesByBucketId, offsets)
         if not res[corpusId]:
             self.write({})
         else:
@@ -59,10 +61,10 @@ class DocumentSearchHandler(DocumentSearchHandlerBase):
     def options(self, corpusId, documentId):
         self.write_and_set_status(None, HTTPStatus.OK)
 
-    def get(self, corpusId, documentId):
+    async def get(self, corpusId, documentId):
         try:
             documentIds = [documentId]
-            self.getAnnotations(corpusId, documentIds)
+            await self.getAnnotations(corpusId, documentIds)
         except Exception:
             trace = traceback.format_exc().splitlines()
             self.write_and_set_status({MESSAGE: "Internal server error", TRACE: trace},
@@ -73,7 +75,7 @@ class DocumentFolderSearchHandler(DocumentSearchHandlerBase):
     def options(self, corpusId):
         self.write_and_set_status(None, HTTPStatus.OK)
 
-    def get(self, corpusId):
+    async def get(self, corpusId):
         try:
             documentIds = self.get_arguments("documentIds")
             if not documentIds or not documentIds[0]:
@@ -86,7 +88,7 @@ class DocumentFolderSearchHandler(DocumentSearchHandlerBase):
             return
 
         try:
-            self.getAnnotations(corpusId, documentIds)
+            await self.getAnnotations(corpusId, documentIds)
         except Exception:
             trace = traceback.format_exc().splitlines()
             self.write_and_set_status({MESSAGE: "Internal server error", TRACE: trace},
@@ -110,9 +112,11 @@ class SingleTypeDocumentSearchHandler(BaseHandler):
     def options(self, corpusId, bucketId, schemaType):
         self.write_and_set_status(None, HTTPStatus.OK)
 
-    def get(self, corpusId, bucketId, schemaType):
+    async def get(self, corpusId, bucketId, schemaType):
         try:
-            fromIndexArgument = self.get_query_argument("from")
+            cursor = self.get_query_argument("cursor", default=None)
+            fromIndexArgument = self.get_query_argument("from", default="0") if cursor else \
+                self.get_query_argument("from")
             fromIndex = int(fromIndexArgument)
             if fromIndex < 0:
                 self.write_and_set_status({MESSAGE: "'from' must cannot be less than zero"},
@@ -129,21 +133,30 @@ class SingleTypeDocumentSearchHandler(BaseHandler):
 
             envId = get_env_id()
             authorization = get_autorisation(envId, None, None)
-            documentSearch = DocumentSearch(envId, authorization, None, corpusId)
+            context = self.get_request_context()
+            documentSearch = DocumentSearch(envId, authorization, None, corpusId, context)
 
             filters = parse_filters_argument(self.get_query_argument("filters", default=None))
             filterJoin = self.get_query_argument("filterJoin", default=None)
             sortBy = self.get_query_argument("sortBy", default=None)
             sortOrder = self.get_query_argument("sortOrder", default=None)
+            approximateCount = self.get_query_argument("approximateCount", "false").lower() == "true"
 
-            count, annotations = documentSearch.search_annotations_for_one_type(
-                bucketId, schemaType,
-                fromIndex, size, sortBy, sortOrder, filters, filterJoin)
+            count, annotations, nextCursor = await self.run_blocking(
+                documentSearch.search_annotations_for_one_type, bucketId, schemaType,
+                fromIndex, size, sortBy, sortOrder, filters, filterJoin, cursor, approximateCount)
 
+            countIsExact = not approximateCount or \
+                is_approximate_count_exact(None if cursor else fromIndex, size, len(annotations))
             self.write_and_set_status({
                 "count": count,
-                "annotations": annotations},
+                "countIsExact": countIsExact,
+                "annotations": annotations,
+                "nextCursor": nextCursor},
                 HTTPStatus.OK)
+        except InvalidCursorException as e:
+            self.write_and_set_status({MESSAGE: str(e)},
+                                      HTTPStatus.UNPROCESSABLE_ENTITY)
         except Exception:
             trace = traceback.format_exc().splitlines()
             self.write_and_set_status({MESSAGE: "Internal server error", TRACE: trace},
@@ -154,9 +167,11 @@ class DocumentMetadataSearchHandler(BaseHandler):
     def options(self):
         self.write_and_set_status(None, HTTPStatus.OK)
 
-    def get(self):
+    async def get(self):
         try:
-            fromIndexArgument = self.get_query_argument("from")
+            cursor = self.get_query_argument("cursor", default=None)
+            fromIndexArgument = self.get_query_argument("from", default="0") if cursor else \
+                self.get_query_argument("from")
             fromIndex = int(fromIndexArgument)
             if fromIndex < 0:
                 self.write_and_set_status({MESSAGE: "'from' must cannot be less than zero"},
@@ -188,18 +203,27 @@ class DocumentMetadataSearchHandler(BaseHandler):
             filterJoin = self.get_query_argument("filterJoin", default=None)
             sortBy = self.get_query_argument("sortBy", default=None)
             sortOrder = self.get_query_argument("sortOrder", default=None)
+            approximateCount = self.get_query_argument("approximateCount", "false").lower() == "true"
 
             env_id = get_env_id()
             authorization = get_autorisation(env_id, None, None)
-            mc = MultiCorpus(env_id, authorization)
-            count, annotations = mc.get_annotations_of_type(
-                corpusIds, SCHEMA_TYPE_DOCUMENT_METADATA,
-                fromIndex, size, sortBy, sortOrder, filters, filterJoin)
-
+            context = self.get_request_context()
+            mc = MultiCorpus(env_id, authorization, context)
+            count, annotations, nextCursor = await self.run_blocking(
+                mc.get_annotations_of_type, corpusIds, SCHEMA_TYPE_DOCUMENT_METADATA,
+                fromIndex, size, sortBy, sortOrder, filters, filterJoin, cursor, approximateCount)
+
+            countIsExact = not approximateCount or \
+                is_approximate_count_exact(None if cursor else fromIndex, size, len(annotations))
             self.write_and_set_status({
                 "count": count,
-                "annotations": annotations},
+                "countIsExact": countIsExact,
+                "annotations": annotations,
+                "nextCursor": nextCursor},
                 HTTPStatus.OK)
+        except InvalidCursorException as e:
+            self.write_and_set_status({MESSAGE: str(e)},
+                                      HTTPStatus.UNPROCESSABLE_ENTITY)
         except Exception:
             trace = traceback.format_exc().splitlines()
             self.write_and_set_status({MESSAGE: "Internal server error", TRACE: trace},
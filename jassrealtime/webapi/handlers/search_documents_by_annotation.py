@@ -45,9 +45,10 @@ def parse_queries(queries_argument: str) -> list:
 
 
 class SearchDocumentsByAnnotationHandler(SearchDocumentsHandler):
-    def get(self):
+    async def get(self):
         try:
-            from_index_argument = self.get_query_argument("from", None)
+            cursor = self.get_query_argument("cursor", default=None)
+            from_index_argument = self.get_query_argument("from", "0" if cursor else None)
             if not from_index_argument:
                 self.missing_required_field("from")
                 return
@@ -90,10 +91,13 @@ class SearchDocumentsByAnnotationHandler(SearchDocumentsHandler):
 
             env_id = get_env_id()
             authorization = get_autorisation(env_id, None, None)
-            search = DocumentsByAnnotation(env_id, authorization)
-            count, documents = search.documents_by_annotation(grouped_targets, queries, from_index, size)
+            context = self.get_request_context()
+            search = DocumentsByAnnotation(env_id, authorization, context)
+            count, documents, next_cursor = await self.run_blocking(search.documents_by_annotation, grouped_targets,
+                                                                    queries, from_index, size, cursor)
 
-            self.write_and_set_status({"count": count, "documents": documents}, HTTPStatus.OK)
+            self.write_and_set_status({"count": count, "documents": documents, "nextCursor": next_cursor},
+                                      HTTPStatus.OK)
         except CorpusNotFoundException as exception:
             self.write_and_set_status({MESSAGE: "Corpus not found with id:'{}'".format(exception.corpus_id)},
                                       HTTPStatus.NOT_FOUND)
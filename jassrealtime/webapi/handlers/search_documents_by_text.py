@@ -2,6 +2,7 @@ import traceback
 from http import HTTPStatus
 
 from ...webapi.handlers.search_documents import SearchDocumentsHandler
+from ...core.esutils import is_approximate_count_exact
 from ...core.settings_utils import get_env_id
 from ...search.multicorpus.documents_by_text import DocumentsByText
 from ...security.security_selector import get_autorisation
@@ -47,7 +48,7 @@ def parse_queries(queries_argument: str) -> list:
 
 
 class SearchDocumentsByTextHandler(SearchDocumentsHandler):
-    def get(self):
+    async def get(self):
         try:
             from_index_argument = self.get_query_argument("from", None)
             if not from_index_argument:
@@ -89,13 +90,19 @@ class SearchDocumentsByTextHandler(SearchDocumentsHandler):
                 return
 
             queries = parse_queries(queries_argument)
+            approximate_count = self.get_query_argument("approximateCount", "false").lower() == "true"
 
             env_id = get_env_id()
             authorization = get_autorisation(env_id, None, None)
-            search = DocumentsByText(env_id, authorization)
-            count, documents = search.documents_by_text(grouped_targets, queries, from_index, size)
-
-            self.write_and_set_status({"count": count, "documents": documents}, HTTPStatus.OK)
+            context = self.get_request_context()
+            search = DocumentsByText(env_id, authorization, context)
+            count, documents = await self.run_blocking(search.documents_by_text, grouped_targets, queries,
+                                                       from_index, size, approximate_count)
+
+            count_is_exact = not approximate_count or is_approximate_count_exact(from_index, size, len(documents))
+            self.write_and_set_status({"count": count,
+                                       "countIsExact": count_is_exact,
+                                       "documents": documents}, HTTPStatus.OK)
         except CorpusNotFoundException as exception:
             self.write_and_set_status({MESSAGE: "Corpus not found with id:'{}'".format(exception.corpus_id)},
                                       HTTPStatus.NOT_FOUND)
@@ -11,7 +11,7 @@ from .parameter_names import MESSAGE, TRACE
 
 
 class SearchDocumentQueryStructureHandler(SearchDocumentsHandler):
-    def get(self):
+    async def get(self):
         try:
             # Get corpus id list and their respective bucket ids if any
             targets_argument = self.get_query_argument("targets", default=None)
@@ -24,8 +24,12 @@ class SearchDocumentQueryStructureHandler(SearchDocumentsHandler):
 
             env_id = get_env_id()
             authorization = get_autorisation(env_id, None, None)
-            mc = MultiCorpus(env_id, authorization)
-            structure = mc.query_structure(grouped_targets)
+            context = self.get_request_context()
+            mc = MultiCorpus(env_id, authorization, context)
+            version = await self.run_blocking(mc.query_structure_version, grouped_targets)
+            if self.is_not_modified(version):
+                return
+            structure = await self.run_blocking(mc.query_structure, grouped_targets)
 
             self.write_and_set_status({"structure": structure}, HTTPStatus.OK)
         except CorpusNotFoundException as exception:
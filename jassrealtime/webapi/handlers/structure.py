@@ -2,7 +2,6 @@ import json
 import traceback
 from http import HTTPStatus
 
-from jassrealtime.document.bucket import Bucket
 from jassrealtime.webapi.handlers.base_handler import BaseHandler
 
 from jassrealtime.core.master_factory_list import get_master_document_corpus_list
@@ -15,10 +14,17 @@ from jassrealtime.webapi.handlers.parameter_names import MESSAGE, TRACE
 INCLUDE_SCHEMA_JSON = "includeSchemaJson"
 
 
-def getBucketWithSchema(bucket: Bucket, includeSchemaJson: bool):
-    augmentedBucket = {"name": bucket.name, "id": bucket.id}
-    schemas = bucket.get_schemas_info(includeSchemaJson)
-    augmentedBucket["schemas"] = schemas["data"]
+def getBucketWithSchema(bucket: dict, includeSchemaJson: bool):
+    """
+    :param bucket:  Bucket of a CorpusStructure
+    """
+    augmentedBucket = {"name": bucket["name"], "id": bucket["id"]}
+    if includeSchemaJson:
+        augmentedBucket["schemas"] = [
+            {"schemaType": schema["schemaType"], "jsonSchema": json.dumps(schema["jsonSchema"])}
+            for schema in bucket["schemas"]]
+    else:
+        augmentedBucket["schemas"] = [{"schemaType": schema["schemaType"]} for schema in bucket["schemas"]]
     return augmentedBucket
 
 
@@ -26,15 +32,22 @@ class StructureHandler(BaseHandler):
     def options(self, corpusId):
         self.write_and_set_status(None, HTTPStatus.OK)
 
-    def get(self, corpusId):
+    async def get(self, corpusId):
         try:
             includeSchemaJson = 'true' == self.get_query_argument(INCLUDE_SCHEMA_JSON, default=False)
 
             envId = get_env_id()
             authorization = get_autorisation(envId, None, None)
-            buckets = get_master_document_corpus_list(envId, authorization).get_corpus(corpusId).get_buckets()
-            augmentedBuckets = [getBucketWithSchema(bucket, includeSchemaJson) for bucket in buckets]
+            context = self.get_request_context()
 
+            def get_structure():
+                return get_master_document_corpus_list(envId, authorization, context).get_corpus_structure(corpusId)
+
+            structure = await self.run_blocking(get_structure)
+            if self.is_not_modified("{0}-{1}".format(structure.version, int(includeSchemaJson))):
+                return
+
+            augmentedBuckets = [getBucketWithSchema(bucket, includeSchemaJson) for bucket in structure.buckets]
             self.write_and_set_status({"buckets": augmentedBuckets},
                                       HTTPStatus.OK)
         except CorpusNotFoundException:
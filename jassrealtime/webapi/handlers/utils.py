@@ -51,7 +51,8 @@ def add_cors(requestHandler: RequestHandler):
     """
     if get_jass_allow_cors:
         requestHandler.set_header("Access-Control-Allow-Origin", "*")
-        requestHandler.set_header("Access-Control-Allow-Headers", "x-requested-with")
+        requestHandler.set_header("Access-Control-Allow-Headers", "x-requested-with, x-jass-trace")
+        requestHandler.set_header("Access-Control-Expose-Headers", "X-Jass-Trace")
         requestHandler.set_header('Access-Control-Allow-Methods', 'POST, PUT, DELETE, GET, OPTIONS')
 
 
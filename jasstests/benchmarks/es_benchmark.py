@@ -0,0 +1,273 @@
+"""
+Benchmark of the main RACS operations against a local elastic search, to get a baseline before performance work
+and detect regressions after it.
+
+Measured, at the chosen scale:
+    - document_ingestion:   DocumentCorpus.add_text_document, one document at a time
+    - annotation_upload:    batch Corpus.add_annotations from a zip of annotation files
+    - annotations_export:   batch Corpus.create_tmp_annotations_zip of the whole corpus
+    - documents_export:     batch DocumentCorpus.get_documents_zip of the whole corpus
+    - annotation_search:    DocumentSearch.search_annotations_for_one_type, first page and cursor pages
+    - corpus_listing:       DocumentCorpusList.get_corpuses_list
+
+The benchmark creates its own environment (--env), deleted at the end unless --keep is given.
+Documents past --ingest-sample are loaded with bulk requests, so large scales only time a sample of the
+one by one ingestion.
+
+Usage:
+    python -m jasstests.benchmarks.es_benchmark --scale 1k --output results.json
+    python -m jasstests.benchmarks.es_benchmark --scale 100k --compare results.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import datetime
+
+from jassrealtime.batch.corpus import Corpus
+from jassrealtime.batch.document_corpus import DocumentCorpus as BatchDocumentCorpus
+from jassrealtime.core.env import EnvAlreadyExistWithSameIdException
+from jassrealtime.core.esutils import get_es_conn, es_wait_ready
+from jassrealtime.core.master_factory_list import get_env_list, get_master_document_corpus_list, get_schema_list
+from jassrealtime.document.bucket import TargetType
+from jassrealtime.document.document_corpus import language_doc_type
+from jassrealtime.search.document import DocumentSearch
+from jassrealtime.security.base_authorization import BaseAuthorization
+
+SCALES = {"1k": 1000, "100k": 100000, "1m": 1000000}
+BENCHMARKS = ["document_ingestion", "annotation_upload", "annotations_export", "documents_export",
+              "annotation_search", "corpus_listing"]
+CORPUS_ID = "benchcorpus"
+BUCKET_ID = "benchbucket"
+SCHEMA_TYPE = "sentence"
+LANGUAGE = "english"
+NB_ANNOTATIONS_PER_FILE = 1000
+WORDS = ["alice", "rabbit", "queen", "hatter", "garden", "tea", "cat", "king", "card", "door"]
+
+SENTENCE_SCHEMA = {
+    "$schema": "http://json-schema.org/draft-04/schema#",
+    "targetType": "document",
+    "schemaType": SCHEMA_TYPE,
+    "type": "object",
+    "required": ["schemaType", "_corpusID", "_documentID", "sentence"],
+    "properties": {
+        "schemaType": {"type": "string", "searchable": True, "searchModes": ["noop"], "locked": True},
+        "_documentID": {"type": "string", "searchable": True, "searchModes": ["noop"], "locked": True},
+        "_corpusID": {"type": "string", "searchable": True, "searchModes": ["noop"], "locked": True},
+        "sentence": {"type": "string", "searchable": True, "searchModes": ["basic"], "locked": True}
+    }
+}
+
+
+def make_text(i: int) -> str:
+    return " ".join(WORDS[(i + j) % len(WORDS)] for j in range(50))
+
+
+def document_id(i: int) -> str:
+    return "doc{0:07d}".format(i)
+
+
+def rate(nbItems: int, seconds: float) -> dict:
+    return {"items": nbItems, "seconds": round(seconds, 3),
+            "itemsPerSecond": round(nbItems / seconds, 1) if seconds else 0}
+
+
+def latencies(durations: list) -> dict:
+    if not durations:
+        return {"requests": 0, "seconds": 0}
+    durations = sorted(durations)
+    return {"requests": len(durations),
+            "p50": round(statistics.median(durations), 4),
+            "p95": round(durations[max(0, int(len(durations) * 0.95) - 1)], 4),
+            "seconds": round(sum(durations), 3)}
+
+
+def timed_calls(nbCalls: int, fn) -> list:
+    durations = []
+    for i in range(nbCalls):
+        start = time.perf_counter()
+        fn(i)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def refresh(envId: str):
+    get_es_conn().indices.refresh(index=envId + "*")
+
+
+class Benchmark:
+    def __init__(self, envId: str, nbDocuments: int, nbAnnotations: int, ingestSample: int, nbRequests: int):
+        self.envId = envId
+        self.authorization = BaseAuthorization(envId, None, None, None)
+        self.nbDocuments = nbDocuments
+        self.nbAnnotations = nbAnnotations
+        self.ingestSample = min(ingestSample, nbDocuments)
+        self.nbRequests = nbRequests
+        self.corpus = None
+
+    def set_up(self):
+        es_wait_ready()
+        envList = get_env_list(self.authorization)
+        try:
+            envList.create_env(self.envId)
+        except EnvAlreadyExistWithSameIdException:
+            envList.delete_env(self.envId)
+            envList.create_env(self.envId)
+        corpusList = get_master_document_corpus_list(self.envId, self.authorization)
+        self.corpus = corpusList.create_corpus(CORPUS_ID, [LANGUAGE])
+        bucket = self.corpus.create_bucket(BUCKET_ID, BUCKET_ID)
+        schemaId = get_schema_list(self.envId, self.authorization).add_json_schema_as_hash(SENTENCE_SCHEMA)
+        bucket.add_or_update_schema_to_bucket(schemaId, SCHEMA_TYPE, TargetType.document, {})
+
+    def tear_down(self):
+        get_env_list(self.authorization).delete_env(self.envId)
+
+    def document_ingestion(self) -> dict:
+        durations = timed_calls(self.ingestSample, lambda i: self.corpus.add_text_document(
+            make_text(i), "Document {0}".format(i), LANGUAGE, document_id(i)))
+        result = latencies(durations)
+        result.update(rate(self.ingestSample, sum(durations)))
+
+        # The rest of the corpus is not timed
+        remaining = ((document_id(i), {"text": make_text(i), "title": "Document {0}".format(i),
+                                       "language": LANGUAGE, "source": ""})
+                     for i in range(self.ingestSample, self.nbDocuments))
+        errors = self.corpus.dd.add_documents(remaining, language_doc_type(LANGUAGE))
+        if errors:
+            raise RuntimeError("{0} documents could not be added: {1}".format(len(errors), errors[0]))
+        refresh(self.envId)
+        return result
+
+    def annotation_upload(self) -> dict:
+        with tempfile.TemporaryDirectory() as tmpDir:
+            zipPath = os.path.join(tmpDir, "annotations.zip")
+            self.write_annotations_zip(zipPath)
+            start = time.perf_counter()
+            errors = Corpus(self.envId, self.authorization, CORPUS_ID).add_annotations(BUCKET_ID, zipPath)
+            seconds = time.perf_counter() - start
+        if errors:
+            raise RuntimeError("Annotation upload failed: {0}".format(errors["data"][0]))
+        refresh(self.envId)
+        return rate(self.nbAnnotations, seconds)
+
+    def write_annotations_zip(self, zipPath: str):
+        with zipfile.ZipFile(zipPath, "w", zipfile.ZIP_DEFLATED) as z:
+            for first in range(0, self.nbAnnotations, NB_ANNOTATIONS_PER_FILE):
+                annotations = [{"schemaType": SCHEMA_TYPE, "_corpusID": CORPUS_ID,
+                                "_documentID": document_id(i % self.nbDocuments),
+                                "sentence": " ".join(WORDS[(i + j) % len(WORDS)] for j in range(8))}
+                               for i in range(first, min(first + NB_ANNOTATIONS_PER_FILE, self.nbAnnotations))]
+                z.writestr("annotations{0}.json".format(first), json.dumps({"data": annotations}))
+
+    def annotations_export(self) -> dict:
+        batchCorpus = Corpus(self.envId, self.authorization, CORPUS_ID)
+        start = time.perf_counter()
+        zipPath = batchCorpus.create_tmp_annotations_zip([BUCKET_ID])
+        seconds = time.perf_counter() - start
+        os.remove(zipPath)
+        return rate(self.nbAnnotations, seconds)
+
+    def documents_export(self) -> dict:
+        batchCorpus = BatchDocumentCorpus(self.envId, self.authorization, CORPUS_ID)
+        start = time.perf_counter()
+        batchCorpus.get_documents_zip()
+        seconds = time.perf_counter() - start
+        batchCorpus.clear_temporary_files()
+        return rate(self.nbDocuments, seconds)
+
+    def annotation_search(self) -> dict:
+        search = DocumentSearch(self.envId, self.authorization, None, CORPUS_ID)
+        filters = [("sentence", "rabbit")]
+
+        firstPages = timed_calls(self.nbRequests, lambda i: search.search_annotations_for_one_type(
+            BUCKET_ID, SCHEMA_TYPE, 0, 10, None, None, [("sentence", WORDS[i % len(WORDS)])]))
+
+        cursor = None
+        cursorPages = []
+        for i in range(self.nbRequests):
+            start = time.perf_counter()
+            count, annotations, cursor = search.search_annotations_for_one_type(
+                BUCKET_ID, SCHEMA_TYPE, 0, 100, None, None, filters, None, cursor)
+            cursorPages.append(time.perf_counter() - start)
+            if not cursor:
+                break
+
+        return {"firstPage": latencies(firstPages), "cursorPages": latencies(cursorPages)}
+
+    def corpus_listing(self) -> dict:
+        corpusList = get_master_document_corpus_list(self.envId, self.authorization)
+        return latencies(timed_calls(self.nbRequests, lambda i: corpusList.get_corpuses_list()))
+
+
+def total_seconds(result: dict) -> float:
+    if "seconds" in result:
+        return result["seconds"]
+    return sum(part["seconds"] for part in result.values())
+
+
+def compare(results: dict, baseline: dict) -> dict:
+    """
+    :return:    {benchmark: duration / baseline duration}, above 1 when slower than the baseline
+    """
+    ratios = {}
+    for name, result in results["results"].items():
+        baseResult = baseline.get("results", {}).get(name)
+        if baseResult and total_seconds(baseResult):
+            ratios[name] = round(total_seconds(result) / total_seconds(baseResult), 2)
+    return ratios
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="1k", help="Number of documents")
+    parser.add_argument("--annotations-per-document", type=float, default=1,
+                        help="Number of annotations uploaded per document")
+    parser.add_argument("--ingest-sample", type=int, default=10000,
+                        help="Documents added one by one, the others are bulk loaded")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per search/listing benchmark")
+    parser.add_argument("--benchmarks", default=",".join(BENCHMARKS),
+                        help="Benchmarks to run, separated by commas. document_ingestion always runs.")
+    parser.add_argument("--env", default="benchmark_", help="Environment created for the benchmark")
+    parser.add_argument("--keep", action="store_true", help="Keep the environment at the end")
+    parser.add_argument("--output", help="File to write the json results to")
+    parser.add_argument("--compare", help="Json results of a previous run to compare to")
+    args = parser.parse_args()
+
+    nbDocuments = SCALES[args.scale]
+    benchmark = Benchmark(args.env, nbDocuments, int(nbDocuments * args.annotations_per_document),
+                          args.ingest_sample, args.requests)
+    names = [name for name in BENCHMARKS if name == "document_ingestion" or name in args.benchmarks.split(",")]
+    if "annotations_export" in names or "annotation_search" in names:
+        names = sorted(set(names) | {"annotation_upload"}, key=BENCHMARKS.index)
+
+    benchmark.set_up()
+    results = {"scale": args.scale,
+               "nbDocuments": nbDocuments,
+               "nbAnnotations": benchmark.nbAnnotations,
+               "elasticsearch": get_es_conn().info()["version"]["number"],
+               "date": datetime.utcnow().isoformat(),
+               "results": {}}
+    try:
+        for name in names:
+            results["results"][name] = getattr(benchmark, name)()
+            print("{0}: {1}".format(name, json.dumps(results["results"][name])), file=sys.stderr)
+    finally:
+        if not args.keep:
+            benchmark.tear_down()
+
+    if args.compare:
+        with open(args.compare) as f:
+            results["comparedTo"] = {"file": args.compare, "ratios": compare(results, json.load(f))}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
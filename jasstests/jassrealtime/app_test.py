@@ -2,11 +2,13 @@
 
 from jassrealtime.webapi.app import *
 from jasstests.jassrealtime.webapi.handlers.performance_handlers import LongRunningGetHandler, \
-    ShortRunningGetHandler
+    ShortRunningGetHandler, BlockingSleepGetHandler, AsyncSleepGetHandler
 
 if __name__ == "__main__":
     handlers.append((r"/test/longrunningrequest/(.*)", LongRunningGetHandler))
     handlers.append((r"/test/shortrunningrequest/(.*)", ShortRunningGetHandler))
+    handlers.append((r"/test/blockingsleep/(.*)", BlockingSleepGetHandler))
+    handlers.append((r"/test/asyncsleep/(.*)", AsyncSleepGetHandler))
     server = HTTPServer(make_app())
     server.bind(8889)
     server.start(get_nb_cores())
@@ -10,6 +10,8 @@ from jassrealtime.core.master_factory_list import get_schema_list, get_env_list,
 from jassrealtime.core.env import EnvAlreadyExistWithSameIdException
 from jassrealtime.batch.corpus import *
 from jassrealtime.batch.tmp_file_storage import TmpFileStorage
+from jassrealtime.core.document_directory import BULK_LOAD_SETTINGS
+from jassrealtime.core.settings_utils import get_number_of_replicas
 
 SCHEMA_NORMAL = {
     "$schema": "http://json-schema.org/draft-04/schema#",
@@ -180,6 +182,63 @@ class MyTestCase(unittest.TestCase):
         errors = batchCorpus.add_annotations("bucket1", self.get_zip_file_path("all_in_one.zip"))
         self.assertFalse(errors, str(errors))
 
+    def test_add_annotations_small_chunks(self):
+        self.set_up_corpus()
+        batchCorpus = Corpus(self.envId, self.authorization, "corpus1")
+        errors = batchCorpus.add_annotations("bucket1", self.get_zip_file_path("multiple_json.zip"), chunkSize=2,
+                                             nbThreads=3)
+        self.assertFalse(errors, str(errors))
+        time.sleep(1)
+        bucket1 = get_master_bucket_list(self.envId, self.authorization).get_bucket("corpus1", "bucket1")
+        self.assertTrue(bucket1.get_annotation("t1", "token"))
+
+    def test_add_annotations_bulk_load_mode(self):
+        self.set_up_corpus()
+        batchCorpus = Corpus(self.envId, self.authorization, "corpus1")
+        bucket1 = get_master_bucket_list(self.envId, self.authorization).get_bucket("corpus1", "bucket1")
+        index = bucket1.get_es_index_per_schema_type()["token"]
+        settingsBefore = get_es_conn().indices.get_settings(index=index)[index]["settings"]["index"]
+        errors = batchCorpus.add_annotations("bucket1", self.get_zip_file_path("multiple_json.zip"),
+                                             bulkLoadMode=True)
+        self.assertFalse(errors, str(errors))
+        # indices are refreshed at the end of the load
+        self.assertTrue(bucket1.get_annotation("t1", "token"))
+        settingsAfter = get_es_conn().indices.get_settings(index=index)[index]["settings"]["index"]
+        self.assertEqual(settingsBefore.get("refresh_interval"), settingsAfter.get("refresh_interval"))
+        self.assertEqual(settingsBefore["number_of_replicas"], settingsAfter["number_of_replicas"])
+
+    def test_add_annotations_bulk_load_mode_restores_creation_settings(self):
+        self.set_up_corpus()
+        batchCorpus = Corpus(self.envId, self.authorization, "corpus1")
+        bucket1 = get_master_bucket_list(self.envId, self.authorization).get_bucket("corpus1", "bucket1")
+        index = bucket1.get_es_index_per_schema_type()["token"]
+        # as if a load of another process was running
+        get_es_conn().indices.put_settings(index=index, body=BULK_LOAD_SETTINGS)
+        errors = batchCorpus.add_annotations("bucket1", self.get_zip_file_path("multiple_json.zip"),
+                                             bulkLoadMode=True)
+        self.assertFalse(errors, str(errors))
+        settingsAfter = get_es_conn().indices.get_settings(index=index)[index]["settings"]["index"]
+        self.assertNotIn("refresh_interval", settingsAfter)
+        self.assertEqual(str(get_number_of_replicas()), settingsAfter["number_of_replicas"])
+
+    def test_export_annotations(self):
+        self.set_up_corpus()
+        batchCorpus = Corpus(self.envId, self.authorization, "corpus1")
+        errors = batchCorpus.add_annotations("bucket1", self.get_zip_file_path("multiple_json.zip"))
+        self.assertFalse(errors, str(errors))
+        time.sleep(1)
+        with zipfile.ZipFile(self.get_zip_file_path("multiple_json.zip")) as z:
+            nbAnnotations = sum(len(json.loads(z.read(name).decode("utf-8"))["data"]) for name in z.namelist())
+
+        zipPath = batchCorpus.create_tmp_annotations_zip(["bucket1"])
+        with zipfile.ZipFile(zipPath) as z:
+            exported = [json.loads(z.read(name).decode("utf-8")) for name in z.namelist()]
+        os.remove(zipPath)
+        self.assertEqual(nbAnnotations, sum(len(annotations) for annotations in exported))
+        for annotations in exported:
+            self.assertEqual(1, len(set(annotation["_documentID"] for annotation in annotations)))
+            self.assertEqual(1, len(set(annotation["schemaType"] for annotation in annotations)))
+
     def test_update_annotations_multifiles(self):
         self.set_up_corpus()
         batchCorpus = Corpus(self.envId, self.authorization, "corpus1")
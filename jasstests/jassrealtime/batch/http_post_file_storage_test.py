@@ -0,0 +1,23 @@
+import unittest
+from unittest.mock import patch
+
+from jassrealtime.batch.http_post_file_storage import HttpPostFileStorage
+
+
+class MyTestCase(unittest.TestCase):
+    def test_empty_batch_not_sent(self):
+        fileStorage = HttpPostFileStorage("http://localhost/upload", "empty.zip")
+        fileStorage.create_zip_file()
+        zf = fileStorage.zf
+        with patch("jassrealtime.batch.http_post_file_storage.requests.request") as request:
+            fileStorage.close()
+
+        request.assert_not_called()
+        self.assertIsNone(fileStorage.zf)
+        self.assertIsNone(zf.fp)
+        self.assertFalse(fileStorage.stream.started)
+        self.assertIsNone(fileStorage.stream.uploadThread)
+
+
+if __name__ == '__main__':
+    unittest.main()
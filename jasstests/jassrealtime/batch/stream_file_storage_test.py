@@ -0,0 +1,41 @@
+import io
+import unittest
+import zipfile
+
+from jassrealtime.batch.stream_file_storage import ChunkedStream, StreamZipFileStorage
+
+
+class ListStream(ChunkedStream):
+    def __init__(self):
+        super().__init__(chunkSize=1000)
+        self.chunks = []
+        self.ended = False
+
+    def send_chunk(self, chunk: bytes):
+        self.chunks.append(chunk)
+
+    def end(self):
+        self.ended = True
+
+
+class MyTestCase(unittest.TestCase):
+    def test_stream_zip(self):
+        stream = ListStream()
+        fileStorage = StreamZipFileStorage(stream)
+        fileStorage.create_zip_file()
+        for i in range(50):
+            fileStorage.add_json_file({"data": [{"id": i, "text": "é" * 100}]}, "{0}.json".format(i))
+        fileStorage.add_utf8_file("text", "text.txt")
+        fileStorage.close()
+
+        self.assertTrue(stream.ended)
+        self.assertGreater(len(stream.chunks), 1)
+        self.assertTrue(all(len(chunk) >= 1000 for chunk in stream.chunks[:-1]))
+        with zipfile.ZipFile(io.BytesIO(b"".join(stream.chunks))) as z:
+            self.assertEqual(51, len(z.namelist()))
+            self.assertEqual(b"text", z.read("text.txt"))
+            self.assertIn("é", z.read("3.json").decode("utf-8"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+import time
+
+from jassrealtime.core.cache import TTLCache, LRUCache
+
+
+class TestTTLCache(unittest.TestCase):
+    def test_get_set_delete(self):
+        cache = TTLCache(60)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("a", "default"), "default")
+        cache.set("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        cache.delete("a")
+        self.assertIsNone(cache.get("a"))
+
+    def test_expiration(self):
+        cache = TTLCache(0.05)
+        cache.set("a", 1)
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_disabled(self):
+        cache = TTLCache(0)
+        cache.set("a", 1)
+        self.assertIsNone(cache.get("a"))
+
+    def test_entry_ttl(self):
+        cache = TTLCache(60)
+        cache.set("a", 1, 0.05)
+        # an entry can't outlive the ttl of the cache
+        cache.set("b", 2, 120)
+        cache.set("c", 3, -1)
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), 2)
+        self.assertIsNone(cache.get("c"))
+
+    def test_sweep_expired(self):
+        cache = TTLCache(0.05)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        time.sleep(0.1)
+        # expired entries are removed even if they are never read again
+        cache.set("c", 3)
+        self.assertEqual(len(cache), 1)
+
+    def test_sweep_expired_entry_ttl(self):
+        cache = TTLCache(60)
+        cache.set("a", 1)
+        cache.set("b", 2, 0.05)
+        cache.set("c", 3, 0.05)
+        # replaced by a longer lived entry, it must not be swept
+        cache.set("c", 4)
+        time.sleep(0.1)
+        # "b" expires before "a" which was added before it
+        cache.set("d", 5)
+        self.assertEqual(len(cache), 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 4)
+
+    def test_max_size(self):
+        cache = TTLCache(60, 2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.set("c", 3)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_delete_matching(self):
+        cache = TTLCache(60)
+        cache.set(("index1", "type1"), "a")
+        cache.set(("index1", None), {"type1": "a"})
+        cache.set(("index2", "type1"), "b")
+        cache.delete_matching(lambda key: key[0] == "index1")
+        self.assertIsNone(cache.get(("index1", "type1")))
+        self.assertIsNone(cache.get(("index1", None)))
+        self.assertEqual(cache.get(("index2", "type1")), "b")
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_get_set_delete(self):
+        cache = LRUCache(10)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("a", "default"), "default")
+        cache.set("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        cache.delete("a")
+        self.assertIsNone(cache.get("a"))
+
+    def test_eviction(self):
+        cache = LRUCache(2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        # "a" becomes the most recently used, so "b" is evicted
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_disabled(self):
+        cache = LRUCache(0)
+        cache.set("a", 1)
+        self.assertIsNone(cache.get("a"))
+
+    def test_delete_matching(self):
+        cache = LRUCache(10)
+        cache.set(("index1", "id1"), "a")
+        cache.set(("index2", "id1"), "b")
+        cache.delete_matching(lambda key: key[0] == "index1")
+        self.assertIsNone(cache.get(("index1", "id1")))
+        self.assertEqual(cache.get(("index2", "id1")), "b")
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+from jassrealtime.core.catalog import MetadataCatalog, CORPUS, BUCKET
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.catalog = MetadataCatalog(60)
+        self.nbLoads = 0
+
+    def load(self, value):
+        def load():
+            self.nbLoads += 1
+            return value
+
+        return load
+
+    def test_get_loads_once(self):
+        self.assertEqual(self.catalog.get("env", CORPUS, "c1", self.load({"languages": ["english"]})),
+                         {"languages": ["english"]})
+        corpus = self.catalog.get("env", CORPUS, "c1", self.load(None))
+        self.assertEqual(self.nbLoads, 1)
+        # returned values are copies
+        corpus["languages"].append("french")
+        self.assertEqual(self.catalog.get("env", CORPUS, "c1", self.load(None)), {"languages": ["english"]})
+        # kinds and envs are separated
+        self.catalog.get("env", BUCKET, "c1", self.load({}))
+        self.catalog.get("env2", CORPUS, "c1", self.load({}))
+        self.assertEqual(self.nbLoads, 3)
+
+    def test_missing_entities_not_cataloged(self):
+        def load():
+            raise KeyError("c1")
+
+        self.assertRaises(KeyError, self.catalog.get, "env", CORPUS, "c1", load)
+        self.assertEqual(self.catalog.get("env", CORPUS, "c1", self.load({"name": "c1"})), {"name": "c1"})
+
+    def test_write_through(self):
+        self.catalog.put("env", BUCKET, "c1_b1", {"name": "b1"})
+        self.assertEqual(self.catalog.get("env", BUCKET, "c1_b1", self.load(None)), {"name": "b1"})
+        self.catalog.remove("env", BUCKET, "c1_b1")
+        self.assertEqual(self.catalog.get("env", BUCKET, "c1_b1", self.load({"name": "b2"})), {"name": "b2"})
+        self.catalog.clear()
+        self.assertEqual(self.catalog.get("env", BUCKET, "c1_b1", self.load({"name": "b3"})), {"name": "b3"})
+
+    def test_load_during_write_not_cataloged(self):
+        def load():
+            # another thread modifies the corpus while it is loaded
+            self.catalog.remove("env", CORPUS, "c1")
+            return {"languages": ["english"]}
+
+        self.catalog.get("env", CORPUS, "c1", load)
+        self.catalog.get("env", CORPUS, "c1", self.load({"languages": ["french"]}))
+        self.assertEqual(self.nbLoads, 1)
+
+    def test_disabled(self):
+        catalog = MetadataCatalog(0)
+        catalog.put("env", CORPUS, "c1", {})
+        catalog.get("env", CORPUS, "c1", self.load({}))
+        catalog.get("env", CORPUS, "c1", self.load({}))
+        self.assertEqual(self.nbLoads, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
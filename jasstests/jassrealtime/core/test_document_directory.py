@@ -1,6 +1,7 @@
 import unittest
 
 from jassrealtime.core.document_directory import *
+from jassrealtime.core.document_directory import _TYPE_INDEX_CACHE
 from jassrealtime.core.esutils import es_wait_ready
 from jassrealtime.core.esutils import get_es_conn
 from jassrealtime.core.settings_utils import *
@@ -151,6 +152,29 @@ class MyTestCase(unittest.TestCase):
         body2 = {"name": "anton", "age": 777}
         self.assertRaises(DocumentAlreadyExistsException, dd.add_document, body2, 1, "person")
 
+    def test_add_documents(self):
+        dd = self.masterList.create_document_directory("docs")
+        dd.add_document({"name": "anton", "age": 666}, "1", "person")
+        time.sleep(1)
+        documents = [(str(i), {"name": "name" + str(i), "age": i}) for i in range(1, 101)]
+        failed = dd.add_documents(documents, "person", chunkSize=10)
+        self.assertEqual(1, len(failed))
+        self.assertEqual("1", failed[0][0])
+        self.assertIsInstance(failed[0][1], DocumentAlreadyExistsException)
+        time.sleep(1)
+        self.assertEqual(666, dd.get_document("1", "person")["age"])
+        self.assertEqual(100, dd.get_document("100", "person")["age"])
+
+    def test_get_documents(self):
+        dd = self.masterList.create_document_directory("docs")
+        dd.add_document({"name": "anton", "age": 666}, "1", "person")
+        dd.add_document({"name": "bob", "age": 42}, "2", "person")
+        time.sleep(1)
+        documents = dd.get_documents(["2", "missing", "1"], "person", returnFields=["age"])
+        self.assertEqual({"age": 42, "id": "2"}, documents[0])
+        self.assertIsNone(documents[1])
+        self.assertEqual({"age": 666, "id": "1"}, documents[2])
+
     def test_document_exist(self):
         es = get_es_conn()
         dd = self.masterList.create_document_directory("docs")
@@ -371,6 +395,16 @@ class MyTestCase(unittest.TestCase):
         self.assertTrue(dd.document_exist(2, "animal"), "Animal was supposed to be added")
         self.assertTrue(dd.document_exist(1, "person"), "Person not found, but person index is suppsed to exist")
 
+    def test_get_indices_stale_cache(self):
+        dd = self.masterList.create_document_directory("docs")
+        dd.add_document({"name": "anton"}, 1, "person")
+        indexName = dd.get_index_name("person")
+        # cache read before person was created, ex: by another process
+        _TYPE_INDEX_CACHE.set((dd.typeIndex, None), {})
+
+        self.assertEqual(dd.get_indices(["person"]), indexName)
+        self.assertEqual(dd.get_indices_per_doc_type(), {"person": indexName})
+
     def tearDown(self):
         es = get_es_conn()
         es_wait_ready()
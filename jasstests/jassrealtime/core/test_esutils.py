@@ -1,4 +1,5 @@
 import unittest
+from unittest.mock import patch
 from jassrealtime.core.esutils import *
 
 
@@ -30,6 +31,94 @@ class MyTestCase(unittest.TestCase):
         self.assertFalse(check_index_name_valid_for_create("env_class_a,", "env_", "class_"))
         self.assertFalse(check_index_name_valid_for_create("*env_class_a", "env_", "class_"))
 
+    def test_cursor(self):
+        sortValues = ["title", 1.5, None, "default#id"]
+        self.assertEqual(sortValues, decode_cursor(encode_cursor(sortValues)))
+        self.assertRaises(InvalidCursorException, decode_cursor, "not a cursor")
+        self.assertRaises(InvalidCursorException, decode_cursor, encode_cursor({"a": 1}))
+
+    def test_paginate_search(self):
+        body = paginate_search(Search(index="index").sort("-title"), 10, 5).to_dict()
+        self.assertEqual([{"title": {"order": "desc"}}, "_index", "_uid"], body["sort"])
+        self.assertNotIn("search_after", body)
+        self.assertEqual(10, body["from"])
+        self.assertEqual(5, body["size"])
+        body = paginate_search(Search(index="index").sort("_uid"), 10, 5,
+                               encode_cursor(["default#id", "index"])).to_dict()
+        self.assertEqual(["_uid", "_index"], body["sort"])
+        self.assertEqual(["default#id", "index"], body["search_after"])
+        self.assertEqual(0, body["from"])
+        self.assertEqual(5, body["size"])
+
+    def test_execute_with_count(self):
+        class FakeEs:
+            def __init__(self, nbHits):
+                self.nbHits = nbHits
+                self.bodies = []
+
+            def search(self, index=None, body=None, **kwargs):
+                self.bodies.append(body)
+                return {"hits": {"total": 40, "hits": [{"_index": "index", "_id": str(i), "_source": {}}
+                                                       for i in range(self.nbHits)]}}
+
+        es = FakeEs(2)
+        response, count = execute_with_count(Search(using=es, index="index")[10:15], 10)
+        self.assertEqual(40, count)
+        self.assertEqual(2, len(response.hits))
+        self.assertEqual(10, es.bodies[-1]["from"])
+        self.assertEqual(5, es.bodies[-1]["size"])
+        self.assertNotIn("track_total_hits", es.bodies[-1])
+
+        response, count = execute_with_count(Search(using=es, index="index")[10:15], 10, approximateCount=True)
+        self.assertEqual(12, count)
+        self.assertFalse(es.bodies[-1]["track_total_hits"])
+
+        # page requested with a cursor: its position is unknown
+        response, count = execute_with_count(Search(using=es, index="index")[0:5], None, approximateCount=True)
+        self.assertEqual(2, count)
+
+        # page past the last hit
+        response, count = execute_with_count(Search(using=FakeEs(0), index="index")[1000:1010], 1000,
+                                             approximateCount=True)
+        self.assertEqual(0, count)
+
+    def test_is_approximate_count_exact(self):
+        self.assertTrue(is_approximate_count_exact(10, 5, 2))
+        self.assertFalse(is_approximate_count_exact(10, 5, 5))
+        self.assertFalse(is_approximate_count_exact(None, 5, 2))
+        self.assertFalse(is_approximate_count_exact(1000, 10, 0))
+        self.assertTrue(is_approximate_count_exact(0, 10, 0))
+
+    def test_mget_from_indices(self):
+        class FakeEs:
+            def mget(self, body=None, **kwargs):
+                return {"docs": [{"_index": doc["_index"], "_type": doc["_type"], "_id": doc["_id"],
+                                  "found": doc["_index"] == "index2" and doc["_id"] != "3", "_source": {}}
+                                 for doc in body["docs"]]}
+
+        with patch("jassrealtime.core.esutils.get_es_conn", return_value=FakeEs()):
+            hits = mget_from_indices([1, "2", 3], [("index1", "doc"), ("index2", "doc")])
+        self.assertEqual(["index2", "index2", None], [hit and hit["_index"] for hit in hits])
+        self.assertEqual("1", hits[0]["_id"])
+
+    def test_get_es_pool_stats(self):
+        es = Elasticsearch(["localhost:9200"], connection_class=KeepAliveConnection, tcpKeepAliveIdle=30, maxsize=3)
+        self.assertEqual([{"host": "http://localhost:9200", "maxsize": 3, "idle": 0, "opened": 0, "requests": 0}],
+                         get_es_pool_stats(es))
+        socketOptions = es.transport.connection_pool.connections[0].pool.conn_kw["socket_options"]
+        self.assertIn((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1), socketOptions)
+
+    def test_es_operation_name(self):
+        self.assertEqual("search", es_operation_name("POST", "/index1,index2/_search"))
+        self.assertEqual("scroll", es_operation_name("POST", "/_search/scroll"))
+        self.assertEqual("clear_scroll", es_operation_name("DELETE", "/_search/scroll"))
+        self.assertEqual("bulk", es_operation_name("POST", "/_bulk"))
+        self.assertEqual("get", es_operation_name("GET", "/index/type/id"))
+        self.assertEqual("index", es_operation_name("PUT", "/index/type/id"))
+        self.assertEqual("indices.create", es_operation_name("PUT", "/index"))
+        self.assertEqual("indices.stats", es_operation_name("GET", "/index*/_stats/docs"))
+        self.assertEqual("cluster.health", es_operation_name("GET", "/_cluster/health"))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+from jassrealtime.core.metrics import Counter, Histogram, MetricsRegistry, batch_job, BATCH_ITEMS
+
+
+class MyTestCase(unittest.TestCase):
+    def test_counter(self):
+        registry = MetricsRegistry()
+        counter = registry.register(Counter("jass_test_total", "Test counter.", ("kind",)))
+        counter.inc(kind="a")
+        counter.inc(2, kind="a")
+        counter.inc(kind='b"c')
+        self.assertEqual(3, counter.get(kind="a"))
+        self.assertEqual("# HELP jass_test_total Test counter.\n"
+                         "# TYPE jass_test_total counter\n"
+                         'jass_test_total{kind="a"} 3\n'
+                         'jass_test_total{kind="b\\"c"} 1\n', registry.render())
+        with self.assertRaises(ValueError):
+            counter.inc(other="a")
+        with self.assertRaises(ValueError):
+            registry.register(Counter("jass_test_total", "Same name."))
+
+    def test_histogram(self):
+        registry = MetricsRegistry()
+        histogram = registry.register(Histogram("jass_test_seconds", "Test histogram.", buckets=(0.1, 1)))
+        histogram.observe(0.05)
+        histogram.observe(0.1)
+        histogram.observe(5)
+        self.assertEqual(3, histogram.get_count())
+        self.assertEqual("# HELP jass_test_seconds Test histogram.\n"
+                         "# TYPE jass_test_seconds histogram\n"
+                         'jass_test_seconds_bucket{le="0.1"} 2\n'
+                         'jass_test_seconds_bucket{le="1.0"} 2\n'
+                         'jass_test_seconds_bucket{le="+Inf"} 3\n'
+                         'jass_test_seconds_sum 5.15\n'
+                         'jass_test_seconds_count 3\n', registry.render())
+
+        with self.assertRaises(KeyError):
+            with histogram.time():
+                raise KeyError()
+        self.assertEqual(4, histogram.get_count())
+
+    def test_batch_job(self):
+        before = BATCH_ITEMS.get(job="test_job")
+        with batch_job("test_job") as add_items:
+            add_items(10)
+            add_items()
+        self.assertEqual(before + 11, BATCH_ITEMS.get(job="test_job"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+
+from jassrealtime.core.request_context import RequestContext, memoized, forget
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.context = RequestContext("env", None)
+        self.nbBuilds = 0
+
+    def build(self):
+        self.nbBuilds += 1
+        return object()
+
+    def test_memoize_builds_once(self):
+        first = memoized(self.context, ("corpus", "env", "c1"), self.build)
+        self.assertIs(memoized(self.context, ("corpus", "env", "c1"), self.build), first)
+        self.assertEqual(self.nbBuilds, 1)
+        memoized(self.context, ("corpus", "env", "c2"), self.build)
+        self.assertEqual(self.nbBuilds, 2)
+
+    def test_forget(self):
+        first = memoized(self.context, ("corpus", "env", "c1"), self.build)
+        forget(self.context, ("corpus", "env", "c1"))
+        self.assertIsNot(memoized(self.context, ("corpus", "env", "c1"), self.build), first)
+        self.assertEqual(self.nbBuilds, 2)
+        # forgetting an unknown key or without context does nothing
+        forget(self.context, ("corpus", "env", "unknown"))
+        forget(None, ("corpus", "env", "c1"))
+
+    def test_without_context(self):
+        self.assertIsNot(memoized(None, ("corpus", "env", "c1"), self.build),
+                         memoized(None, ("corpus", "env", "c1"), self.build))
+        self.assertEqual(self.nbBuilds, 2)
+
+    def test_build_failure_not_memoized(self):
+        def fail():
+            raise KeyError("c1")
+
+        with self.assertRaises(KeyError):
+            memoized(self.context, ("corpus", "env", "c1"), fail)
+        memoized(self.context, ("corpus", "env", "c1"), self.build)
+        self.assertEqual(self.nbBuilds, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
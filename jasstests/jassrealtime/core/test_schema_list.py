@@ -3,6 +3,7 @@ import time
 
 from jassrealtime.core.document_directory import DocumentDirectoryList
 from jassrealtime.core.schema_list import *
+from jassrealtime.core.schema_list import _JSON_SCHEMA_INFO_CACHE
 from jassrealtime.core.settings_utils import get_language_manager
 
 TEST_JSON_SCHEMA_STR = """
@@ -376,6 +377,44 @@ class MyTestCase(unittest.TestCase):
         schemasInfo = self.schemaList.get_json_schemas_infos()
         self.assertEqual(1, len(schemasInfo))
 
+    def test_get_json_schema_info_cached(self):
+        jsonSchema = json.loads(TEST_JSON_SCHEMA_STR)
+        id = self.schemaList.add_json_schema(jsonSchema, "Cached Schema")
+        info = self.schemaList.get_json_schema_info(id)
+        self.assertEqual(info["jsonSchema"], jsonSchema)
+        # modifying a returned value doesn't modify the cached one
+        info["jsonSchema"]["properties"].clear()
+        self.assertEqual(self.schemaList.get_json_schema_info(id)["jsonSchema"], jsonSchema)
+        esProperties = self.schemaList.get_es_properties(info["esHash"])
+        self.assertEqual(esProperties, self.schemaList.convert_json_schema_to_es_properties(jsonSchema))
+        self.assertRaises(JsonSchemaDoesntExistException, self.schemaList.get_json_schema_info, "doesnotexist")
+
+    def test_get_json_schema_strings(self):
+        jsonSchema = json.loads(TEST_JSON_SCHEMA_STR)
+        id1 = self.schemaList.add_json_schema(jsonSchema)
+        id2 = self.schemaList.add_json_schema(json.loads(JSON_SCHEMA_WITH_STRING_ARRAY))
+        _JSON_SCHEMA_INFO_CACHE.clear()
+        self.schemaList.get_json_schema_info(id1)
+        schemas = self.schemaList.get_json_schema_strings([id1, id2, id1])
+        self.assertEqual({id1: json.dumps(jsonSchema), id2: json.dumps(json.loads(JSON_SCHEMA_WITH_STRING_ARRAY))},
+                         schemas)
+        self.assertRaises(JsonSchemaDoesntExistException, self.schemaList.get_json_schema_strings,
+                          [id1, "doesnotexist"])
+
+    def test_preload_cache(self):
+        jsonSchema = json.loads(TEST_JSON_SCHEMA_STR)
+        id = self.schemaList.add_json_schema(jsonSchema)
+        time.sleep(1)
+        _JSON_SCHEMA_INFO_CACHE.clear()
+        self.schemaList.preload_cache()
+        cached = _JSON_SCHEMA_INFO_CACHE.get((self.schemaList.masterJsonSchemaIndex, id))
+        self.assertEqual(json.loads(cached["jsonSchema"]), jsonSchema)
+        # deleting the schema list removes its cached schemas
+        self.schemaList.delete()
+        self.assertIsNone(_JSON_SCHEMA_INFO_CACHE.get((self.schemaList.masterJsonSchemaIndex, id)))
+        self.schemaList = SchemaList.create(self.envId, get_settings()['CLASSES']['SCHEMA_LIST'], self.authorization,
+                                            get_language_manager())
+
     def test_add_json_schema_with_offsets(self):
         jsonSchema = """
         {
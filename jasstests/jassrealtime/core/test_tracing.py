@@ -0,0 +1,32 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from jassrealtime.core.tracing import RequestTrace, get_current_trace, tracing, traced
+
+
+class MyTestCase(unittest.TestCase):
+    def test_record(self):
+        trace = RequestTrace(maxBodyLength=10)
+        trace.record("search", "GET", "/index/_search", {"query": {"match_all": {}}}, 0.0125)
+        trace.record("get", "GET", "/index/type/id", None, 0.001, KeyError("id"))
+        result = trace.to_dict()
+        self.assertEqual(2, result["nbCalls"])
+        self.assertEqual(13.5, result["totalMs"])
+        self.assertEqual('{"query": ...', result["calls"][0]["body"])
+        self.assertEqual(12.5, result["calls"][0]["durationMs"])
+        self.assertNotIn("body", result["calls"][1])
+        self.assertEqual("KeyError('...", result["calls"][1]["error"])
+
+    def test_traced(self):
+        trace = RequestTrace()
+        self.assertIsNone(get_current_trace())
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            self.assertIs(trace, executor.submit(traced(trace, get_current_trace)).result())
+            self.assertIsNone(executor.submit(get_current_trace).result())
+        with tracing(trace):
+            self.assertIs(trace, get_current_trace())
+        self.assertIsNone(get_current_trace())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -93,6 +93,17 @@ class MyTestCase(unittest.TestCase):
         time.sleep(1)
         res = bucket1.get_schemas_info(True)
         self.assertEqual(len(res["data"]), 2)
+        schemas = {schema["schemaType"]: schema["jsonSchema"] for schema in res["data"]}
+        self.assertEqual(json.loads(schemas["schema1"]), jsonSchema1)
+        self.assertEqual(json.loads(schemas["schema2"]), jsonSchema2)
+
+        bucket2 = corpus.create_bucket("bucket2")
+        bucket2.add_or_update_schema_to_bucket(schemaId2, "schema2", TargetType("document"), {})
+        time.sleep(1)
+        schemasPerBucket = corpus.bucketList.get_corpus_json_schemas("corpus1")
+        self.assertEqual(sorted(schema["schemaType"] for schema in schemasPerBucket[bucket1.id]),
+                         ["schema1", "schema2"])
+        self.assertEqual(schemasPerBucket[bucket2.id], [{"schemaType": "schema2", "jsonSchema": jsonSchema2}])
 
     def test_bind_schema_with_string_array(self):
         schema = json.loads(JSON_SCHEMA_WITH_STRING_ARRAY)
@@ -181,6 +192,49 @@ class MyTestCase(unittest.TestCase):
         self.assertEqual(anno2["name"], "Rage")
         self.assertRaises(DocumentNotFoundException, bucket1.get_annotation, "1", "schema1")
 
+    def test_add_annotations(self):
+        jsonSchema1 = {
+            "$schema": "http://json-schema.org/draft-04/schema#",
+            "targetType": "document_surface1d",
+            "schemaType": "schema1",
+            "type": "object",
+            "properties": {
+                "name": {
+                    "type": "string",
+                    "description": "Name",
+                    "searchable": True,
+                    "searchModes": ["basic"],
+                    "locked": True
+                }
+            }
+        }
+
+        corpus = get_master_document_corpus_list(self.envId, self.authorization).create_corpus("corpus1")
+        bucket1 = corpus.create_bucket("bucket1")
+        schemaId1 = get_schema_list(self.envId, self.authorization).add_json_schema_as_hash(jsonSchema1, False, {})
+        time.sleep(1)
+        bucket1.add_or_update_schema_to_bucket(schemaId1, "schema1", TargetType("document"), {})
+        bucket1.add_annotation({"name": "Anton", "schemaType": "schema1"}, "schema1", "1")
+        time.sleep(1)
+
+        results = bucket1.add_annotations([
+            {"annotationId": "1", "schemaType": "schema1", "name": "Duplicate"},
+            {"annotationId": "2", "schemaType": "schema1", "name": "JF"},
+            {"schemaType": "schema1", "name": "No id"},
+            {"annotationId": "3", "schemaType": "unknown", "name": "Unknown"},
+            {"annotationId": "4", "name": "No schema type"}])
+
+        self.assertEqual(5, len(results))
+        self.assertIsInstance(results[0][1], DocumentAlreadyExistsException)
+        self.assertEqual(("2", None), results[1])
+        self.assertIsNone(results[2][1])
+        self.assertIsInstance(results[3][1], SchemaTypeNotFoundException)
+        self.assertIsInstance(results[4][1], SchemaTypeNotFoundException)
+        time.sleep(1)
+        self.assertEqual("Anton", bucket1.get_annotation("1", "schema1")["name"])
+        self.assertEqual("JF", bucket1.get_annotation("2", "schema1")["name"])
+        self.assertNotIn("annotationId", bucket1.get_annotation(results[2][0], "schema1"))
+
     def tearDown(self):
         try:
             self.envList1.delete_env(self.envId)
@@ -2,6 +2,7 @@ import unittest
 import os
 
 from jassrealtime.core.settings_utils import get_settings, set_setting_path
+from jassrealtime.core.catalog import CATALOG
 from jassrealtime.document.document_corpus import *
 from jasstests.jassrealtime.core.test_schema_list import JSON_SCHEMA_WITH_STRING_ARRAY
 
@@ -10,6 +11,8 @@ class MyTestCase(unittest.TestCase):
     def setUp(self):
         es = get_es_conn()
         es.indices.delete(index="unittest_*")
+        # the indices are deleted behind the catalog's back
+        CATALOG.clear()
         time.sleep(0.1)
         setting = get_settings()
         self.envId = "unittest_"
@@ -56,6 +59,42 @@ class MyTestCase(unittest.TestCase):
         self.assertEqual(doc["text"], "Another doc whatever")
         self.assertRaises(DocumentNotFoundException, corpus.get_text_document, 10)
 
+    def test_get_corpuses_list(self):
+        c1 = self.documentCorpusList.create_corpus(id="c1", languages=["french", "english"])
+        c2 = self.documentCorpusList.create_corpus(id="c1_data_c2")
+        self.documentCorpusList.create_corpus(id="c3")
+        c1.add_text_document("Un document", "doc1", "french", 1)
+        c1.add_text_document("A document", "doc2", "english", 2)
+        c2.add_text_document("Another document", "doc3", "english", 3)
+        time.sleep(1)
+        counts = {corpus["id"]: corpus[CORPUS_DOCUMENT_COUNT] for corpus in
+                  self.documentCorpusList.get_corpuses_list()}
+        self.assertEqual({"c1": 2, "c1_data_c2": 1, "c3": 0}, counts)
+
+    def test_get_corpus_structure(self):
+        corpus = self.documentCorpusList.create_corpus("c1")
+        bucket1 = corpus.create_bucket("bucket1", "b1")
+        time.sleep(1)
+        structure = self.documentCorpusList.get_corpus_structure("c1")
+        self.assertEqual([{"id": "b1", "name": "bucket1", "schemas": []}], structure.buckets)
+        self.assertIs(structure, self.documentCorpusList.get_corpus_structure("c1"))
+
+        schema = json.loads(JSON_SCHEMA_WITH_STRING_ARRAY)
+        schemaId = get_schema_list(self.envId, self.authorization).add_json_schema_as_hash(schema, False,
+                                                                                           nestedFields=["offsets"])
+        time.sleep(1)
+        bucket1.add_or_update_schema_to_bucket(schemaId, "schema1", TargetType("document"), {})
+        time.sleep(1)
+        modifiedStructure = self.documentCorpusList.get_corpus_structure("c1")
+        self.assertNotEqual(structure.version, modifiedStructure.version)
+        modifiedSchemas = modifiedStructure.get_bucket("b1")["schemas"]
+        self.assertEqual(["schema1"], [schema["schemaType"] for schema in modifiedSchemas])
+
+        bucket1.delete_schema_type("schema1")
+        time.sleep(1)
+        self.assertEqual(structure.version, self.documentCorpusList.get_corpus_structure("c1").version)
+        self.assertRaises(CorpusNotFoundException, self.documentCorpusList.get_corpus_structure, "doesnotexist")
+
     def test_get_documents(self):
         corpus = self.documentCorpusList.create_corpus()
         time.sleep(1)
@@ -78,6 +117,20 @@ class MyTestCase(unittest.TestCase):
                 self.assertTrue(False, "Id should not overlap between doc sets")
                 # should be 4 different IDS
 
+    def test_get_documents_with_cursor(self):
+        corpus = self.documentCorpusList.create_corpus()
+        for i in range(5):
+            corpus.add_text_document("Same title for all", "doc", "english", str(i))
+        time.sleep(1)
+        ids = []
+        documents, cursor = corpus.get_text_documents_page(0, 2, "title")
+        ids += [document["id"] for document in documents]
+        while cursor:
+            documents, cursor = corpus.get_text_documents_page(0, 2, "title", cursor=cursor)
+            ids += [document["id"] for document in documents]
+        self.assertEqual(["0", "1", "2", "3", "4"], sorted(ids))
+        self.assertRaises(InvalidCursorException, corpus.get_text_documents_page, 0, 2, cursor="invalid")
+
     def test_add_document_duplicate_id_exception(self):
         corpus = self.documentCorpusList.create_corpus()
         corpus.add_text_document("Text Doc 1", "Title Doc 1", "english", "1")
@@ -85,6 +138,29 @@ class MyTestCase(unittest.TestCase):
         self.assertRaises(DocumentAlreadyExistsException, corpus.add_text_document, "Text Doc 1", "Title Doc 1",
                           "english", "1")
 
+    def test_add_text_documents(self):
+        corpus = self.documentCorpusList.create_corpus(languages=["french", "english"])
+        corpus.add_text_document("Text Doc 1", "Title Doc 1", "english", "1")
+        time.sleep(0.2)
+        results = corpus.add_text_documents([
+            {"id": "1", "text": "Text Doc 1", "title": "Title Doc 1", "language": "english"},
+            {"id": "2", "text": "Text Doc 2", "title": "Title Doc 2", "language": "english"},
+            {"id": "3", "text": "Texte Doc 3", "title": "Titre Doc 3", "language": "french"},
+            {"id": "3", "text": "Texte Doc 3", "title": "Titre Doc 3", "language": "french"},
+            {"id": "4", "text": "Text Doc 4", "title": "Title Doc 4", "language": "german"},
+            {"text": "Text without id", "title": "Title", "language": "english"}])
+        self.assertEqual(["1", "2", "3", "3", "4"], [documentId for documentId, error in results[:5]])
+        self.assertIsInstance(results[0][1], DocumentAlreadyExistsException)
+        self.assertIsNone(results[1][1])
+        self.assertIsNone(results[2][1])
+        self.assertIsInstance(results[3][1], DocumentAlreadyExistsException)
+        self.assertIsInstance(results[4][1], CorpusDoesntContainLanguageException)
+        self.assertIsNone(results[5][1])
+        time.sleep(1)
+        self.assertEqual(corpus.get_documents_count(), 4)
+        self.assertEqual(corpus.get_text_document("3")["text"], "Texte Doc 3")
+        self.assertEqual(corpus.get_text_document(results[5][0])["text"], "Text without id")
+
     def test_delete_document_and_annotations(self):
         schema = json.loads(JSON_SCHEMA_WITH_STRING_ARRAY)
 
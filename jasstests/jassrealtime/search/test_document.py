@@ -772,11 +772,20 @@ class MyTestCase(unittest.TestCase):
                     'search_mode': 'basic',
                     'attribute': 'sentence',
                     'text': 'appellation'}]
-        count, documents = search.documents_by_annotation(grouped_targets, queries, 0, 10)
+        count, documents, next_cursor = search.documents_by_annotation(grouped_targets, queries, 0, 10)
         self.assertEqual(1, count)
         document_ids = [document["id"] for document in documents]
         self.assertEqual(1, len(document_ids))
         self.assertIn(ALICE_FR_DOC_ID, document_ids)
+        self.assertIsNone(next_cursor)
+
+        count, documents, next_cursor = search.documents_by_annotation(grouped_targets, queries, 0, 1)
+        self.assertEqual(1, count)
+        self.assertEqual(ALICE_FR_DOC_ID, documents[0]["id"])
+        count, documents, next_cursor = search.documents_by_annotation(grouped_targets, queries, 0, 1, next_cursor)
+        self.assertEqual(1, count)
+        self.assertEqual([], documents)
+        self.assertIsNone(next_cursor)
 
     def tearDown(self):
         try:
@@ -0,0 +1,56 @@
+import time
+import unittest
+from unittest.mock import patch
+
+from jassrealtime.security.base_authorization import BaseAuthorization, PermissionDenied
+from jassrealtime.security.security_selector import get_autorisation
+
+
+class RestrictedAuthorization(BaseAuthorization):
+    def __init__(self, envId):
+        super().__init__(envId, None, None, None)
+        self.nbChecks = 0
+
+    def can_get_document_corpus(self, corpusId: str):
+        self.nbChecks += 1
+        if corpusId.startswith("private"):
+            raise PermissionDenied(corpusId)
+
+    def can_read_bucket(self, corpusId, bucketId):
+        self.nbChecks += 1
+        if bucketId.startswith("private"):
+            raise PermissionDenied(bucketId)
+
+
+class MyTestCase(unittest.TestCase):
+    def test_filter_readable(self):
+        authorization = RestrictedAuthorization("unittest_")
+        self.assertEqual(authorization.filter_readable_corpuses(["c1", "private1", "c2"]), ["c1", "c2"])
+        self.assertEqual(authorization.filter_readable_buckets("c1", ["b1", "private1", "b2"]), ["b1", "b2"])
+        self.assertEqual(authorization.nbChecks, 6)
+
+    def test_decisions_are_cached(self):
+        authorization = RestrictedAuthorization("unittest_")
+        self.assertTrue(authorization.is_allowed(authorization.can_read_bucket, "c1", "b1"))
+        self.assertFalse(authorization.is_allowed(authorization.can_read_bucket, "c1", "private1"))
+        authorization.filter_readable_buckets("c1", ["b1", "private1"])
+        self.assertEqual(authorization.nbChecks, 2)
+        # same ids, other check or corpus
+        self.assertTrue(authorization.is_allowed(authorization.can_get_document_corpus, "b1"))
+        authorization.filter_readable_buckets("c2", ["b1"])
+        self.assertEqual(authorization.nbChecks, 4)
+
+    def test_get_autorisation_reused(self):
+        authorization = get_autorisation("unittest_", "token1", None)
+        self.assertIs(authorization, get_autorisation("unittest_", "token1", None))
+        self.assertIsNot(authorization, get_autorisation("unittest_", "token2", None))
+        self.assertIsNot(authorization, get_autorisation("unittest_2", "token1", None))
+
+    def test_get_autorisation_expired_token(self):
+        with patch.object(BaseAuthorization, "get_expiration_time", lambda self: time.time() - 1):
+            self.assertIsNot(get_autorisation("unittest_", "expired", None),
+                             get_autorisation("unittest_", "expired", None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Load benchmark comparing a synchronous handler (blocking call on the IOLoop thread, like the handlers before
+they were made async) with an async handler (blocking call awaited through BaseHandler.run_blocking).
+
+Both handlers sleep for a fixed latency to simulate an elastic search request, so elastic search is not needed.
+The server runs in a single process, in a background thread of this script.
+
+Usage:
+    python -m jasstests.jassrealtime.webapi.handlers.load_benchmark --clients 50 --requests 500 --latency 0.05
+"""
+
+import argparse
+import json
+import socket
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import tornado.ioloop
+import tornado.web
+from tornado.httpserver import HTTPServer
+
+from jasstests.jassrealtime.webapi.handlers.performance_handlers import BlockingSleepGetHandler, \
+    AsyncSleepGetHandler
+
+
+def start_server() -> (int, tornado.ioloop.IOLoop):
+    """
+    Starts a server with both handlers on a free port in a background thread.
+
+    :return:    port, IOLoop of the server
+    """
+    sock = socket.socket()
+    sock.bind(("localhost", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+
+    started = threading.Event()
+    loopHolder = {}
+
+    def run():
+        ioLoop = tornado.ioloop.IOLoop()
+        ioLoop.make_current()
+        app = tornado.web.Application([
+            (r"/test/blockingsleep/(.*)", BlockingSleepGetHandler),
+            (r"/test/asyncsleep/(.*)", AsyncSleepGetHandler)
+        ])
+        server = HTTPServer(app)
+        server.listen(port, "localhost")
+        loopHolder["loop"] = ioLoop
+        started.set()
+        ioLoop.start()
+
+    threading.Thread(target=run, daemon=True).start()
+    started.wait()
+    return port, loopHolder["loop"]
+
+
+def run_load(url: str, nbClients: int, nbRequests: int) -> dict:
+    """
+    Sends nbRequests GET requests to url using nbClients concurrent clients.
+
+    :return:    {"rps", "p50", "p95", "errors"}
+    """
+    local = threading.local()
+
+    def timed_get(i):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        start = time.perf_counter()
+        response = local.session.get(url)
+        return time.perf_counter() - start, response.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=nbClients) as executor:
+        results = list(executor.map(timed_get, range(nbRequests)))
+    duration = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, status in results)
+    return {
+        "rps": round(nbRequests / duration, 1),
+        "p50": round(statistics.median(latencies), 4),
+        "p95": round(latencies[int(len(latencies) * 0.95) - 1], 4),
+        "errors": len([status for latency, status in results if status != 200])
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50, help="Number of concurrent clients")
+    parser.add_argument("--requests", type=int, default=500, help="Number of requests per handler")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated elastic search latency in seconds")
+    args = parser.parse_args()
+
+    port, ioLoop = start_server()
+    results = {}
+    for name in ["blockingsleep", "asyncsleep"]:
+        url = "http://localhost:{0}/test/{1}/{2}".format(port, name, args.latency)
+        results[name] = run_load(url, args.clients, args.requests)
+    ioLoop.add_callback(ioLoop.stop)
+
+    results["speedup"] = round(results["asyncsleep"]["rps"] / results["blockingsleep"]["rps"], 2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -39,3 +39,23 @@ class ShortRunningGetHandler(BaseHandler):
     def get(self, number: float):
         res = do_work(10000)
         self.write_and_set_status(res, HTTPStatus.OK)
+
+
+class BlockingSleepGetHandler(BaseHandler):
+    """
+    Simulates an elastic search request of number seconds done on the IOLoop thread (synchronous handler).
+    """
+
+    def get(self, number: float):
+        time.sleep(float(number))
+        self.write_and_set_status({"slept": float(number)}, HTTPStatus.OK)
+
+
+class AsyncSleepGetHandler(BaseHandler):
+    """
+    Simulates an elastic search request of number seconds done in the worker thread pool (async handler).
+    """
+
+    async def get(self, number: float):
+        await self.run_blocking(time.sleep, float(number))
+        self.write_and_set_status({"slept": float(number)}, HTTPStatus.OK)